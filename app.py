@@ -1,28 +1,88 @@
+import asyncio
+import logging
+import time
 from contextlib import asynccontextmanager
 
-import jinjax
+import orjson
+
 from fastapi import FastAPI, Request, Depends
-from fastapi.responses import JSONResponse, HTMLResponse
-from fastapi.staticfiles import StaticFiles
-from fastapi.templating import Jinja2Templates
+from fastapi.responses import FileResponse, JSONResponse, HTMLResponse, PlainTextResponse
 
 from auth.basic import verify_credentials
 from config.manifest import manifest_data
-from config.settings import APP_NAME, APP_VERSION
+from config.settings import (
+    APP_NAME,
+    APP_VERSION,
+    COMPRESSION_CONTENT_TYPES,
+    COMPRESSION_MIN_SIZE,
+    LOG_LEVEL,
+    METRICS_ENABLED,
+    PROFILING_ENABLED,
+    PROFILING_INTERVAL,
+    PROFILING_SAMPLE_RATE,
+    WEB_CONCURRENCY,
+)
 from config.database.db import init_db, get_session
 from config.database.models import User
-from routes import inventory, process
+from middleware.compression import CompressionMiddleware
+from middleware.metrics import MetricsMiddleware
+from middleware.profiling import ProfilingMiddleware
+from routes import data, debug, inventory, process
 from sqlmodel import Session, select
+from utils.forecast import forecast_loop
 from utils.serializers import serialize_items_for_template, serialize_sections_for_template
+from utils.metrics import render_prometheus, setup_logging, timed
+from utils.retention import retention_loop, retention_mode
+from utils.snapshot import inventory_snapshots
+from utils.static import PrecompressedStaticFiles
+from utils.templates import get_templates, render_component
+
+logger = logging.getLogger("inventario.startup")
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Inicializa la base de datos al arrancar la app"""
-    init_db()
+    # boot_ms: init_db + snapshots hasta estar lista (el import se mide en benchmarks/startup.py)
+    boot_start = time.perf_counter()
+    startup = init_db()
+    # Copias en memoria de los inventarios para las lecturas de /inventory
+    snapshot = inventory_snapshots.load_all() if inventory_snapshots.enabled else None
+    retention = retention_mode()
+    logger.info(
+        orjson.dumps(
+            {
+                "event": "startup",
+                "boot_ms": round((time.perf_counter() - boot_start) * 1000, 2),
+                "init_db_ms": startup["ms"],
+                "migrated": startup["migrated"],
+                "seeded": startup["seeded"],
+                "snapshot": snapshot,
+                "history_retention": retention,
+                "web_concurrency": WEB_CONCURRENCY,
+            }
+        ).decode()
+    )
+
+    # Retención del historial en segundo plano (un solo worker por intervalo)
+    if retention == "refused":
+        logger.warning(
+            "HISTORY_RETENTION_ENABLED sin HISTORY_ARCHIVE_DIR: la retención no corre "
+            "(HISTORY_DISCARD_RAW=true para borrar el historial crudo sin copia)"
+        )
+    retention_task = (
+        asyncio.create_task(retention_loop()) if retention in ("archive", "discard") else None
+    )
+    # Pronóstico de consumo: la carga completa nunca corre dentro de un request
+    forecast_task = asyncio.create_task(forecast_loop())
     yield
+    forecast_task.cancel()
+    if retention_task:
+        retention_task.cancel()
 
 
+setup_logging(LOG_LEVEL)
+
 # Crear app FastAPI
 app = FastAPI(
     title=APP_NAME,
@@ -30,23 +90,34 @@ app = FastAPI(
     lifespan=lifespan,
 )
 
-# Montar archivos estáticos
-app.mount("/static", StaticFiles(directory="static"), name="static")
+# Compresión gzip/brotli de HTML, JSON y assets de texto
+app.add_middleware(
+    CompressionMiddleware,
+    minimum_size=COMPRESSION_MIN_SIZE,
+    content_types=COMPRESSION_CONTENT_TYPES,
+)
 
-# Templates Jinja2
-templates = Jinja2Templates(directory="templates")
+# Profiling opt-in (X-Profile / ?profile=) y muestreo a disco
+if PROFILING_ENABLED:
+    app.add_middleware(
+        ProfilingMiddleware,
+        store=debug.profile_store,
+        sample_rate=PROFILING_SAMPLE_RATE,
+        interval=PROFILING_INTERVAL,
+    )
 
-# JinjaX: Integrar con el entorno Jinja de FastAPI
-templates.env.add_extension(jinjax.JinjaX)
-catalog = jinjax.Catalog(jinja_env=templates.env)
-catalog.add_folder("components")
+# Métricas por request (Server-Timing + log JSON); se agrega al final para
+# quedar como middleware más externo y medir también la compresión
+app.add_middleware(MetricsMiddleware)
 
-# Exponer catalog como global para usarlo en templates Jinja tradicionales
-templates.env.globals["catalog"] = catalog
+# Montar archivos estáticos (sirve variantes .br/.gz precomprimidas si existen)
+app.mount("/static", PrecompressedStaticFiles(directory="static"), name="static")
 
 # Registrar routers
 app.include_router(inventory.router)
 app.include_router(process.router)
+app.include_router(data.router)
+app.include_router(debug.router)
 
 
 @app.get("/", response_class=HTMLResponse)
@@ -55,7 +126,11 @@ async def root(
     user: User = Depends(verify_credentials),
 ):
     """Main app view"""
-    return templates.TemplateResponse("index.html", {"request": request})
+    with timed("template"):
+        return get_templates().TemplateResponse(
+            "index.html",
+            {"request": request, "account": f"{user.household_id}:{user.id}"},
+        )
 
 
 @app.get("/app/process", response_class=HTMLResponse)
@@ -64,7 +139,7 @@ async def app_process_view(
     user: User = Depends(verify_credentials),
 ):
     """Vista de procesamiento de texto"""
-    return HTMLResponse(catalog.render("features/ProcessView"))
+    return HTMLResponse(render_component("features/ProcessView"))
 
 
 @app.get("/app/inventory", response_class=HTMLResponse)
@@ -77,12 +152,14 @@ async def app_inventory_view(
     """Vista de inventario con filtro opcional por sección"""
     from config.database.models import Section
 
-    sections_stmt = select(Section).order_by(Section.name)
+    sections_stmt = (
+        select(Section).where(Section.household_id == user.household_id).order_by(Section.name)
+    )
     sections = session.exec(sections_stmt).all()
     sections_data = serialize_sections_for_template(sections)
 
     return HTMLResponse(
-        catalog.render("features/InventoryView", sections=sections_data)
+        render_component("features/InventoryView", sections=sections_data)
     )
 
 
@@ -92,6 +169,26 @@ async def get_manifest():
     return manifest_data
 
 
+@app.get("/metrics", response_class=PlainTextResponse, include_in_schema=METRICS_ENABLED)
+async def metrics(user: User = Depends(verify_credentials)):
+    """Histogramas por ruta en formato de texto Prometheus"""
+    if not METRICS_ENABLED:
+        return PlainTextResponse("Metrics disabled", status_code=404)
+    return PlainTextResponse(
+        render_prometheus(), media_type="text/plain; version=0.0.4; charset=utf-8"
+    )
+
+
+@app.get("/sw.js")
+async def service_worker():
+    """Servir el Service Worker desde la raíz para que su scope cubra toda la app"""
+    return FileResponse(
+        "static/sw.js",
+        media_type="application/javascript",
+        headers={"Cache-Control": "no-cache"},
+    )
+
+
 @app.get("/health")
 async def health_check(session: Session = Depends(get_session)):
     """Health check para Railway"""
@@ -115,7 +212,8 @@ async def health_check(session: Session = Depends(get_session)):
             "sections": sections_count,
             "items": items_count,
             "users": users_count,
-        }
+        },
+        "snapshot": inventory_snapshots.stats(),
     }
 
 
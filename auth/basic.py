@@ -1,13 +1,50 @@
-import bcrypt
+import hashlib
+import hmac
+import os
+
 from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPBasic, HTTPBasicCredentials
 from sqlmodel import Session, select
 
 from config.database.db import get_session
 from config.database.models import User
+from config.settings import AUTH_CACHE_SIZE, AUTH_CACHE_TTL
+from utils.cache import VersionedTTLCache
+from utils.versioning import AUTH_VERSION_KEY
 
 security = HTTPBasic()
 
+# Logins válidos ya verificados con bcrypt (~200 ms de CPU cada uno).
+# Se invalida al cambiar auth_version (alta/cambio de usuarios en cualquier worker).
+auth_cache = VersionedTTLCache("auth", AUTH_VERSION_KEY, AUTH_CACHE_SIZE, AUTH_CACHE_TTL)
+
+# Clave por proceso: la cache no guarda passwords ni hashes reutilizables
+_CACHE_SECRET = os.urandom(32)
+
+
+def _cache_key(username: str, password: str) -> tuple[str, str]:
+    digest = hmac.new(_CACHE_SECRET, password.encode(), hashlib.sha256).hexdigest()
+    return username, digest
+
+
+def authenticate(session: Session, username: str, password: str) -> User | None:
+    """Devuelve el usuario si username/password son válidos, None en otro caso"""
+
+    # Buscar usuario en DB
+    statement = select(User).where(User.username == username)
+    user = session.exec(statement).first()
+
+    if not user:
+        return None
+
+    # Verificar password (bcrypt se importa en el primer login)
+    import bcrypt
+
+    if not bcrypt.checkpw(password.encode(), user.password_hash.encode()):
+        return None
+
+    return user
+
 
 def verify_credentials(
     credentials: HTTPBasicCredentials = Depends(security),
@@ -15,9 +52,20 @@ def verify_credentials(
 ) -> User:
     """Verifica las credenciales HTTP Basic Auth"""
 
-    # Buscar usuario en DB
-    statement = select(User).where(User.username == credentials.username)
-    user = session.exec(statement).first()
+    key = _cache_key(credentials.username, credentials.password)
+    user = auth_cache.get(key)
+    if user is None:
+        version = auth_cache.version()
+        user = authenticate(session, credentials.username, credentials.password)
+        if user:
+            # Copia desacoplada de la sesión del request
+            user = User(
+                id=user.id,
+                username=user.username,
+                password_hash=user.password_hash,
+                household_id=user.household_id,
+            )
+            auth_cache.set(key, user, version)
 
     if not user:
         raise HTTPException(
@@ -26,14 +74,4 @@ def verify_credentials(
             headers={"WWW-Authenticate": "Basic"},
         )
 
-    # Verificar password
-    if not bcrypt.checkpw(
-        credentials.password.encode(), user.password_hash.encode()
-    ):
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Credenciales incorrectas",
-            headers={"WWW-Authenticate": "Basic"},
-        )
-
     return user
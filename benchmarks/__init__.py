@@ -0,0 +1 @@
+"""Benchmarks reproducibles para medir el rendimiento de la app (no son tests)"""
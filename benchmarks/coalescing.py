@@ -0,0 +1,126 @@
+"""
+Benchmark: agrupación de dictados seguidos (LLM_COALESCE_WINDOW_MS).
+
+Simula --users usuarios que dictan ráfagas de --burst mensajes separados por
+--gap-ms (p.ej. "leche", "y también pan", "ah y 6 huevos") contra un LLM falso
+con --llm-latency-ms de latencia. Para cada ventana de --windows reporta
+llamadas al LLM, llamadas ahorradas y la latencia por dictado (desde que llega
+hasta que tiene sus comandos), con la misma admisión que POST /process/text.
+
+Uso:
+    python -m benchmarks.coalescing --windows 0,100,300,600 --burst 3 --gap-ms 150
+"""
+
+import argparse
+import asyncio
+import contextlib
+import json
+import os
+import re
+import statistics
+import time
+
+from benchmarks.endpoints import percentile
+
+MESSAGE_RE = re.compile(r"^Mensaje (\d+): (.*)$", re.MULTILINE)
+SINGLE_RE = re.compile(r"^(?:Usuario dice|Dictado): (.*)$", re.MULTILINE)
+
+
+def fake_completion(latency_ms: float, calls: list):
+    """LLM falso: un create_item por mensaje, con su número de dictado si vienen varios"""
+
+    def complete(built, household_id: int) -> str:
+        message = built.text
+        calls.append(message)
+        time.sleep(latency_ms / 1000)
+        messages = MESSAGE_RE.findall(message) or [("1", SINGLE_RE.findall(message)[-1])]
+        return json.dumps(
+            [
+                {"action": "create_item", "item": text, "quantity": 1, "dictation": int(number)}
+                for number, text in messages
+            ]
+        )
+
+    return complete
+
+
+async def run_scenario(window_ms: int, args) -> dict:
+    import routes.process as process
+    from utils.coalescing import RequestCoalescer
+
+    calls: list[str] = []
+    process.prompt = fake_completion(args.llm_latency_ms, calls)
+    coalescer = RequestCoalescer(
+        "bench", window_ms / 1000, args.max_dictations, process.interpret_dictations
+    )
+    latencies: list[float] = []
+    misrouted = 0
+
+    async def dictate(user_id: int, text: str):
+        nonlocal misrouted
+        start = time.perf_counter()
+        _, commands, _ = await coalescer.submit(
+            user_id, process.Dictation(text, None, user_id, user_id)
+        )
+        latencies.append((time.perf_counter() - start) * 1000)
+        if [command["item"] for command in commands] != [text]:
+            misrouted += 1
+
+    async def user(user_id: int):
+        tasks = []
+        for n in range(args.burst):
+            tasks.append(asyncio.create_task(dictate(user_id, f"item {user_id}-{n}")))
+            await asyncio.sleep(args.gap_ms / 1000)
+        await asyncio.gather(*tasks)
+
+    # Los print() de interpret_dictations ([LLM] Input/Response) van a /dev/null
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        await asyncio.gather(*(user(user_id) for user_id in range(1, args.users + 1)))
+
+    dictations = args.users * args.burst
+    return {
+        "window_ms": window_ms,
+        "dictations": dictations,
+        "llm_calls": len(calls),
+        "calls_saved": dictations - len(calls),
+        "p50_ms": statistics.median(latencies),
+        "p95_ms": percentile(latencies, 95),
+        "misrouted": misrouted,
+    }
+
+
+async def run_all(windows: list[int], args):
+    # Un solo event loop: la admisión del LLM es global del módulo
+    for window_ms in windows:
+        result = await run_scenario(window_ms, args)
+        print(
+            f"{window_ms:>8} {result['llm_calls']:>9} {result['calls_saved']:>10} "
+            f"{result['p50_ms']:>9.0f} {result['p95_ms']:>9.0f} {result['misrouted']:>15}"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--windows", default="0,100,300,600", help="ventanas a comparar (ms)")
+    parser.add_argument("--users", type=int, default=4)
+    parser.add_argument("--burst", type=int, default=3, help="dictados por ráfaga")
+    parser.add_argument("--gap-ms", type=float, default=150, help="separación entre dictados")
+    parser.add_argument("--llm-latency-ms", type=float, default=800)
+    parser.add_argument("--max-dictations", type=int, default=5)
+    args = parser.parse_args()
+
+    print(
+        f"{args.users} usuarios x {args.burst} dictados cada {args.gap_ms:g} ms, "
+        f"LLM {args.llm_latency_ms:g} ms"
+    )
+    print(
+        f"{'ventana':>8} {'llamadas':>9} {'ahorradas':>10} "
+        f"{'p50 ms':>9} {'p95 ms':>9} {'mal repartidos':>15}"
+    )
+    asyncio.run(run_all([int(value) for value in args.windows.split(",")], args))
+
+
+if __name__ == "__main__":
+    main()
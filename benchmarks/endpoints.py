@@ -0,0 +1,225 @@
+"""
+Suite de benchmarks de endpoints contra una base generada con scripts/generate_data.py.
+
+Mide latencia (p50/p95/media) y sentencias SQL por request (header Server-Timing)
+de:
+- /inventory/api/items a varias profundidades de scroll
+- vistas de historial (modal completo y paginación) y batch-history-views
+- /inventory/api/context y /health
+- POST /process/text contra un LLM falso con latencia fija
+
+El resultado es un JSON con metadatos (commit, motor de DB, tamaño del dataset)
+para comparar corridas en el tiempo (--baseline imprime la variación).
+
+Uso:
+    python -m scripts.generate_data --database-url sqlite:///./bench.db --reset
+    DATABASE_URL=sqlite:///./bench.db python -m benchmarks.endpoints \\
+        --output bench-results.json [--baseline bench-previous.json]
+"""
+
+import argparse
+import contextlib
+import json
+import os
+import platform
+import re
+import statistics
+import subprocess
+import time
+from datetime import datetime, timezone
+
+SERVER_TIMING_DB_RE = re.compile(r'db;dur=[\d.]+;desc="(\d+) queries"')
+
+FAKE_LLM_RESPONSE = json.dumps(
+    [
+        {
+            "action": "create_item",
+            "item": "leche",
+            "quantity": 2,
+            "unit": "L",
+            "section": "refrigerador",
+            "emoji": "🥛",
+            "threshold": 1,
+        },
+        {"action": "create_item", "item": "huevos", "quantity": 6, "section": "refrigerador"},
+    ]
+)
+
+
+def install_fake_llm(latency_ms: float):
+    """Reemplaza la llamada a OpenRouter por una respuesta fija con latencia simulada"""
+    import routes.process
+
+    def fake_prompt(built, household_id):
+        time.sleep(latency_ms / 1000)
+        return FAKE_LLM_RESPONSE
+
+    routes.process.prompt = fake_prompt
+
+
+def git_commit() -> str | None:
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], text=True, stderr=subprocess.DEVNULL
+        ).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def percentile(values: list[float], pct: float) -> float:
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def run_case(client, method: str, url: str, repeat: int, warmup: int, **kwargs) -> dict:
+    """Ejecuta un caso `repeat` veces y resume latencias y sentencias SQL"""
+    for _ in range(warmup):
+        client.request(method, url, **kwargs)
+
+    timings = []
+    statements = []
+    status = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        response = client.request(method, url, **kwargs)
+        timings.append((time.perf_counter() - start) * 1000)
+        status = response.status_code
+        match = SERVER_TIMING_DB_RE.search(response.headers.get("server-timing", ""))
+        if match:
+            statements.append(int(match.group(1)))
+
+    return {
+        "method": method,
+        "url": url,
+        "status": status,
+        "repeat": repeat,
+        "p50_ms": round(statistics.median(timings), 2),
+        "p95_ms": round(percentile(timings, 95), 2),
+        "mean_ms": round(statistics.fmean(timings), 2),
+        "db_statements": max(statements) if statements else None,
+    }
+
+
+def build_cases(item_ids: list[int], scroll_depths: list[int]) -> list[tuple]:
+    """(nombre, método, url, kwargs) de cada caso"""
+    busiest = item_ids[0]
+    cases = [
+        (f"items_offset_{depth}", "GET", f"/inventory/api/items?offset={depth}", {})
+        for depth in scroll_depths
+    ]
+    cases += [
+        ("history_view", "GET", f"/inventory/item/{busiest}/history-view", {}),
+        ("history_page_0", "GET", f"/inventory/api/item/{busiest}/history?offset=0", {}),
+        ("history_page_200", "GET", f"/inventory/api/item/{busiest}/history?offset=200", {}),
+        (
+            "batch_history_10",
+            "GET",
+            "/inventory/api/items/batch-history-views?item_ids="
+            + ",".join(str(i) for i in item_ids[:10]),
+            {},
+        ),
+        ("context", "GET", "/inventory/api/context", {}),
+        ("health", "GET", "/health", {}),
+        ("process_text", "POST", "/process/text", {"data": {"text": "compre leche y huevos"}}),
+    ]
+    return cases
+
+
+def compare(results: dict, baseline_path: str):
+    """Imprime la variación de p50 respecto a una corrida anterior"""
+    with open(baseline_path) as f:
+        baseline = json.load(f)
+    print(f"\nComparación con {baseline_path} (commit {baseline['meta'].get('commit')}):")
+    for name, case in results["cases"].items():
+        previous = baseline["cases"].get(name)
+        if not previous:
+            continue
+        delta = (case["p50_ms"] - previous["p50_ms"]) / previous["p50_ms"] * 100
+        print(
+            f"  {name:<22} {previous['p50_ms']:>9.2f} -> {case['p50_ms']:>9.2f} ms "
+            f"({delta:+.1f}%)"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmarks de endpoints")
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--warmup", type=int, default=2)
+    parser.add_argument("--scroll-depths", default="0,100,1000,5000")
+    parser.add_argument("--llm-latency-ms", type=float, default=0)
+    parser.add_argument("--output", help="archivo JSON de resultados (stdout si se omite)")
+    parser.add_argument("--baseline", help="JSON de una corrida anterior para comparar")
+    args = parser.parse_args()
+
+    if not os.getenv("DATABASE_URL"):
+        parser.error("DATABASE_URL es obligatorio (base generada con scripts.generate_data)")
+
+    # Sin logs por request: ensucian la salida y no son parte de lo medido
+    os.environ.setdefault("LOG_LEVEL", "WARNING")
+
+    from fastapi.testclient import TestClient
+    from sqlmodel import Session, func, select
+
+    from app import app
+    from config.database.db import engine
+    from config.database.models import Item, ItemHistory, Section
+    from config.settings import PASSWORD, USERNAME
+
+    install_fake_llm(args.llm_latency_ms)
+
+    with Session(engine) as session:
+        dataset = {
+            "sections": session.exec(select(func.count()).select_from(Section)).one(),
+            "items": session.exec(select(func.count()).select_from(Item)).one(),
+            "history_rows": session.exec(select(func.count()).select_from(ItemHistory)).one(),
+        }
+        # Items con más historial primero: peor caso para las vistas de historial
+        item_ids = session.exec(
+            select(ItemHistory.item_id)
+            .group_by(ItemHistory.item_id)
+            .order_by(func.count().desc())
+            .limit(10)
+        ).all() or session.exec(select(Item.id).limit(10)).all()
+
+    if not item_ids:
+        parser.error("La base no tiene items: generar datos primero")
+
+    depths = [int(d) for d in args.scroll_depths.split(",") if d]
+    results = {
+        "meta": {
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "commit": git_commit(),
+            "python": platform.python_version(),
+            "database": engine.dialect.name,
+            "dataset": dataset,
+            "repeat": args.repeat,
+            "llm_latency_ms": args.llm_latency_ms,
+        },
+        "cases": {},
+    }
+
+    with TestClient(app) as client:
+        client.auth = (USERNAME, PASSWORD)
+        for name, method, url, kwargs in build_cases(list(item_ids), depths):
+            # Los print() de la app (p.ej. [LLM] en process_text) van a /dev/null
+            with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+                results["cases"][name] = run_case(
+                    client, method, url, args.repeat, args.warmup, **kwargs
+                )
+            case = results["cases"][name]
+            print(f"[OK] {name:<22} p50={case['p50_ms']:>9.2f} ms  sql={case['db_statements']}")
+
+    document = json.dumps(results, indent=2, ensure_ascii=False)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(document)
+    else:
+        print(document)
+
+    if args.baseline:
+        compare(results, args.baseline)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,151 @@
+"""
+Benchmark: pronóstico de consumo fila a fila en Python vs agregación NumPy.
+
+Crea una base SQLite temporal con --items items y --history filas de historial
+por item dentro de la ventana, y compara:
+
+- python: recorrer las filas ORM de ItemHistory acumulando bajas por item
+- numpy: load_history_arrays() + aggregate_consumption() (una pasada vectorizada)
+- incremental: agregar solo las filas nuevas de un cambio sobre el estado ya calculado
+
+Uso:
+    USE_SQLITE=true python -m benchmarks.forecast --items 2000 --history 100 --repeat 3
+"""
+
+import argparse
+import random
+import statistics
+import tempfile
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+from sqlalchemy import insert
+from sqlmodel import Session, SQLModel, create_engine, select
+
+from config.database.models import Item, ItemHistory, Section
+from utils.forecast import aggregate_consumption, load_history_arrays
+
+
+def build_database(path: Path, n_items: int, n_history: int, window_days: int):
+    """Base temporal con historial de consumo gradual y reposiciones"""
+    engine = create_engine(f"sqlite:///{path}")
+    SQLModel.metadata.create_all(engine)
+    now = datetime.utcnow()
+    step = timedelta(days=window_days) / (n_history + 1)
+
+    with Session(engine) as session:
+        session.execute(insert(Section), [{"name": "Despensa", "emoji": "🥫", "created_at": now}])
+        session.execute(
+            insert(Item),
+            [
+                {
+                    "name": f"item {i}",
+                    "quantity": 5,
+                    "threshold": 1,
+                    "section_id": 1,
+                    "updated_at": now,
+                }
+                for i in range(n_items)
+            ],
+        )
+        rows = []
+        for item_id in range(1, n_items + 1):
+            quantity = 10.0
+            for j in range(n_history):
+                quantity = 10.0 if quantity < 1 else quantity - random.uniform(0, 1)
+                changed_at = now - step * (n_history - j)
+                rows.append({"item_id": item_id, "quantity": quantity, "changed_at": changed_at})
+            if len(rows) >= 50_000:
+                session.execute(insert(ItemHistory), rows)
+                rows = []
+        if rows:
+            session.execute(insert(ItemHistory), rows)
+        session.commit()
+    return engine
+
+
+def python_consumption(session: Session, since: datetime) -> dict[int, tuple[float, float]]:
+    """Camino ingenuo: entidades ORM y un loop por fila"""
+    result: dict[int, list] = {}
+    history = session.exec(
+        select(ItemHistory)
+        .where(ItemHistory.changed_at >= since)
+        .order_by(ItemHistory.item_id, ItemHistory.changed_at)
+    ).all()
+    for row in history:
+        state = result.get(row.item_id)
+        if state is None:
+            result[row.item_id] = [row.changed_at.timestamp(), 0.0, row.quantity]
+            continue
+        if row.quantity < state[2]:
+            state[1] += state[2] - row.quantity
+        state[2] = row.quantity
+    return {item_id: (state[0], state[1]) for item_id, state in result.items()}
+
+
+def timed_runs(fn, repeat: int) -> tuple[float, object]:
+    durations, result = [], None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        durations.append((time.perf_counter() - start) * 1000)
+    return statistics.median(durations), result
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--items", type=int, default=2000)
+    parser.add_argument("--history", type=int, default=100, help="filas de historial por item")
+    parser.add_argument("--window-days", type=int, default=30)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = build_database(
+            Path(tmp) / "forecast.db", args.items, args.history, args.window_days
+        )
+        since = datetime.utcnow() - timedelta(days=args.window_days + 1)
+
+        with Session(engine) as session:
+            python_ms, expected = timed_runs(
+                lambda: python_consumption(session, since), args.repeat
+            )
+            session.expunge_all()
+            numpy_ms, state = timed_runs(
+                lambda: aggregate_consumption(load_history_arrays(session, since), {}), args.repeat
+            )
+
+            # Un cambio nuevo por cada 100 items, sobre el estado ya calculado
+            last_id = session.exec(select(ItemHistory.id).order_by(ItemHistory.id.desc())).first()
+            now = datetime.utcnow()
+            session.execute(
+                insert(ItemHistory),
+                [
+                    {"item_id": i, "quantity": 0.5, "changed_at": now}
+                    for i in range(1, args.items + 1, 100)
+                ],
+            )
+            session.commit()
+            incremental_ms, _ = timed_runs(
+                lambda: aggregate_consumption(load_history_arrays(session, since, last_id), state),
+                args.repeat,
+            )
+
+        mismatches = sum(
+            1
+            for item_id, (_, consumed) in expected.items()
+            if abs(state[item_id].consumed - consumed) > 1e-6
+        )
+        rows = args.items * args.history
+        print(f"{rows} filas de historial, {args.items} items")
+        print(f"  python (ORM, fila a fila): {python_ms:9.1f} ms")
+        print(f"  numpy (columnar):          {numpy_ms:9.1f} ms  ({python_ms / numpy_ms:.1f}x)")
+        print(f"  incremental (nuevas filas): {incremental_ms:8.1f} ms")
+        print(f"  diferencias de consumo: {mismatches}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,177 @@
+"""
+Prueba de carga: throughput según el número de workers de uvicorn.
+
+Para cada valor de --workers levanta `uvicorn app:app --workers N` contra la
+misma base, espera a /health y lanza --concurrency clientes durante --duration
+segundos repartidos entre las rutas de --paths. Reporta requests/s, latencias
+y errores por número de workers.
+
+Las caches en memoria se pueden desactivar (--no-cache) para medir el costo de
+render/DB puro; con cache, el login (bcrypt) se paga una vez por worker.
+
+Uso:
+    python -m scripts.generate_data --database-url sqlite:///./bench.db --reset
+    DATABASE_URL=sqlite:///./bench.db python -m benchmarks.load \\
+        --workers 1,2,4 --concurrency 16 --duration 15 [--output load.json]
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import threading
+import time
+from datetime import datetime, timezone
+
+import httpx
+
+from benchmarks.endpoints import git_commit, percentile
+
+DEFAULT_PATHS = (
+    "/inventory/api/items?offset=0,"
+    "/inventory/api/items?offset=100,"
+    "/inventory/api/context,"
+    "/inventory/item/1/history-view"
+)
+
+
+def start_server(workers: int, port: int, env: dict) -> subprocess.Popen:
+    return subprocess.Popen(
+        [
+            sys.executable, "-m", "uvicorn", "app:app",
+            "--host", "127.0.0.1",
+            "--port", str(port),
+            "--workers", str(workers),
+            "--log-level", "warning",
+        ],
+        env=env,
+        stdout=subprocess.DEVNULL,
+    )
+
+
+def wait_ready(base_url: str, timeout: float):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if httpx.get(f"{base_url}/health", timeout=1).status_code == 200:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.2)
+    raise RuntimeError(f"El servidor no respondió en {timeout}s")
+
+
+def run_load(
+    base_url: str, paths: list[str], auth: tuple, concurrency: int, duration: float
+) -> dict:
+    """Clientes concurrentes en threads, cada uno recorriendo las rutas en ciclo"""
+    latencies: list[float] = []
+    errors = 0
+    lock = threading.Lock()
+    stop_at = time.monotonic() + duration
+
+    def client(offset: int):
+        nonlocal errors
+        local, failed = [], 0
+        with httpx.Client(base_url=base_url, auth=auth, timeout=30) as http:
+            index = offset
+            while time.monotonic() < stop_at:
+                start = time.perf_counter()
+                try:
+                    ok = http.get(paths[index % len(paths)]).status_code < 400
+                except httpx.HTTPError:
+                    ok = False
+                if ok:
+                    local.append((time.perf_counter() - start) * 1000)
+                else:
+                    failed += 1
+                index += 1
+        with lock:
+            latencies.extend(local)
+            errors += failed
+
+    threads = [threading.Thread(target=client, args=(i,)) for i in range(concurrency)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "rps": round(len(latencies) / elapsed, 1),
+        "p50_ms": round(statistics.median(latencies), 2) if latencies else None,
+        "p95_ms": round(percentile(latencies, 95), 2) if latencies else None,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Throughput según número de workers")
+    parser.add_argument("--workers", default="1,2,4")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--duration", type=float, default=15)
+    parser.add_argument("--warmup", type=float, default=2, help="segundos de carga descartados")
+    parser.add_argument("--paths", default=DEFAULT_PATHS, help="rutas separadas por coma")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--no-cache", action="store_true", help="desactiva caches en memoria")
+    parser.add_argument("--output", help="archivo JSON de resultados (stdout si se omite)")
+    args = parser.parse_args()
+
+    if not os.getenv("DATABASE_URL"):
+        parser.error("DATABASE_URL es obligatorio (base generada con scripts.generate_data)")
+
+    from config.settings import PASSWORD, USERNAME
+
+    env = {**os.environ, "LOG_LEVEL": "WARNING", "METRICS_ENABLED": "false"}
+    if args.no_cache:
+        env.update({"AUTH_CACHE_SIZE": "0", "FRAGMENT_CACHE_SIZE": "0", "LLM_CACHE_SIZE": "0"})
+
+    paths = [path for path in args.paths.split(",") if path]
+    base_url = f"http://127.0.0.1:{args.port}"
+    results = {
+        "meta": {
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "commit": git_commit(),
+            "cpu_count": os.cpu_count(),
+            "concurrency": args.concurrency,
+            "duration_s": args.duration,
+            "paths": paths,
+            "cache": not args.no_cache,
+        },
+        "runs": {},
+    }
+
+    for workers in [int(w) for w in args.workers.split(",") if w]:
+        server = start_server(workers, args.port, env)
+        try:
+            wait_ready(base_url, timeout=60)
+            run_load(base_url, paths, (USERNAME, PASSWORD), args.concurrency, args.warmup)
+            run = run_load(base_url, paths, (USERNAME, PASSWORD), args.concurrency, args.duration)
+        finally:
+            server.terminate()
+            server.wait(timeout=30)
+        results["runs"][str(workers)] = run
+        print(
+            f"[OK] workers={workers:<3} {run['rps']:>8} req/s  "
+            f"p50={run['p50_ms']} ms  errores={run['errors']}"
+        )
+
+    baseline = results["runs"].get("1")
+    if baseline and baseline["rps"]:
+        for run in results["runs"].values():
+            run["speedup"] = round(run["rps"] / baseline["rps"], 2)
+
+    document = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(document)
+    else:
+        print(document)
+
+
+if __name__ == "__main__":
+    main()
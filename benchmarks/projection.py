@@ -0,0 +1,163 @@
+"""
+Benchmark: ORM + json.dumps vs proyección de columnas + orjson para los endpoints JSON.
+
+Compara el camino anterior de `list_items` / `get_context` (entidades ORM completas,
+dicts construidos en Python y `json.dumps`) con el nuevo (tuplas proyectadas sin
+identity map + orjson), midiendo latencia y pico de memoria con tracemalloc.
+
+Uso:
+    python -m benchmarks.projection --items 10000 --repeat 5
+"""
+
+import argparse
+import json
+import random
+import statistics
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import orjson
+from sqlalchemy import insert
+from sqlmodel import Session, SQLModel, create_engine, select
+
+from config.database.models import DEFAULT_HOUSEHOLD_ID, Item, Section
+from config.database.queries import context_rows, item_rows_statement
+from utils.serializers import serialize_item_row
+
+
+def build_database(path: Path, n_items: int, n_sections: int = 8):
+    """Crea una base SQLite temporal con n_items repartidos en n_sections"""
+    engine = create_engine(f"sqlite:///{path}")
+    SQLModel.metadata.create_all(engine)
+
+    now = datetime.utcnow()
+    with Session(engine) as session:
+        session.execute(
+            insert(Section),
+            [{"name": f"Sección {i}", "emoji": "📦", "created_at": now} for i in range(n_sections)],
+        )
+        session.execute(
+            insert(Item),
+            [
+                {
+                    "name": f"item {i}",
+                    "emoji": "🍽️",
+                    "quantity": random.uniform(0, 10),
+                    "unit": "unidades",
+                    "threshold": 1,
+                    "section_id": (i % n_sections) + 1,
+                    "updated_at": now - timedelta(minutes=i),
+                }
+                for i in range(n_items)
+            ],
+        )
+        session.commit()
+    return engine
+
+
+def orm_list_items(engine) -> bytes:
+    """Camino anterior de list_items"""
+    with Session(engine) as session:
+        items = session.exec(select(Item).order_by(Item.updated_at.desc())).all()
+        data = {
+            "items": [
+                {
+                    "id": item.id,
+                    "name": item.name,
+                    "emoji": item.emoji,
+                    "quantity": item.quantity,
+                    "unit": item.unit,
+                    "threshold": item.threshold,
+                    "section_id": item.section_id,
+                    "section_name": item.section.name,
+                    "section_emoji": item.section.emoji,
+                    "updated_at": item.updated_at.isoformat(),
+                    "is_below_threshold": item.is_below_threshold,
+                }
+                for item in items
+            ]
+        }
+        return json.dumps(data).encode()
+
+
+def projected_list_items(engine) -> bytes:
+    """Camino nuevo de list_items"""
+    with Session(engine) as session:
+        rows = session.exec(item_rows_statement(DEFAULT_HOUSEHOLD_ID)).all()
+        return orjson.dumps({"items": [serialize_item_row(row) for row in rows]})
+
+
+def orm_context(engine) -> bytes:
+    """Camino anterior de get_context"""
+    with Session(engine) as session:
+        sections = session.exec(select(Section)).all()
+        items = session.exec(select(Item)).all()
+        data = {
+            "sections": [{"id": s.id, "name": s.name, "emoji": s.emoji} for s in sections],
+            "items": [{"id": i.id, "name": i.name, "section_id": i.section_id} for i in items],
+        }
+        return json.dumps(data, ensure_ascii=False).encode()
+
+
+def projected_context(engine) -> bytes:
+    """Camino nuevo de get_context"""
+    with Session(engine) as session:
+        sections, items = context_rows(session, DEFAULT_HOUSEHOLD_ID)
+        return orjson.dumps(
+            {
+                "sections": [{"id": s[0], "name": s[1], "emoji": s[2]} for s in sections],
+                "items": [{"id": i[0], "name": i[1], "section_id": i[2]} for i in items],
+            }
+        )
+
+
+def measure(fn, engine, repeat: int) -> dict:
+    """Devuelve latencia (mediana, ms) y pico de memoria (KiB) de fn"""
+    fn(engine)  # warm-up
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(engine)
+        timings.append((time.perf_counter() - start) * 1000)
+
+    tracemalloc.start()
+    fn(engine)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        "median_ms": round(statistics.median(timings), 2),
+        "min_ms": round(min(timings), 2),
+        "peak_kib": round(peak / 1024, 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--items", type=int, default=10_000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = build_database(Path(tmp) / "bench.db", args.items)
+        results = {
+            "items": args.items,
+            "list_items": {
+                "orm_json": measure(orm_list_items, engine, args.repeat),
+                "projection_orjson": measure(projected_list_items, engine, args.repeat),
+            },
+            "context": {
+                "orm_json": measure(orm_context, engine, args.repeat),
+                "projection_orjson": measure(projected_context, engine, args.repeat),
+            },
+        }
+        engine.dispose()
+
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
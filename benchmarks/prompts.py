@@ -0,0 +1,190 @@
+"""
+Corpus de regresión del prompt: calidad de los comandos vs tokens por versión.
+
+Corre los dictados de benchmarks/prompt_corpus.json (con un inventario de
+contexto fijo) contra el LLM real con cada versión de --versions y compara los
+comandos devueltos con los esperados. Un caso pasa si cada comando esperado
+aparece (mismos campos indicados; nombres sin tildes ni plural) y no sobra
+ninguno. Reporta por versión los casos que pasan y los tokens exactos que
+informa OpenRouter (prompt, leídos de cache y completion).
+
+Termina con código 1 si la versión candidata (la última de --versions) pasa
+menos casos que la base (la primera) menos --tolerance: bajar tokens no debe
+empeorar los comandos.
+
+Uso:
+    OPENROUTER_API_KEY=... python -m benchmarks.prompts --versions 1,2
+    python -m benchmarks.prompts --dry-run   # solo tamaño de los prompts, sin llamar al LLM
+"""
+
+import argparse
+import json
+import statistics
+import sys
+import unicodedata
+from pathlib import Path
+
+from utils.prompts import build_prompt
+
+CORPUS = Path(__file__).with_name("prompt_corpus.json")
+
+# Campos que nombran items o secciones: se comparan normalizados
+NAME_FIELDS = ("item", "section", "to_section", "target_name")
+
+
+def name_forms(value) -> set[str]:
+    """Minúsculas y sin tildes, con y sin plural simple ("Tomates" -> tomates, tomate, tomat)"""
+    ascii_value = unicodedata.normalize("NFKD", str(value)).encode("ascii", "ignore").decode()
+    text = ascii_value.lower().strip()
+    forms = {text}
+    if text.endswith("s"):
+        forms.add(text[:-1])
+    if text.endswith("es"):
+        forms.add(text[:-2])
+    return forms
+
+
+def field_matches(field: str, expected, actual) -> bool:
+    if actual is None:
+        return False
+    if field in NAME_FIELDS:
+        return bool(name_forms(expected) & name_forms(actual))
+    if isinstance(expected, (int, float)) and not isinstance(expected, bool):
+        try:
+            return float(actual) == float(expected)
+        except (TypeError, ValueError):
+            return False
+    return expected == actual
+
+
+def score_case(expected: list[dict], produced: list[dict]) -> tuple[bool, int]:
+    """(pasa, comandos esperados encontrados); cada comando producido cuenta una vez"""
+    remaining = list(produced)
+    found = 0
+    for want in expected:
+        match = next(
+            (
+                command
+                for command in remaining
+                if all(
+                    field_matches(field, value, command.get(field))
+                    for field, value in want.items()
+                )
+            ),
+            None,
+        )
+        if match is not None:
+            remaining.remove(match)
+            found += 1
+    return found == len(expected) and not remaining, found
+
+
+def run_version(version: int, corpus: dict, verbose: bool) -> dict:
+    from utils.llm import complete
+    from utils.parsers import parse_llm_commands
+
+    context = json.dumps(corpus["context"], ensure_ascii=False)
+    passed = found = total = 0
+    usages = []
+    for case in corpus["cases"]:
+        built = build_prompt(version, case["texts"], context)
+        content, usage = complete(built.messages)
+        usages.append(usage)
+        ok, case_found = score_case(case["expected"], parse_llm_commands(content))
+        passed += ok
+        found += case_found
+        total += len(case["expected"])
+        if verbose and not ok:
+            print(f"[v{version}] FALLA {case['texts']}: {content}")
+
+    def mean(key, nested=None):
+        values = [
+            (usage.get(nested) or {}).get(key, 0) if nested else usage.get(key, 0)
+            for usage in usages
+        ]
+        return statistics.mean(values) if values else 0
+
+    return {
+        "version": version,
+        "cases": len(corpus["cases"]),
+        "passed": passed,
+        "commands_found": found,
+        "commands_expected": total,
+        "prompt_tokens": mean("prompt_tokens"),
+        "cached_tokens": mean("cached_tokens", "prompt_tokens_details"),
+        "completion_tokens": mean("completion_tokens"),
+    }
+
+
+def prompt_sizes(version: int, corpus: dict) -> dict:
+    """Caracteres por llamada: prefijo estable (system) y parte variable"""
+    context = json.dumps(corpus["context"], ensure_ascii=False)
+    stable, variable = [], []
+    for case in corpus["cases"]:
+        messages = build_prompt(version, case["texts"], context).messages
+        system = sum(len(m["content"]) for m in messages if m["role"] == "system")
+        stable.append(system)
+        variable.append(sum(len(m["content"]) for m in messages) - system)
+    return {
+        "version": version,
+        "stable_chars": statistics.mean(stable),
+        "variable_chars": statistics.mean(variable),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--versions", default="1,2", help="base primero, candidata al final")
+    parser.add_argument("--corpus", default=str(CORPUS))
+    parser.add_argument(
+        "--tolerance", type=float, default=0.0, help="fracción de casos que se acepta perder"
+    )
+    parser.add_argument("--dry-run", action="store_true", help="no llamar al LLM")
+    parser.add_argument(
+        "--verbose", action="store_true", help="mostrar las respuestas de los casos que fallan"
+    )
+    parser.add_argument("--output", help="archivo JSON de resultados")
+    args = parser.parse_args()
+
+    corpus = json.loads(Path(args.corpus).read_text())
+    versions = [int(value) for value in args.versions.split(",")]
+
+    print(f"{'versión':>8} {'system':>8} {'variable':>9}   (caracteres medios por llamada)")
+    for version in versions:
+        sizes = prompt_sizes(version, corpus)
+        print(f"{version:>8} {sizes['stable_chars']:>8.0f} {sizes['variable_chars']:>9.0f}")
+    if args.dry_run:
+        return
+
+    from config.settings import OPENROUTER_API_KEY
+
+    if not OPENROUTER_API_KEY:
+        parser.error("OPENROUTER_API_KEY es obligatorio (o usar --dry-run)")
+
+    results = [run_version(version, corpus, args.verbose) for version in versions]
+    print(
+        f"\n{'versión':>8} {'casos':>9} {'comandos':>10} "
+        f"{'prompt tok':>11} {'cache tok':>10} {'compl tok':>10}"
+    )
+    for result in results:
+        print(
+            f"{result['version']:>8} {result['passed']:>4}/{result['cases']:<4} "
+            f"{result['commands_found']:>4}/{result['commands_expected']:<5} "
+            f"{result['prompt_tokens']:>11.0f} {result['cached_tokens']:>10.0f} "
+            f"{result['completion_tokens']:>10.0f}"
+        )
+
+    if args.output:
+        Path(args.output).write_text(json.dumps(results, indent=2))
+
+    base, candidate = results[0], results[-1]
+    if candidate["passed"] < base["passed"] - args.tolerance * base["cases"]:
+        print(f"[ERROR] v{candidate['version']} pasa menos casos que v{base['version']}")
+        sys.exit(1)
+    print(f"[OK] v{candidate['version']} no empeora respecto de v{base['version']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+"""
+Benchmark: búsqueda de items con índice (FTS5) vs `LIKE '%q%'` sin índice.
+
+Crea una base SQLite temporal con --items items (nombres con y sin acentos),
+crea el índice de búsqueda igual que la migración y mide la latencia mediana
+de una página de resultados para cada consulta, con ambos caminos.
+
+Uso:
+    USE_SQLITE=true python -m benchmarks.search --items 10000 --repeat 50
+"""
+
+import argparse
+import random
+import statistics
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+
+from sqlalchemy import func, insert
+from sqlmodel import Session, SQLModel, create_engine, select
+
+from config.database.models import DEFAULT_HOUSEHOLD_ID, Item, Section
+from config.database.search import search_items_statement
+from config.settings import ITEMS_PER_PAGE
+from scripts.generate_data import FOODS, VARIANTS
+
+# Consultas típicas mientras se escribe (prefijos, con y sin acento, varias palabras)
+DEFAULT_QUERIES = ("le", "lech", "leche ent", "platano", "plátano", "azúcar", "cafe org", "zzz")
+
+EXTRA_NAMES = ("plátano", "azúcar", "café", "limón", "jamón", "maíz", "piña", "atún")
+
+
+def item_name(names: list[str], i: int) -> str:
+    """Nombre al azar con variante opcional y número (únicos)"""
+    return f"{random.choice(names)} {random.choice(VARIANTS)} {i}".replace("  ", " ")
+
+
+def build_database(path: Path, n_items: int):
+    engine = create_engine(f"sqlite:///{path}")
+    # create_all dispara el DDL de búsqueda (after_create de la tabla item)
+    SQLModel.metadata.create_all(engine)
+    now = datetime.utcnow()
+    names = [food[0] for food in FOODS] + list(EXTRA_NAMES)
+    with Session(engine) as session:
+        session.execute(insert(Section), [{"name": "Despensa", "emoji": "🥫", "created_at": now}])
+        session.execute(
+            insert(Item),
+            [
+                {
+                    "name": item_name(names, i),
+                    "quantity": 1,
+                    "section_id": 1,
+                    "updated_at": now,
+                }
+                for i in range(n_items)
+            ],
+        )
+        session.commit()
+    return engine
+
+
+def like_statement(query: str):
+    """Camino ingenuo: escaneo completo con LIKE (sensible a acentos)"""
+    return select(Item).where(func.lower(Item.name).like(f"%{query.lower()}%")).order_by(Item.name)
+
+
+def median_ms(session: Session, statement, repeat: int) -> tuple[float, int]:
+    durations, count = [], 0
+    for _ in range(repeat):
+        start = time.perf_counter()
+        count = len(session.exec(statement.limit(ITEMS_PER_PAGE)).all())
+        durations.append((time.perf_counter() - start) * 1000)
+        session.expunge_all()
+    return statistics.median(durations), count
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--items", type=int, default=10000)
+    parser.add_argument("--repeat", type=int, default=50)
+    parser.add_argument("--queries", default=",".join(DEFAULT_QUERIES))
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = build_database(Path(tmp) / "search.db", args.items)
+        print(f"{args.items} items, página de {ITEMS_PER_PAGE}, mediana de {args.repeat} corridas")
+        print(f"{'consulta':<12} {'fts5 ms':>9} {'hits':>5} {'like ms':>9} {'hits':>5}")
+        with Session(engine) as session:
+            for query in args.queries.split(","):
+                fts = search_items_statement("sqlite", DEFAULT_HOUSEHOLD_ID, query)
+                fts_ms, fts_hits = median_ms(session, fts, args.repeat)
+                like_ms, like_hits = median_ms(session, like_statement(query), args.repeat)
+                print(f"{query:<12} {fts_ms:9.3f} {fts_hits:5} {like_ms:9.3f} {like_hits:5}")
+
+
+if __name__ == "__main__":
+    main()
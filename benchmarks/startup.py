@@ -0,0 +1,146 @@
+"""
+Benchmark de arranque en frío: tiempo de importación de la app y de `init_db()`.
+
+Cada medición corre en un proceso nuevo (como un cold start en Railway):
+- import: `python -X importtime -c "import app"` (total y módulos más pesados)
+- init_db en frío: base SQLite vacía (DDL + seed + bcrypt)
+- init_db en caliente: la misma base ya inicializada (solo lee app_meta)
+
+Con --max-import-ms / --max-warm-init-ms el script termina con código 1 si se
+superan, para detectar regresiones en CI.
+
+Uso:
+    python -m benchmarks.startup --repeat 5 [--output startup.json] [--max-import-ms 800]
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+INIT_DB_SNIPPET = (
+    "import json; from config.database.db import init_db; print(json.dumps(init_db()))"
+)
+
+
+def run_python(args: list[str], env: dict) -> subprocess.CompletedProcess:
+    return subprocess.run(
+        [sys.executable, *args], env=env, capture_output=True, text=True, check=True
+    )
+
+
+def parse_importtime(stderr: str) -> list[tuple[str, int, int]]:
+    """
+    Parses the output of `python -X importtime`.
+
+    Args:
+        stderr: stderr of the process
+
+    Returns:
+        (module, nesting depth, cumulative microseconds) per imported module
+    """
+    modules = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative_us, raw_name = line.split("|")
+        name = raw_name.lstrip()
+        depth = (len(raw_name) - len(name) - 1) // 2
+        modules.append((name, depth, int(cumulative_us)))
+    return modules
+
+
+def measure_import(env: dict) -> tuple[float, list[tuple[str, int]]]:
+    """Tiempo total de `import app` (ms) y sus imports directos con su costo acumulado"""
+    result = run_python(["-X", "importtime", "-c", "import app"], env)
+    modules = parse_importtime(result.stderr)
+    total_us = next(us for name, depth, us in modules if name == "app" and depth == 0)
+    direct = [(name, us) for name, depth, us in modules if depth == 1]
+    return total_us / 1000, direct
+
+
+def measure_init_db(env: dict) -> dict:
+    result = run_python(["-c", INIT_DB_SNIPPET], env)
+    # La última línea es el JSON; las anteriores son los print() del seed
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def summarize(values: list[float]) -> dict:
+    return {
+        "p50_ms": round(statistics.median(values), 2),
+        "min_ms": round(min(values), 2),
+        "max_ms": round(max(values), 2),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de arranque en frío")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--top", type=int, default=10, help="módulos más pesados a listar")
+    parser.add_argument("--output", help="archivo JSON de resultados (stdout si se omite)")
+    parser.add_argument("--max-import-ms", type=float, help="falla si la importación lo supera")
+    parser.add_argument(
+        "--max-warm-init-ms", type=float, help="falla si init_db en caliente lo supera"
+    )
+    args = parser.parse_args()
+
+    import_times, cold, warm = [], [], []
+    heaviest: list[tuple[str, int]] = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for run in range(args.repeat):
+            db_path = Path(tmp) / f"startup-{run}.db"
+            env = {
+                **os.environ,
+                "USE_SQLITE": "false",
+                "DATABASE_URL": f"sqlite:///{db_path}",
+                "LOG_LEVEL": "WARNING",
+            }
+
+            total, modules = measure_import(env)
+            import_times.append(total)
+            if not heaviest:
+                # Dependencias directas de la app (nivel 1 del árbol de imports)
+                heaviest = sorted(modules, key=lambda entry: entry[1], reverse=True)[: args.top]
+
+            cold.append(measure_init_db(env)["ms"])
+            warm_result = measure_init_db(env)
+            if warm_result["migrated"] or warm_result["seeded"]:
+                parser.error("init_db en caliente volvió a migrar/sembrar")
+            warm.append(warm_result["ms"])
+
+    results = {
+        "python": sys.version.split()[0],
+        "repeat": args.repeat,
+        "import": summarize(import_times),
+        "init_db_cold": summarize(cold),
+        "init_db_warm": summarize(warm),
+        "heaviest_imports_ms": {name: round(us / 1000, 2) for name, us in heaviest},
+    }
+
+    document = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(document)
+    else:
+        print(document)
+
+    failures = []
+    if args.max_import_ms and results["import"]["p50_ms"] > args.max_import_ms:
+        failures.append(f"import p50 {results['import']['p50_ms']} ms > {args.max_import_ms} ms")
+    if args.max_warm_init_ms and results["init_db_warm"]["p50_ms"] > args.max_warm_init_ms:
+        failures.append(
+            f"init_db en caliente p50 {results['init_db_warm']['p50_ms']} ms "
+            f"> {args.max_warm_init_ms} ms"
+        )
+    for failure in failures:
+        print(f"[ERROR] {failure}", file=sys.stderr)
+    if failures:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
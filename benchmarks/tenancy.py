@@ -0,0 +1,190 @@
+"""
+Benchmark: latencia de las consultas de un hogar a medida que crecen los hogares.
+
+Crea una base SQLite temporal y va agregando hogares (--items items y
+--sections secciones cada uno, con --history filas de historial por item).
+En cada escala (--households, p.ej. 1,10,100,1000) mide la mediana de cada
+consulta por hogar sobre hogares elegidos al azar. Con los índices que
+empiezan por household_id las columnas deberían quedar planas: el costo
+depende del tamaño del hogar, no del total de filas.
+
+Uso:
+    USE_SQLITE=true python -m benchmarks.tenancy --households 1,10,100,1000 --items 200
+"""
+
+import argparse
+import random
+import statistics
+import tempfile
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+from sqlalchemy import insert
+from sqlmodel import Session, SQLModel, create_engine
+
+from config.database.models import Household, Item, ItemHistory, Section
+from config.database.queries import (
+    context_rows,
+    history_page_statement,
+    item_rows_statement,
+    low_stock_statement,
+    section_rows_statement,
+)
+from config.database.search import search_items_statement
+from config.settings import HISTORY_RECORDS_PER_ITEM, ITEMS_PER_PAGE
+from scripts.generate_data import FOODS, VARIANTS
+
+
+class Builder:
+    """Agrega hogares con ids explícitos (inserts multi-fila)"""
+
+    def __init__(self, engine, n_items: int, n_sections: int, n_history: int, rng: random.Random):
+        self.engine = engine
+        self.n_items = n_items
+        self.n_sections = n_sections
+        self.n_history = n_history
+        self.rng = rng
+        self.households = 0
+        self.next_item_id = 1
+        self.next_section_id = 1
+        self.item_ids: dict[int, range] = {}
+
+    def add_households(self, target: int):
+        now = datetime.utcnow()
+        with Session(self.engine) as session:
+            while self.households < target:
+                self.households += 1
+                self._add_household(session, self.households, now)
+            session.commit()
+
+    def _add_household(self, session: Session, household_id: int, now: datetime):
+        rng = self.rng
+        session.execute(insert(Household), [{"id": household_id, "name": f"Hogar {household_id}"}])
+        first_section = self.next_section_id
+        session.execute(
+            insert(Section),
+            [
+                {
+                    "id": first_section + i,
+                    "household_id": household_id,
+                    "name": f"Sección {i}",
+                    "emoji": "📦",
+                    "created_at": now,
+                }
+                for i in range(self.n_sections)
+            ],
+        )
+        self.next_section_id += self.n_sections
+
+        first_item = self.next_item_id
+        items, history = [], []
+        for i in range(self.n_items):
+            food = FOODS[i % len(FOODS)][0]
+            variant = VARIANTS[(i // len(FOODS)) % len(VARIANTS)]
+            item_id = first_item + i
+            items.append(
+                {
+                    "id": item_id,
+                    "household_id": household_id,
+                    "name": f"{food} {variant} {i}",
+                    "quantity": rng.uniform(0, 5),
+                    "threshold": 1,
+                    "section_id": first_section + rng.randrange(self.n_sections),
+                    "updated_at": now - timedelta(minutes=rng.randrange(100_000)),
+                }
+            )
+            history.extend(
+                {
+                    "household_id": household_id,
+                    "item_id": item_id,
+                    "quantity": rng.uniform(0, 5),
+                    "changed_at": now - timedelta(hours=j),
+                }
+                for j in range(self.n_history)
+            )
+        session.execute(insert(Item), items)
+        if history:
+            session.execute(insert(ItemHistory), history)
+        self.item_ids[household_id] = range(first_item, first_item + self.n_items)
+        self.next_item_id += self.n_items
+
+
+def household_queries(builder: Builder) -> dict:
+    """Consulta -> función(session, household_id) con el mismo SQL que las rutas (camino DB)"""
+    rng = builder.rng
+
+    def history(session, household_id):
+        item_id = rng.choice(builder.item_ids[household_id])
+        return session.exec(
+            history_page_statement(household_id, item_id, 0, HISTORY_RECORDS_PER_ITEM)
+        ).all()
+
+    return {
+        "items page": lambda session, h: session.exec(
+            item_rows_statement(h).limit(ITEMS_PER_PAGE)
+        ).all(),
+        "low stock": lambda session, h: session.exec(low_stock_statement(h)).all(),
+        "sections": lambda session, h: session.exec(section_rows_statement(h)).all(),
+        "context": lambda session, h: context_rows(session, h),
+        "search": lambda session, h: session.exec(
+            search_items_statement("sqlite", h, "le").limit(ITEMS_PER_PAGE)
+        ).all(),
+        "history": history,
+    }
+
+
+def median_ms(engine, query, households: int, samples: int, rng: random.Random) -> float:
+    durations = []
+    with Session(engine) as session:
+        for _ in range(samples):
+            household_id = rng.randint(1, households)
+            start = time.perf_counter()
+            query(session, household_id)
+            durations.append((time.perf_counter() - start) * 1000)
+            session.expunge_all()
+    return statistics.median(durations)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--households", default="1,10,100,1000")
+    parser.add_argument("--items", type=int, default=200, help="items por hogar")
+    parser.add_argument("--sections", type=int, default=6, help="secciones por hogar")
+    parser.add_argument("--history", type=int, default=5, help="filas de historial por item")
+    parser.add_argument("--samples", type=int, default=200, help="consultas por medición")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    scales = sorted(int(value) for value in args.households.split(","))
+
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_engine(f"sqlite:///{Path(tmp) / 'tenancy.db'}")
+        # create_all dispara el DDL de búsqueda (after_create de la tabla item)
+        SQLModel.metadata.create_all(engine)
+        builder = Builder(engine, args.items, args.sections, args.history, rng)
+        queries = household_queries(builder)
+
+        print(
+            f"{args.items} items/hogar, mediana de {args.samples} consultas a hogares al azar (ms)"
+        )
+        print(f"{'hogares':>8} {'items':>9} " + " ".join(f"{name:>11}" for name in queries))
+        for households in scales:
+            builder.add_households(households)
+            with engine.connect() as conn:
+                conn.exec_driver_sql("ANALYZE")
+            timings = [
+                median_ms(engine, query, households, args.samples, rng)
+                for query in queries.values()
+            ]
+            print(
+                f"{households:>8} {households * args.items:>9} "
+                + " ".join(f"{ms:>11.3f}" for ms in timings)
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -1,9 +1,14 @@
 import os
-from sqlmodel import Session, SQLModel, create_engine
-from dotenv import load_dotenv
+import time
 
-# Cargar variables de entorno primero
-load_dotenv()
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.exc import IntegrityError, OperationalError, ProgrammingError
+from sqlmodel import Session, SQLModel, create_engine, select
+
+# config.settings carga el .env (una sola vez por proceso)
+from config.settings import PASSWORD, USERNAME
+from utils.metrics import install_sqlalchemy_hooks
 
 # Database URL - PostgreSQL para production, SQLite opcional para desarrollo
 USE_SQLITE = os.getenv("USE_SQLITE", "false").lower() == "true"
@@ -23,6 +28,22 @@ engine = create_engine(
     echo=False,
 )
 
+# Tiempo y número de sentencias SQL por request (Server-Timing / /metrics)
+install_sqlalchemy_hooks(engine)
+
+# Secciones creadas al inicializar la base
+DEFAULT_SECTIONS = [
+    {"name": "Refrigerador", "emoji": "🧊"},
+    {"name": "Almacén 1", "emoji": "📦"},
+    {"name": "Almacén 2", "emoji": "🏺"},
+]
+
+# Subir al cambiar DEFAULT_SECTIONS o el usuario inicial para volver a sembrar
+SEED_VERSION = 1
+SEED_VERSION_KEY = "seed_version"
+
+INIT_DB_ATTEMPTS = 3
+
 
 def create_db_and_tables():
     """Crea las tablas en la base de datos"""
@@ -35,43 +56,92 @@ def get_session():
         yield session
 
 
-def init_db():
-    """Inicializa la base de datos con datos seed"""
-    from config.database.models import Section, User
-    import bcrypt
-    from dotenv import load_dotenv
+def seed_marker() -> str:
+    """Valor de seed_version en app_meta: cambia si cambia el seed o el usuario"""
+    return f"{SEED_VERSION}:{USERNAME}"
 
-    load_dotenv()
 
-    create_db_and_tables()
+def default_sections(household_id: int) -> list[dict]:
+    """Filas de DEFAULT_SECTIONS para un hogar"""
+    return [{**section, "household_id": household_id} for section in DEFAULT_SECTIONS]
 
+
+def seed_defaults():
+    """Crea el hogar, el usuario y las secciones por defecto si faltan (una sentencia por tabla)"""
+    from config.database.migrations import sync_household_sequence, write_meta
+    from config.database.models import (
+        DEFAULT_HOUSEHOLD_ID,
+        DEFAULT_HOUSEHOLD_NAME,
+        Household,
+        Section,
+        User,
+    )
+    from utils.versioning import AUTH_VERSION_KEY, bump_version
+
+    insert = pg_insert if engine.dialect.name == "postgresql" else sqlite_insert
     with Session(engine) as session:
-        # Crear usuario si no existe
-        username = os.getenv("APP_USERNAME", "admin")
-        password = os.getenv("APP_PASSWORD", "admin")
-
-        existing_user = session.query(User).filter(User.username == username).first()
-        if not existing_user:
-            password_hash = bcrypt.hashpw(password.encode(), bcrypt.gensalt()).decode()
-            user = User(username=username, password_hash=password_hash)
-            session.add(user)
-            session.commit()
-            print(f"[OK] Usuario '{username}' creado")
-
-        # Crear secciones por defecto si no existen
-        default_sections = [
-            {"name": "Refrigerador", "emoji": "🧊"},
-            {"name": "Almacén 1", "emoji": "📦"},
-            {"name": "Almacén 2", "emoji": "🏺"},
-        ]
-
-        for sec_data in default_sections:
-            existing = (
-                session.query(Section).filter(Section.name == sec_data["name"]).first()
+        session.execute(
+            insert(Household)
+            .values(id=DEFAULT_HOUSEHOLD_ID, name=DEFAULT_HOUSEHOLD_NAME)
+            .on_conflict_do_nothing(index_elements=["id"])
+        )
+        sync_household_sequence(session.connection())
+
+        # bcrypt solo si hay que crear el usuario: hashear cuesta ~200 ms
+        if session.exec(select(User.id).where(User.username == USERNAME)).first() is None:
+            import bcrypt
+
+            password_hash = bcrypt.hashpw(PASSWORD.encode(), bcrypt.gensalt()).decode()
+            session.add(
+                User(
+                    username=USERNAME,
+                    password_hash=password_hash,
+                    household_id=DEFAULT_HOUSEHOLD_ID,
+                )
             )
-            if not existing:
-                section = Section(**sec_data)
-                session.add(section)
-
+            # Invalida los logins cacheados en otros workers
+            bump_version(session, AUTH_VERSION_KEY)
+            print(f"[OK] Usuario '{USERNAME}' creado")
+
+        # Upsert en bloque: las secciones existentes (mismo nombre) se respetan
+        session.execute(
+            insert(Section)
+            .values(default_sections(DEFAULT_HOUSEHOLD_ID))
+            .on_conflict_do_nothing(index_elements=["household_id", "name"])
+        )
+
+        write_meta(session.connection(), SEED_VERSION_KEY, seed_marker())
         session.commit()
         print("[OK] Secciones por defecto creadas")
+
+
+def init_db():
+    """
+    Inicializa la base de datos con datos seed.
+
+    Arranque en caliente (schema y seed al día): una sola query a app_meta,
+    sin DDL ni bcrypt.
+    """
+    from config.database.migrations import SCHEMA_VERSION_KEY, ensure_schema, read_meta
+
+    start = time.perf_counter()
+    for attempt in range(INIT_DB_ATTEMPTS):
+        meta = read_meta(engine, (SCHEMA_VERSION_KEY, SEED_VERSION_KEY))
+        try:
+            migrated = ensure_schema(engine, meta)
+            seeded = (meta or {}).get(SEED_VERSION_KEY) != seed_marker()
+            if seeded:
+                seed_defaults()
+            break
+        except (IntegrityError, OperationalError, ProgrammingError):
+            # Con varios workers arrancando sobre una base nueva, otro proceso
+            # puede estar creando el schema/seed a la vez: releer y reintentar
+            if attempt == INIT_DB_ATTEMPTS - 1:
+                raise
+            time.sleep(0.2 * (attempt + 1))
+
+    return {
+        "migrated": migrated,
+        "seeded": seeded,
+        "ms": round((time.perf_counter() - start) * 1000, 2),
+    }
@@ -0,0 +1,181 @@
+"""
+Versionado del schema: evita correr DDL en cada arranque.
+
+`ensure_schema()` lee la versión guardada en `app_meta` con una sola query; si
+coincide con SCHEMA_VERSION no toca el schema. Si no, ejecuta `create_all`
+(tablas nuevas) y las migraciones pendientes (cambios sobre tablas existentes).
+"""
+
+from typing import Callable
+
+from sqlalchemy import Table, inspect, select
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.exc import OperationalError, ProgrammingError
+from sqlmodel import SQLModel
+
+from config.database.models import (
+    DEFAULT_HOUSEHOLD_ID,
+    DEFAULT_HOUSEHOLD_NAME,
+    AppMeta,
+    Household,
+    Item,
+    ItemHistory,
+    Section,
+    User,
+)
+from config.database.search import rebuild_search_index
+
+# Subir al agregar tablas/columnas/índices; registrar en MIGRATIONS lo que
+# create_all no cubre (ALTER TABLE, índices sobre tablas existentes, ...)
+#   v1: app_meta
+#   v2: idempotencyrecord (solo tabla nueva)
+#   v3: itemhistoryrollup + índices (item_id, changed_at) y (changed_at) en itemhistory
+#   v4: índice parcial ix_item_low_stock (items bajo el umbral)
+#   v5: índice de búsqueda de items (FTS5 en SQLite, pg_trgm en PostgreSQL)
+#   v6: household + household_id en user/section/item/itemhistory, índices
+#       que empiezan por household_id y búsqueda por hogar
+SCHEMA_VERSION = 6
+
+
+def _create_indexes(table: Table, *names: str) -> Callable[[Connection], None]:
+    """Migración que crea los índices declarados en el modelo que falten (o solo `names`)"""
+
+    def migrate(conn: Connection):
+        for index in table.indexes:
+            if not names or index.name in names:
+                index.create(conn, checkfirst=True)
+
+    return migrate
+
+
+# Índices reemplazados por sus versiones con household_id
+HOUSEHOLD_REPLACED_INDEXES = ("ix_section_name", "ix_item_low_stock")
+
+
+def sync_household_sequence(conn: Connection):
+    """Tras insertar el hogar por defecto con su id, la secuencia sigue desde ahí (PostgreSQL)"""
+    if conn.dialect.name == "postgresql":
+        conn.exec_driver_sql(
+            "SELECT setval(pg_get_serial_sequence('household', 'id'), "
+            "COALESCE((SELECT MAX(id) FROM household), 1))"
+        )
+
+
+def add_households(conn: Connection):
+    """
+    Datos existentes al hogar por defecto; índices y búsqueda por hogar.
+
+    Idempotente: una base creada con create_all sin schema_version (p. ej. por
+    scripts anteriores) ya puede tener el hogar por defecto y las columnas.
+    """
+    default_household = conn.execute(
+        select(Household.id).where(Household.id == DEFAULT_HOUSEHOLD_ID)
+    ).scalar_one_or_none()
+    if default_household is None:
+        conn.execute(
+            Household.__table__.insert().values(
+                id=DEFAULT_HOUSEHOLD_ID, name=DEFAULT_HOUSEHOLD_NAME
+            )
+        )
+        sync_household_sequence(conn)
+    # La FK solo en PostgreSQL: SQLite no admite REFERENCES con default no nulo en ADD COLUMN
+    references = " REFERENCES household(id)" if conn.dialect.name == "postgresql" else ""
+    inspector = inspect(conn)
+    for model in (User, Section, Item, ItemHistory):
+        columns = {column["name"] for column in inspector.get_columns(model.__tablename__)}
+        if "household_id" in columns:
+            continue
+        conn.exec_driver_sql(
+            f'ALTER TABLE "{model.__tablename__}" ADD COLUMN household_id INTEGER NOT NULL '
+            f"DEFAULT {DEFAULT_HOUSEHOLD_ID}{references}"
+        )
+    for name in HOUSEHOLD_REPLACED_INDEXES:
+        conn.exec_driver_sql(f"DROP INDEX IF EXISTS {name}")
+    for model in (User, Section, Item, ItemHistory):
+        _create_indexes(model.__table__)(conn)
+
+    # La versión global del inventario pasa a ser la del hogar por defecto (así
+    # los ETags que ya tienen los clientes no vuelven a ser válidos)
+    version = conn.execute(
+        select(AppMeta.value).where(AppMeta.key == "inventory_version")
+    ).scalar_one_or_none()
+    if version is not None:
+        write_meta(conn, f"inventory_version:{DEFAULT_HOUSEHOLD_ID}", version)
+
+    rebuild_search_index(conn)
+
+
+# versión destino -> función que migra desde la versión anterior
+# (v4 y v5 quedan cubiertas por v6, que recrea esos índices con household_id)
+MIGRATIONS: dict[int, Callable[[Connection], None]] = {
+    3: _create_indexes(
+        ItemHistory.__table__, "ix_itemhistory_item_changed", "ix_itemhistory_changed_at"
+    ),
+    6: add_households,
+}
+
+SCHEMA_VERSION_KEY = "schema_version"
+
+
+def read_meta(engine: Engine, keys: tuple[str, ...]) -> dict[str, str] | None:
+    """
+    Reads several app_meta keys in a single query.
+
+    Args:
+        engine: Database engine
+        keys: Keys to read
+
+    Returns:
+        Dictionary key -> value, or None if the app_meta table does not exist yet
+    """
+    try:
+        with engine.connect() as conn:
+            rows = conn.execute(
+                select(AppMeta.key, AppMeta.value).where(AppMeta.key.in_(keys))
+            ).all()
+    except (OperationalError, ProgrammingError):
+        return None
+    return {key: value for key, value in rows}
+
+
+def write_meta(conn: Connection, key: str, value: str):
+    """Upsert portable de una clave de app_meta"""
+    updated = conn.execute(
+        AppMeta.__table__.update().where(AppMeta.key == key).values(value=value)
+    ).rowcount
+    if not updated:
+        conn.execute(AppMeta.__table__.insert().values(key=key, value=value))
+
+
+def ensure_schema(engine: Engine, meta: dict[str, str] | None) -> bool:
+    """
+    Brings the schema to SCHEMA_VERSION, skipping all DDL when already current.
+
+    Args:
+        engine: Database engine
+        meta: Result of read_meta() (None if app_meta is missing)
+
+    Returns:
+        True if DDL was executed, False if the schema was already current
+    """
+    stored = int(meta[SCHEMA_VERSION_KEY]) if meta and SCHEMA_VERSION_KEY in meta else None
+    if stored == SCHEMA_VERSION:
+        return False
+
+    with engine.begin() as conn:
+        if stored is None:
+            # Sin versión: base nueva (create_all ya crea el schema actual) o
+            # base anterior al versionado (schema de la versión 0)
+            stored = 0 if inspect(conn).has_table("item") else SCHEMA_VERSION
+
+        SQLModel.metadata.create_all(conn)
+
+        for version in range(stored + 1, SCHEMA_VERSION + 1):
+            migration = MIGRATIONS.get(version)
+            if migration is not None:
+                migration(conn)
+                print(f"[OK] Migración de schema v{version} aplicada")
+
+        write_meta(conn, SCHEMA_VERSION_KEY, str(SCHEMA_VERSION))
+
+    return True
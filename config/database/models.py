@@ -1,14 +1,31 @@
 from datetime import datetime
 from typing import Optional
 
+from sqlalchemy import Index, UniqueConstraint, text
 from sqlmodel import Field, Relationship, SQLModel
 
+# Hogar de los datos anteriores a multi-hogar y del usuario inicial
+DEFAULT_HOUSEHOLD_ID = 1
+DEFAULT_HOUSEHOLD_NAME = "Casa"
+
+
+class Household(SQLModel, table=True):
+    """Hogar (tenant): cada familia ve solo sus secciones, items e historial"""
+
+    id: Optional[int] = Field(default=None, primary_key=True)
+    name: str
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+
 
 class Section(SQLModel, table=True):
     """Secciones del inventario (Refrigerador, Almacén 1, etc.)"""
 
+    # Nombre único dentro del hogar
+    __table_args__ = (Index("ix_section_household_name", "household_id", "name", unique=True),)
+
     id: Optional[int] = Field(default=None, primary_key=True)
-    name: str = Field(index=True, unique=True)
+    household_id: int = Field(default=DEFAULT_HOUSEHOLD_ID, foreign_key="household.id")
+    name: str
     emoji: str = Field(default="📦")
     created_at: datetime = Field(default_factory=datetime.utcnow)
 
@@ -19,7 +36,26 @@ class Section(SQLModel, table=True):
 class Item(SQLModel, table=True):
     """Items del inventario de alimentos"""
 
+    # Todos los índices empiezan por household_id: el costo de una consulta
+    # depende del tamaño del hogar, no de cuántos hogares hay
+    __table_args__ = (
+        # Listas y páginas por fecha de actualización (todas o por sección)
+        Index("ix_item_household_updated", "household_id", "updated_at"),
+        Index("ix_item_household_section_updated", "household_id", "section_id", "updated_at"),
+        # Índice parcial con solo los items bajo el umbral: la base lo mantiene en
+        # cada INSERT/UPDATE (ORM, inserts masivos, imports) y la lista de compras
+        # lo recorre sin escanear el inventario completo
+        Index(
+            "ix_item_household_low_stock",
+            "household_id",
+            "section_id",
+            sqlite_where=text("quantity < threshold"),
+            postgresql_where=text("quantity < threshold"),
+        ),
+    )
+
     id: Optional[int] = Field(default=None, primary_key=True)
+    household_id: int = Field(default=DEFAULT_HOUSEHOLD_ID, foreign_key="household.id")
     name: str = Field(index=True)  # Case-insensitive en queries
     emoji: str = Field(default="🍽️")
     quantity: float = Field(default=0)
@@ -41,18 +77,63 @@ class Item(SQLModel, table=True):
 class ItemHistory(SQLModel, table=True):
     """Historial de cambios de cantidad de items"""
 
+    __table_args__ = (
+        # Vistas de historial: filas de un item ordenadas por fecha
+        Index("ix_itemhistory_item_changed", "item_id", "changed_at"),
+        Index("ix_itemhistory_household_changed", "household_id", "changed_at"),
+    )
+
     id: Optional[int] = Field(default=None, primary_key=True)
+    household_id: int = Field(default=DEFAULT_HOUSEHOLD_ID, foreign_key="household.id")
     item_id: int = Field(foreign_key="item.id")
     quantity: float
-    changed_at: datetime = Field(default_factory=datetime.utcnow)
+    changed_at: datetime = Field(default_factory=datetime.utcnow, index=True)  # retención por fecha
 
     # Relación
     item: Item = Relationship(back_populates="history")
 
 
+class ItemHistoryRollup(SQLModel, table=True):
+    """Historial agregado por día o semana (filas de ItemHistory fuera de la retención)"""
+
+    __table_args__ = (UniqueConstraint("item_id", "granularity", "period_start"),)
+
+    id: Optional[int] = Field(default=None, primary_key=True)
+    item_id: int = Field(foreign_key="item.id", index=True)
+    granularity: str  # "day" | "week"
+    period_start: datetime
+    last_quantity: float  # cantidad al final del período
+    min_quantity: float
+    max_quantity: float
+    samples: int  # cambios agregados
+    last_changed_at: datetime  # fecha del último cambio del período
+
+
 class User(SQLModel, table=True):
-    """Usuario único de la aplicación"""
+    """Usuario de la aplicación; ve y modifica solo el inventario de su hogar"""
 
     id: Optional[int] = Field(default=None, primary_key=True)
+    household_id: int = Field(default=DEFAULT_HOUSEHOLD_ID, foreign_key="household.id", index=True)
     username: str = Field(unique=True)
     password_hash: str  # bcrypt hash
+
+
+class AppMeta(SQLModel, table=True):
+    """Metadatos clave/valor de la app (versión de schema, seeds aplicados, etc.)"""
+
+    __tablename__ = "app_meta"
+
+    key: str = Field(primary_key=True)
+    value: str
+
+
+class IdempotencyRecord(SQLModel, table=True):
+    """Respuesta de un POST con Idempotency-Key: los reintentos la reciben sin re-ejecutar"""
+
+    key: str = Field(primary_key=True)  # "{user_id}:{Idempotency-Key}"
+    request_hash: str  # detecta la misma key reutilizada con otro contenido
+    status_code: Optional[int] = None  # None mientras el request original está en curso
+    headers: Optional[str] = None  # JSON
+    body: Optional[str] = None
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+    expires_at: datetime = Field(index=True)
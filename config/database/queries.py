@@ -1,35 +1,227 @@
-"""Common database query utilities for finding items and sections"""
+"""
+Common database query utilities for finding items and sections.
 
+Every helper takes the household (tenant) first: all statements filter by
+household_id, the leading column of the tenant-scoped indexes.
+"""
+
+from sqlalchemy import String, case, literal, union_all
 from sqlmodel import Session, select, func
 
-from config.database.models import Item, Section
+from config.database.models import Item, ItemHistory, ItemHistoryRollup, Section
 
 
-def find_item_by_name(session: Session, name: str) -> Item | None:
+def find_item_by_name(session: Session, household_id: int, name: str) -> Item | None:
     """
     Finds an item by name using case-insensitive search.
 
     Args:
         session: Database session
+        household_id: Household that owns the item
         name: Item name to search for (case-insensitive)
 
     Returns:
         Item instance if found, None otherwise
     """
-    statement = select(Item).where(func.lower(Item.name) == name.lower())
+    statement = select(Item).where(
+        Item.household_id == household_id, func.lower(Item.name) == name.lower()
+    )
     return session.exec(statement).first()
 
 
-def find_section_by_name(session: Session, name: str) -> Section | None:
+def find_section_by_name(session: Session, household_id: int, name: str) -> Section | None:
     """
     Finds a section by name using case-insensitive search.
 
     Args:
         session: Database session
+        household_id: Household that owns the section
         name: Section name to search for (case-insensitive)
 
     Returns:
         Section instance if found, None otherwise
     """
-    statement = select(Section).where(func.lower(Section.name) == name.lower())
+    statement = select(Section).where(
+        Section.household_id == household_id, func.lower(Section.name) == name.lower()
+    )
     return session.exec(statement).first()
+
+
+# Columnas proyectadas para los endpoints JSON: se seleccionan como tuplas para
+# no construir entidades ORM ni llenar el identity map de la sesión.
+ITEM_ROW_FIELDS = (
+    "id",
+    "name",
+    "emoji",
+    "quantity",
+    "unit",
+    "threshold",
+    "section_id",
+    "section_name",
+    "section_emoji",
+    "updated_at",
+)
+
+SECTION_ROW_FIELDS = ("id", "name", "emoji", "created_at")
+
+
+def item_rows_statement(household_id: int, section_id: int | None = None):
+    """
+    Builds a column-projection SELECT for items joined with their section.
+
+    Args:
+        household_id: Household whose items are listed
+        section_id: Optional section filter
+
+    Returns:
+        SELECT statement yielding tuples in ITEM_ROW_FIELDS order
+    """
+    statement = (
+        select(
+            Item.id,
+            Item.name,
+            Item.emoji,
+            Item.quantity,
+            Item.unit,
+            Item.threshold,
+            Item.section_id,
+            Section.name,
+            Section.emoji,
+            Item.updated_at,
+        )
+        .join(Section, Section.id == Item.section_id)
+        .where(Item.household_id == household_id)
+        .order_by(Item.updated_at.desc())
+    )
+
+    if section_id:
+        statement = statement.where(Item.section_id == section_id)
+
+    return statement
+
+
+def low_stock_statement(household_id: int, section_id: int | None = None):
+    """
+    Builds the item-row SELECT restricted to items below their threshold.
+
+    The WHERE clause matches the partial index ix_item_household_low_stock, so
+    the cost depends on how many items of the household are low, not on the
+    inventory size.
+
+    Args:
+        household_id: Household whose items are listed
+        section_id: Optional section filter
+
+    Returns:
+        SELECT statement yielding tuples in ITEM_ROW_FIELDS order, most urgent
+        first (lowest quantity relative to the threshold)
+    """
+    fill_ratio = case((Item.threshold > 0, Item.quantity / Item.threshold), else_=0)
+    return (
+        item_rows_statement(household_id, section_id)
+        .where(Item.quantity < Item.threshold)
+        .order_by(None)
+        .order_by(fill_ratio, Item.name)
+    )
+
+
+def section_rows_statement(household_id: int):
+    """
+    Builds a column-projection SELECT for sections ordered by name.
+
+    Args:
+        household_id: Household whose sections are listed
+
+    Returns:
+        SELECT statement yielding tuples in SECTION_ROW_FIELDS order
+    """
+    return (
+        select(Section.id, Section.name, Section.emoji, Section.created_at)
+        .where(Section.household_id == household_id)
+        .order_by(Section.name)
+    )
+
+
+def context_rows(session: Session, household_id: int) -> tuple[list[tuple], list[tuple]]:
+    """
+    Loads the minimal (id, name, ...) tuples needed for the LLM context.
+
+    Args:
+        session: Database session
+        household_id: Household whose inventory is described
+
+    Returns:
+        Tuple of (section rows as (id, name, emoji), item rows as (id, name, section_id))
+    """
+    sections = session.exec(
+        select(Section.id, Section.name, Section.emoji)
+        .where(Section.household_id == household_id)
+        .order_by(Section.id)
+    ).all()
+    items = session.exec(
+        select(Item.id, Item.name, Item.section_id)
+        .where(Item.household_id == household_id)
+        .order_by(Item.id)
+    ).all()
+    return sections, items
+
+
+HISTORY_ENTRY_FIELDS = (
+    "changed_at",
+    "quantity",
+    "granularity",
+    "min_quantity",
+    "max_quantity",
+    "samples",
+)
+
+
+def history_page_statement(household_id: int, item_id: int, offset: int, limit: int):
+    """
+    Builds a page of an item's history, newest first, merging raw rows and rollups.
+
+    Rollups (see utils.retention) are always older than every raw row, so one
+    ordering by date keeps the timeline continuous across the boundary.
+
+    Args:
+        household_id: Household that must own the item (otherwise the page is empty)
+        item_id: Item whose history is listed
+        offset: Entries to skip
+        limit: Entries to return (one extra row is fetched: it provides the
+            "before" quantity of the last entry and tells whether there is more)
+
+    Returns:
+        SELECT statement yielding tuples in HISTORY_ENTRY_FIELDS order
+    """
+    raw = select(
+        ItemHistory.changed_at.label("changed_at"),
+        ItemHistory.quantity.label("quantity"),
+        literal(None, String).label("granularity"),
+        ItemHistory.quantity.label("min_quantity"),
+        ItemHistory.quantity.label("max_quantity"),
+        literal(1).label("samples"),
+        ItemHistory.id.label("id"),
+    ).where(ItemHistory.household_id == household_id, ItemHistory.item_id == item_id)
+    # Los agregados no tienen household_id: se filtran por el dueño del item
+    owned_item = (
+        select(Item.id)
+        .where(Item.id == item_id, Item.household_id == household_id)
+        .scalar_subquery()
+    )
+    rollups = select(
+        ItemHistoryRollup.last_changed_at,
+        ItemHistoryRollup.last_quantity,
+        ItemHistoryRollup.granularity,
+        ItemHistoryRollup.min_quantity,
+        ItemHistoryRollup.max_quantity,
+        ItemHistoryRollup.samples,
+        ItemHistoryRollup.id,
+    ).where(ItemHistoryRollup.item_id == owned_item)
+
+    entries = union_all(raw, rollups).subquery()
+    return (
+        select(*(entries.c[name] for name in HISTORY_ENTRY_FIELDS))
+        .order_by(entries.c.changed_at.desc(), entries.c.id.desc())
+        .offset(offset)
+        .limit(limit + 1)
+    )
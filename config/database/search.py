@@ -0,0 +1,178 @@
+"""
+Búsqueda de items por nombre con índice, insensible a acentos y mayúsculas.
+
+- SQLite: tabla FTS5 `item_fts` (external content sobre `item`) con tokenizer
+  unicode61 remove_diacritics e índices de prefijo; triggers la mantienen al
+  día en cada INSERT/UPDATE/DELETE de items (ORM, inserts masivos, imports).
+  Cada palabra buscada es un prefijo: "plat isla" encuentra "Plátano de la isla".
+  household_id también se indexa como término: la búsqueda intersecta en el
+  índice las coincidencias con las del hogar, sin filtrar fila por fila.
+- PostgreSQL: índice GIN pg_trgm sobre search_normalize(name) (lower + unaccent)
+  que sirve a `LIKE '%q%'`. Si las extensiones no están disponibles, la
+  función se crea igual (sin unaccent) y la búsqueda funciona sin índice.
+
+El DDL se ejecuta al crear la tabla `item` (bases nuevas) y en las migraciones
+v5/v6 para bases existentes.
+"""
+
+import re
+
+from sqlalchemy import Connection, column, event, func, literal, table, text
+from sqlmodel import select
+
+from config.database.models import Item
+
+item_fts = table("item_fts", column("rowid"), column("rank"))
+
+SQLITE_DDL = (
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS item_fts USING fts5(
+        name,
+        household_id,
+        content='item',
+        content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2',
+        prefix='2 3'
+    )
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS item_fts_insert AFTER INSERT ON item BEGIN
+        INSERT INTO item_fts(rowid, name, household_id) VALUES (new.id, new.name, new.household_id);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS item_fts_delete AFTER DELETE ON item BEGIN
+        INSERT INTO item_fts(item_fts, rowid, name, household_id)
+        VALUES ('delete', old.id, old.name, old.household_id);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS item_fts_update AFTER UPDATE OF name, household_id ON item BEGIN
+        INSERT INTO item_fts(item_fts, rowid, name, household_id)
+        VALUES ('delete', old.id, old.name, old.household_id);
+        INSERT INTO item_fts(rowid, name, household_id) VALUES (new.id, new.name, new.household_id);
+    END
+    """,
+    # Indexa los items que ya existían
+    "INSERT INTO item_fts(item_fts) VALUES ('rebuild')",
+)
+
+# Índice de la v5 (sin household_id): se reemplaza en la migración v6
+SQLITE_DROP_DDL = (
+    "DROP TRIGGER IF EXISTS item_fts_insert",
+    "DROP TRIGGER IF EXISTS item_fts_delete",
+    "DROP TRIGGER IF EXISTS item_fts_update",
+    "DROP TABLE IF EXISTS item_fts",
+)
+
+PG_NORMALIZE_UNACCENT = """
+    CREATE OR REPLACE FUNCTION search_normalize(value text) RETURNS text
+    LANGUAGE sql IMMUTABLE PARALLEL SAFE
+    AS $$ SELECT lower(public.unaccent('public.unaccent'::regdictionary, value)) $$
+"""
+
+PG_NORMALIZE_PLAIN = """
+    CREATE OR REPLACE FUNCTION search_normalize(value text) RETURNS text
+    LANGUAGE sql IMMUTABLE PARALLEL SAFE
+    AS $$ SELECT lower(value) $$
+"""
+
+PG_TRIGRAM_INDEX = """
+    CREATE INDEX IF NOT EXISTS ix_item_name_search
+    ON item USING gin (search_normalize(name) gin_trgm_ops)
+"""
+
+
+def _try_pg(conn: Connection, statement: str) -> bool:
+    """Ejecuta en un savepoint: un error (sin permisos, extensión ausente) no aborta la migración"""
+    try:
+        with conn.begin_nested():
+            conn.exec_driver_sql(statement)
+        return True
+    except Exception as e:
+        print(f"[WARN] Búsqueda: no se pudo ejecutar '{statement.split('(')[0].strip()}': {e}")
+        return False
+
+
+def create_search_index(conn: Connection):
+    """Crea el índice de búsqueda del dialecto (idempotente)"""
+    if conn.dialect.name == "sqlite":
+        for statement in SQLITE_DDL:
+            conn.exec_driver_sql(statement)
+        return
+
+    if conn.dialect.name == "postgresql":
+        has_unaccent = _try_pg(conn, "CREATE EXTENSION IF NOT EXISTS unaccent")
+        has_trigram = _try_pg(conn, "CREATE EXTENSION IF NOT EXISTS pg_trgm")
+        conn.exec_driver_sql(PG_NORMALIZE_UNACCENT if has_unaccent else PG_NORMALIZE_PLAIN)
+        if has_trigram:
+            conn.exec_driver_sql(PG_TRIGRAM_INDEX)
+
+
+def rebuild_search_index(conn: Connection):
+    """Recrea el índice de búsqueda (cambio de columnas indexadas)"""
+    if conn.dialect.name == "sqlite":
+        for statement in SQLITE_DROP_DDL:
+            conn.exec_driver_sql(statement)
+    create_search_index(conn)
+
+
+@event.listens_for(Item.__table__, "after_create")
+def _create_search_index_with_table(target, connection, **kw):
+    create_search_index(connection)
+
+
+def fts_query(query: str, household_id: int) -> str | None:
+    """Texto del usuario -> consulta FTS5 (cada palabra como prefijo), None si queda vacía"""
+    words = re.findall(r"\w+", query)
+    if not words:
+        return None
+    terms = " ".join(f'"{word}"*' for word in words)
+    return f'household_id : "{household_id}" AND name : ({terms})'
+
+
+def _escape_like(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+def search_items_statement(
+    dialect: str, household_id: int, query: str, section_id: int | None = None
+):
+    """
+    Builds an indexed, accent-insensitive search over item names.
+
+    Args:
+        dialect: Engine dialect name ("sqlite" or "postgresql")
+        household_id: Household whose items are searched
+        query: User input (as typed)
+        section_id: Optional section filter
+
+    Returns:
+        SELECT of Item entities, best matches first, or None if the query has no words
+    """
+    if dialect == "sqlite":
+        match = fts_query(query, household_id)
+        if match is None:
+            return None
+        statement = (
+            select(Item)
+            .join(item_fts, item_fts.c.rowid == Item.id)
+            .where(text("item_fts MATCH :match").bindparams(match=match))
+            .order_by(item_fts.c.rank, Item.name)
+        )
+    else:
+        query = query.strip()
+        if not query:
+            return None
+        normalized_name = func.search_normalize(Item.name)
+        needle = func.search_normalize(literal(_escape_like(query)))
+        statement = (
+            select(Item)
+            .where(normalized_name.like(literal("%") + needle + literal("%"), escape="\\"))
+            # Coincidencias al inicio del nombre primero
+            .order_by(func.strpos(normalized_name, needle), Item.name)
+        )
+
+    if section_id:
+        statement = statement.where(Item.section_id == section_id)
+    return statement.where(Item.household_id == household_id)
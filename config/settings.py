@@ -24,3 +24,105 @@ SQLITE_WEB_UI_PASSWORD = os.getenv("SQLITE_WEB_UI_PASSWORD", "admin")
 # Lazy Loading Configuration
 ITEMS_PER_PAGE = 10  # X = cantidad de items por página en lazy load
 HISTORY_RECORDS_PER_ITEM = 20  # Y = cantidad de registros de historial por item
+
+# JSON endpoints: filas por chunk al hacer streaming de resultados grandes
+JSON_STREAM_CHUNK_SIZE = 1000
+
+# Compresión de respuestas (gzip/brotli)
+COMPRESSION_MIN_SIZE = int(os.getenv("COMPRESSION_MIN_SIZE", "500"))  # bytes
+COMPRESSION_CONTENT_TYPES = (
+    "text/html",
+    "text/css",
+    "text/plain",
+    "text/javascript",
+    "application/javascript",
+    "application/json",
+    "application/manifest+json",
+    "image/svg+xml",
+    "text/csv",
+    "application/x-ndjson",
+)
+
+# Observabilidad: logs JSON por request y endpoint /metrics (Prometheus)
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO")
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "true").lower() == "true"
+
+# Profiling bajo demanda (header "X-Profile: 1" o "?profile=1", requiere auth)
+# y muestreo de una fracción de requests a un directorio rotativo.
+# Usa pyinstrument si está instalado; si no, un sampler propio del event loop.
+PROFILING_ENABLED = os.getenv("PROFILING_ENABLED", "false").lower() == "true"
+PROFILING_SAMPLE_RATE = float(os.getenv("PROFILING_SAMPLE_RATE", "0"))  # 0.01 = 1%
+PROFILING_DIR = os.getenv("PROFILING_DIR", "./profiles")
+PROFILING_MAX_FILES = int(os.getenv("PROFILING_MAX_FILES", "50"))
+PROFILING_INTERVAL = float(os.getenv("PROFILING_INTERVAL", "0.001"))  # segundos entre muestras
+
+# Workers: uvicorn --workers lee WEB_CONCURRENCY. Con varios procesos, las
+# caches en memoria se invalidan con versiones guardadas en app_meta: cada
+# proceso las relee como máximo cada VERSION_POLL_INTERVAL segundos
+# (0 = en cada uso; una lectura por clave primaria).
+WEB_CONCURRENCY = int(os.getenv("WEB_CONCURRENCY", "1"))
+VERSION_POLL_INTERVAL = float(os.getenv("VERSION_POLL_INTERVAL", "1.0"))
+
+# Caches en memoria por proceso (entradas máximas y TTL en segundos)
+AUTH_CACHE_SIZE = int(os.getenv("AUTH_CACHE_SIZE", "256"))
+AUTH_CACHE_TTL = float(os.getenv("AUTH_CACHE_TTL", "300"))
+FRAGMENT_CACHE_SIZE = int(os.getenv("FRAGMENT_CACHE_SIZE", "512"))
+FRAGMENT_CACHE_TTL = float(os.getenv("FRAGMENT_CACHE_TTL", "60"))
+LLM_CACHE_SIZE = int(os.getenv("LLM_CACHE_SIZE", "128"))
+LLM_CACHE_TTL = float(os.getenv("LLM_CACHE_TTL", "600"))
+
+# Admisión de llamadas al LLM (POST /process/text), por worker: máximo de
+# llamadas simultáneas en total y por usuario, cola de espera acotada y tiempo
+# máximo en cola antes de responder 429 + Retry-After.
+LLM_MAX_CONCURRENT = int(os.getenv("LLM_MAX_CONCURRENT", "4"))
+LLM_MAX_CONCURRENT_PER_USER = int(os.getenv("LLM_MAX_CONCURRENT_PER_USER", "1"))
+LLM_MAX_QUEUE = int(os.getenv("LLM_MAX_QUEUE", "8"))
+LLM_QUEUE_TIMEOUT = float(os.getenv("LLM_QUEUE_TIMEOUT", "10"))  # segundos
+
+# Dictados seguidos de un mismo usuario dentro de la ventana se interpretan
+# en una sola llamada al LLM (hasta LLM_COALESCE_MAX_DICTATIONS por llamada).
+# El primero espera la ventana completa; 0 = cada dictado por separado.
+LLM_COALESCE_WINDOW_MS = int(os.getenv("LLM_COALESCE_WINDOW_MS", "0"))
+LLM_COALESCE_MAX_DICTATIONS = int(os.getenv("LLM_COALESCE_MAX_DICTATIONS", "5"))
+
+# Versión del prompt del intérprete (utils/prompts.py). Comparar versiones con
+# el corpus de regresión (benchmarks/prompts.py) antes de cambiarla.
+LLM_PROMPT_VERSION = int(os.getenv("LLM_PROMPT_VERSION", "2"))
+
+# Idempotency-Key en POST /process/text: cuánto se guarda la respuesta original
+# y cuánto espera un reintento a que termine el request original en otro worker
+IDEMPOTENCY_TTL = int(os.getenv("IDEMPOTENCY_TTL", "86400"))  # segundos
+IDEMPOTENCY_WAIT_TIMEOUT = float(os.getenv("IDEMPOTENCY_WAIT_TIMEOUT", "60"))  # segundos
+
+# API JSON de comandos (POST /process/batch): máximo de comandos por request
+BATCH_MAX_COMMANDS = int(os.getenv("BATCH_MAX_COMMANDS", "1000"))
+
+# Exportación/importación masiva (/data): filas por chunk al leer de la base
+# (cursor del servidor) y por INSERT al importar
+EXPORT_CHUNK_SIZE = int(os.getenv("EXPORT_CHUNK_SIZE", "2000"))
+IMPORT_CHUNK_SIZE = int(os.getenv("IMPORT_CHUNK_SIZE", "1000"))
+
+# Retención del historial: los cambios más viejos que HISTORY_RAW_DAYS se
+# agregan por día (último, mínimo, máximo) y los más viejos que
+# HISTORY_DAILY_DAYS por semana. Con HISTORY_ARCHIVE_DIR las filas originales
+# se guardan antes de borrarlas en archivos NDJSON comprimidos con gzip.
+# Desactivada por defecto: borra filas crudas. Sin HISTORY_ARCHIVE_DIR solo
+# corre con HISTORY_DISCARD_RAW=true (borrar sin copia, a conciencia).
+HISTORY_RETENTION_ENABLED = os.getenv("HISTORY_RETENTION_ENABLED", "false").lower() == "true"
+HISTORY_DISCARD_RAW = os.getenv("HISTORY_DISCARD_RAW", "false").lower() == "true"
+HISTORY_RAW_DAYS = int(os.getenv("HISTORY_RAW_DAYS", "90"))
+HISTORY_DAILY_DAYS = int(os.getenv("HISTORY_DAILY_DAYS", "365"))
+HISTORY_RETENTION_INTERVAL = float(os.getenv("HISTORY_RETENTION_INTERVAL", "3600"))  # segundos
+# filas por transacción
+HISTORY_RETENTION_BATCH_SIZE = int(os.getenv("HISTORY_RETENTION_BATCH_SIZE", "5000"))
+HISTORY_ARCHIVE_DIR = os.getenv("HISTORY_ARCHIVE_DIR", "")  # vacío = sin archivo
+
+# Pronóstico de consumo ("se acaba en ~4 días"): días de historial usados para
+# estimar la tasa y cada cuánto se recalcula todo en segundo plano (entre medio,
+# incremental)
+FORECAST_WINDOW_DAYS = int(os.getenv("FORECAST_WINDOW_DAYS", "30"))
+FORECAST_REBUILD_INTERVAL = float(os.getenv("FORECAST_REBUILD_INTERVAL", "3600"))  # segundos
+
+# Copia en memoria de secciones e items por worker: las lecturas de
+# /inventory no consultan la DB (false = leer siempre de la DB)
+SNAPSHOT_ENABLED = os.getenv("SNAPSHOT_ENABLED", "true").lower() == "true"
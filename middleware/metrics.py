@@ -0,0 +1,47 @@
+"""Middleware que mide cada request: header Server-Timing, log JSON e histogramas por ruta"""
+
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from utils.metrics import record_request, reset_request_metrics, start_request_metrics
+
+
+def route_label(scope: Scope) -> str:
+    """Plantilla de la ruta (no la URL concreta) para no explotar la cardinalidad"""
+    route = scope.get("route")
+    if route is not None:
+        return route.path
+    if scope["path"].startswith("/static/"):
+        return "/static"
+    return "unmatched"
+
+
+class MetricsMiddleware:
+    """ASGI middleware que abre un RequestMetrics por request y lo registra al terminar"""
+
+    def __init__(self, app: ASGIApp, server_timing: bool = True):
+        self.app = app
+        self.server_timing = server_timing
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        metrics, token = start_request_metrics()
+        status = 500
+
+        async def send_wrapper(message: Message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                if self.server_timing:
+                    headers = MutableHeaders(scope=message)
+                    headers.append("Server-Timing", metrics.server_timing())
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            record_request(metrics, route_label(scope), scope["method"], status)
+            reset_request_metrics(token)
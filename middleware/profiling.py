@@ -0,0 +1,141 @@
+"""Middleware de profiling opt-in: por request (autenticado) o por muestreo"""
+
+import asyncio
+import base64
+import binascii
+import random
+
+import anyio
+from sqlmodel import Session
+from starlette.datastructures import Headers, MutableHeaders, QueryParams
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from auth.basic import authenticate
+from config.database.db import engine
+from utils.profiling import ProfileStore, new_profiler, profile_name
+
+# Valores de X-Profile / ?profile=: "1" guarda el perfil, "return" lo devuelve
+PROFILE_STORE_VALUES = {"1", "true", "store"}
+PROFILE_RETURN_VALUES = {"return"}
+
+
+def requested_mode(scope: Scope) -> str | None:
+    """Modo pedido por el cliente: "store", "return" o None"""
+    value = Headers(scope=scope).get("x-profile")
+    if value is None:
+        value = QueryParams(scope.get("query_string", b"")).get("profile")
+    if value is None:
+        return None
+    value = value.lower()
+    if value in PROFILE_RETURN_VALUES:
+        return "return"
+    if value in PROFILE_STORE_VALUES:
+        return "store"
+    return None
+
+
+def check_basic_auth(scope: Scope) -> bool:
+    """Valida el header Authorization: Basic contra la tabla de usuarios"""
+    authorization = Headers(scope=scope).get("authorization", "")
+    scheme, _, encoded = authorization.partition(" ")
+    if scheme.lower() != "basic":
+        return False
+    try:
+        username, _, password = base64.b64decode(encoded).decode().partition(":")
+    except (binascii.Error, UnicodeDecodeError):
+        return False
+    with Session(engine) as session:
+        return authenticate(session, username, password) is not None
+
+
+class ProfilingMiddleware:
+    """
+    Ejecuta el request bajo un profiler y guarda el resultado en `store`
+    (header X-Profile-Id) o lo devuelve como respuesta (modo "return").
+    Los requests muestreados (`sample_rate`) solo se guardan.
+
+    El profiler muestrea todos los hilos del proceso (event loop y threadpool),
+    compartidos por todos los requests: se perfila uno a la vez. Los pedidos
+    explícitamente esperan su turno; los muestreados se saltean si ya hay otro
+    perfil en curso. Los requests no perfilados que corren en paralelo igual
+    aparecen en las pilas.
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        store: ProfileStore,
+        sample_rate: float = 0.0,
+        interval: float = 0.001,
+    ):
+        self.app = app
+        self.store = store
+        self.sample_rate = sample_rate
+        self.interval = interval
+        # Un solo perfil a la vez por worker (pyinstrument tampoco admite dos)
+        self._lock = asyncio.Lock()
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        mode = requested_mode(scope)
+        if mode is not None and not await anyio.to_thread.run_sync(check_basic_auth, scope):
+            mode = None
+        if (
+            mode is None
+            and self.sample_rate
+            and not self._lock.locked()
+            and random.random() < self.sample_rate
+        ):
+            mode = "store"
+        if mode is None:
+            await self.app(scope, receive, send)
+            return
+
+        async with self._lock:
+            await self._profile(mode, scope, receive, send)
+
+    async def _profile(self, mode: str, scope: Scope, receive: Receive, send: Send):
+        name = profile_name(scope["method"], scope["path"])
+        profiler = new_profiler(self.interval)
+
+        if mode == "return":
+            # Se ejecuta el request completo y se descarta su cuerpo
+            async def discard(message: Message):
+                pass
+
+            profiler.start()
+            try:
+                await self.app(scope, receive, discard)
+            finally:
+                profiler.stop()
+            body = profiler.speedscope(name)
+            await send(
+                {
+                    "type": "http.response.start",
+                    "status": 200,
+                    "headers": [
+                        (b"content-type", b"application/json"),
+                        (b"content-disposition", f'attachment; filename="{name}"'.encode()),
+                        (b"content-length", str(len(body)).encode()),
+                    ],
+                }
+            )
+            await send({"type": "http.response.body", "body": body})
+            return
+
+        async def send_wrapper(message: Message):
+            if message["type"] == "http.response.start":
+                headers = MutableHeaders(scope=message)
+                headers["X-Profile-Id"] = name
+            await send(message)
+
+        profiler.start()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            profiler.stop()
+            data = profiler.speedscope(name)
+            await anyio.to_thread.run_sync(self.store.save, name, data)
@@ -0,0 +1,84 @@
+import tempfile
+from datetime import date
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.responses import ORJSONResponse, StreamingResponse
+from sqlmodel import Session
+from starlette.concurrency import iterate_in_threadpool, run_in_threadpool
+
+from auth.basic import verify_credentials
+from config.database.db import engine
+from config.database.models import User
+from config.settings import EXPORT_CHUNK_SIZE, IMPORT_CHUNK_SIZE
+from utils.transfer import ENTITIES, FORMATS, TransferError, import_stream, iter_export
+from utils.versioning import bump_inventory_version
+
+router = APIRouter(prefix="/data", tags=["data"])
+
+# Cuerpo del import en memoria hasta este tamaño; más grande va a disco
+SPOOL_MAX_MEMORY = 4 * 1024 * 1024
+
+
+def validate(entity: str, format: str):
+    if entity not in ENTITIES:
+        raise HTTPException(status_code=404, detail=f"Entidad desconocida: {entity}")
+    if format not in FORMATS:
+        raise HTTPException(status_code=400, detail=f"Formato no soportado: {format}")
+
+
+@router.get("/export/{entity}")
+async def export_entity(
+    entity: str,
+    format: str = Query("csv"),
+    user: User = Depends(verify_credentials),
+):
+    """Descarga sections/items/history del hogar en CSV o NDJSON (streaming)"""
+    validate(entity, format)
+    filename = f"{entity}-{date.today().isoformat()}.{format}"
+    # Generador síncrono (driver bloqueante) consumido en el threadpool
+    return StreamingResponse(
+        iterate_in_threadpool(
+            iter_export(engine, entity, format, EXPORT_CHUNK_SIZE, user.household_id)
+        ),
+        media_type=FORMATS[format],
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
+
+
+@router.post("/import/{entity}")
+async def import_entity(
+    entity: str,
+    request: Request,
+    format: str = Query("csv"),
+    user: User = Depends(verify_credentials),
+):
+    """
+    Importa un archivo CSV/NDJSON (cuerpo crudo del request) al hogar del usuario,
+    en una transacción. Ids existentes se omiten; importar sections, luego items
+    y luego history.
+    """
+    validate(entity, format)
+
+    with tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_MEMORY) as spool:
+        async for chunk in request.stream():
+            spool.write(chunk)
+        spool.seek(0)
+
+        try:
+            result = await run_in_threadpool(import_file, entity, format, spool, user.household_id)
+        except TransferError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+
+    return ORJSONResponse(result)
+
+
+def import_file(entity: str, format: str, stream, household_id: int) -> dict:
+    with Session(engine) as session:
+        result = import_stream(
+            session.connection(), entity, format, stream, IMPORT_CHUNK_SIZE, household_id
+        )
+        result["version"] = (
+            bump_inventory_version(session, household_id) if result["inserted"] else None
+        )
+        session.commit()
+    return result
@@ -0,0 +1,31 @@
+from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import FileResponse
+
+from auth.basic import verify_credentials
+from config.database.models import User
+from config.settings import PROFILING_DIR, PROFILING_ENABLED, PROFILING_MAX_FILES
+from utils.profiling import ProfileStore
+
+router = APIRouter(prefix="/debug", tags=["debug"], include_in_schema=False)
+
+profile_store = ProfileStore(PROFILING_DIR, PROFILING_MAX_FILES)
+
+
+def require_profiling():
+    if not PROFILING_ENABLED:
+        raise HTTPException(status_code=404)
+
+
+@router.get("/profiles", dependencies=[Depends(require_profiling)])
+async def list_profiles(user: User = Depends(verify_credentials)):
+    """Lista los perfiles guardados (más recientes primero)"""
+    return {"profiles": profile_store.list()}
+
+
+@router.get("/profiles/{name}", dependencies=[Depends(require_profiling)])
+async def download_profile(name: str, user: User = Depends(verify_credentials)):
+    """Descarga un perfil speedscope (abrir en https://www.speedscope.app)"""
+    path = profile_store.path(name)
+    if path is None:
+        raise HTTPException(status_code=404, detail="Perfil no encontrado")
+    return FileResponse(path, media_type="application/json", filename=name)
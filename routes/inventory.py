@@ -1,32 +1,65 @@
 from datetime import datetime
-import json
 
+import orjson
 from fastapi import APIRouter, Depends, Query, Request
-from fastapi.responses import HTMLResponse
+from fastapi.responses import (
+    HTMLResponse,
+    ORJSONResponse,
+    PlainTextResponse,
+    Response,
+    StreamingResponse,
+)
 from sqlmodel import Session, select, func
 
 from auth.basic import verify_credentials
-from config.settings import ITEMS_PER_PAGE, HISTORY_RECORDS_PER_ITEM
+from config.settings import (
+    FRAGMENT_CACHE_SIZE,
+    FRAGMENT_CACHE_TTL,
+    HISTORY_RECORDS_PER_ITEM,
+    ITEMS_PER_PAGE,
+    JSON_STREAM_CHUNK_SIZE,
+)
 from config.database.db import get_session
-from config.database.models import Item, ItemHistory, Section, User
-from config.database.queries import find_item_by_name, find_section_by_name
-from utils.serializers import serialize_items_for_template
-from utils.time import humanize_time
+from config.database.models import Item, User
+from config.database.search import search_items_statement
+from config.database.queries import (
+    context_rows,
+    find_item_by_name,
+    find_section_by_name,
+    history_page_statement,
+    item_rows_statement,
+    low_stock_statement,
+    section_rows_statement,
+)
+from utils.cache import VersionedTTLCache
+from utils.forecast import consumption_forecast, rank_by_depletion
+from utils.serializers import (
+    format_shopping_list,
+    serialize_history_page,
+    serialize_item_row,
+    serialize_item_row_for_template,
+    serialize_low_stock_row,
+    serialize_items_for_template,
+    serialize_section_row,
+    stream_json_array,
+)
+from utils.snapshot import inventory_snapshots
+from utils.templates import render_component
+from utils.versioning import (
+    household_version_key,
+    not_modified_response,
+    observe_client_version,
+    set_version_headers,
+)
 
 router = APIRouter(prefix="/inventory", tags=["inventory"])
 
-# Lazy import to avoid circular dependency
-def get_catalog():
-    import jinjax
-    from fastapi.templating import Jinja2Templates
-    templates = Jinja2Templates(directory="templates")
-    # Get or create catalog
-    if "catalog" not in templates.env.globals:
-        catalog = jinjax.Catalog(jinja_env=templates.env)
-        catalog.add_folder("components")
-        templates.env.globals["catalog"] = catalog
-    return templates.env.globals["catalog"]
-
+# HTML ya renderizado (páginas de items, historiales, contexto), compartido por
+# los usuarios de un hogar: las claves empiezan por household_id y una entrada
+# se invalida al cambiar la versión de su hogar en cualquier worker
+fragment_cache = VersionedTTLCache(
+    "fragments", household_version_key, FRAGMENT_CACHE_SIZE, FRAGMENT_CACHE_TTL
+)
 
 @router.get("/items")
 async def list_items(
@@ -36,31 +69,84 @@ async def list_items(
 ):
     """Lista todos los items o filtrados por sección"""
 
-    statement = select(Item).order_by(Item.updated_at.desc())
-
-    if section_id:
-        statement = statement.where(Item.section_id == section_id)
-
-    items = session.exec(statement).all()
-
-    return {
-        "items": [
-            {
-                "id": item.id,
-                "name": item.name,
-                "emoji": item.emoji,
-                "quantity": item.quantity,
-                "unit": item.unit,
-                "threshold": item.threshold,
-                "section_id": item.section_id,
-                "section_name": item.section.name,
-                "section_emoji": item.section.emoji,
-                "updated_at": item.updated_at.isoformat(),
-                "is_below_threshold": item.is_below_threshold,
-            }
-            for item in items
-        ]
-    }
+    snapshot = inventory_snapshots.current(user.household_id)
+    if snapshot:
+        rows = snapshot.item_rows(section_id)
+        partitions = (
+            rows[start:start + JSON_STREAM_CHUNK_SIZE]
+            for start in range(JSON_STREAM_CHUNK_SIZE, len(rows), JSON_STREAM_CHUNK_SIZE)
+        )
+        first_chunk = rows[:JSON_STREAM_CHUNK_SIZE]
+    else:
+        statement = item_rows_statement(user.household_id, section_id).execution_options(
+            yield_per=JSON_STREAM_CHUNK_SIZE
+        )
+        partitions = session.exec(statement).partitions()
+        first_chunk = next(partitions, [])
+
+    # Resultados pequeños: una sola respuesta; grandes: streaming por chunks
+    if len(first_chunk) < JSON_STREAM_CHUNK_SIZE:
+        return ORJSONResponse({"items": [serialize_item_row(row) for row in first_chunk]})
+
+    return StreamingResponse(
+        stream_json_array("items", first_chunk, partitions, serialize_item_row),
+        media_type="application/json",
+    )
+
+
+@router.get("/low-stock")
+async def list_low_stock(
+    request: Request,
+    section_id: int | None = Query(None),
+    user: User = Depends(verify_credentials),
+    session: Session = Depends(get_session),
+):
+    """Items bajo el umbral, los más urgentes primero"""
+    household_id = user.household_id
+    not_modified = not_modified_response(request, household_id)
+    if not_modified:
+        return not_modified
+
+    def render():
+        rows, days_left = ranked_low_stock(session, household_id, section_id)
+        return orjson.dumps(
+            {"items": [serialize_low_stock_row(row, days_left.get(row[0])) for row in rows]}
+        )
+
+    body = fragment_cache.get_or_create((household_id, "low-stock", section_id), render)
+    return set_version_headers(Response(body, media_type="application/json"), household_id)
+
+
+@router.get("/shopping-list", response_class=PlainTextResponse)
+async def get_shopping_list(
+    request: Request,
+    user: User = Depends(verify_credentials),
+    session: Session = Depends(get_session),
+):
+    """Lista de compras en texto plano (para compartir por WhatsApp)"""
+    household_id = user.household_id
+    not_modified = not_modified_response(request, household_id)
+    if not_modified:
+        return not_modified
+
+    text = fragment_cache.get_or_create(
+        (household_id, "shopping-list"),
+        lambda: format_shopping_list(*ranked_low_stock(session, household_id)),
+    )
+    return set_version_headers(PlainTextResponse(text), household_id)
+
+
+def ranked_low_stock(
+    session: Session, household_id: int, section_id: int | None = None
+) -> tuple[list, dict]:
+    """Items bajo el umbral ordenados por cuándo se acaban (luego por % del umbral)"""
+    snapshot = inventory_snapshots.current(household_id)
+    if snapshot:
+        rows = snapshot.low_stock_rows(section_id)
+    else:
+        rows = session.exec(low_stock_statement(household_id, section_id)).all()
+    days_left = consumption_forecast.days_left(household_id, {row[0]: row[3] for row in rows})
+    return rank_by_depletion(rows, days_left), days_left
 
 
 @router.get("/sections")
@@ -70,20 +156,13 @@ async def list_sections(
 ):
     """Lista todas las secciones"""
 
-    statement = select(Section).order_by(Section.name)
-    sections = session.exec(statement).all()
-
-    return {
-        "sections": [
-            {
-                "id": section.id,
-                "name": section.name,
-                "emoji": section.emoji,
-                "created_at": section.created_at.isoformat(),
-            }
-            for section in sections
-        ]
-    }
+    snapshot = inventory_snapshots.current(user.household_id)
+    if snapshot:
+        sections = snapshot.section_rows()
+    else:
+        sections = session.exec(section_rows_statement(user.household_id)).all()
+
+    return ORJSONResponse({"sections": [serialize_section_row(row) for row in sections]})
 
 
 @router.get("/api/items", response_class=HTMLResponse)
@@ -98,34 +177,112 @@ async def get_items_paginated(
     """
     Retorna items paginados para infinite scroll
     """
-    stmt = select(Item).order_by(Item.updated_at.desc())
-
-    if section_id:
-        stmt = stmt.where(Item.section_id == section_id)
+    household_id = user.household_id
+    not_modified = not_modified_response(request, household_id)
+    if not_modified:
+        return not_modified
+
+    def render():
+        snapshot = inventory_snapshots.current(household_id)
+        if snapshot:
+            rows = snapshot.item_rows(section_id, offset, limit)
+            quantities = {row[0]: row[3] for row in rows}
+            days_left = consumption_forecast.days_left(household_id, quantities)
+            items_data = [
+                serialize_item_row_for_template(row, days_left.get(row[0])) for row in rows
+            ]
+            return render_items_list(items_data, offset, limit, section_id)
+
+        stmt = (
+            select(Item)
+            .where(Item.household_id == household_id)
+            .order_by(Item.updated_at.desc())
+        )
+        if section_id:
+            stmt = stmt.where(Item.section_id == section_id)
+        return render_items_page(session, household_id, stmt, offset, limit, section_id)
 
-    stmt = stmt.offset(offset).limit(limit)
-    items = session.exec(stmt).all()
+    html = fragment_cache.get_or_create((household_id, "items", offset, limit, section_id), render)
+    return set_version_headers(HTMLResponse(html), household_id)
 
-    # Preparar data para template
-    items_data = serialize_items_for_template(items)
 
+@router.get("/api/search", response_class=HTMLResponse)
+async def search_items(
+    request: Request,
+    q: str = Query(""),
+    offset: int = Query(0),
+    limit: int = Query(ITEMS_PER_PAGE),
+    section_id: int | None = Query(None),
+    user: User = Depends(verify_credentials),
+    session: Session = Depends(get_session),
+):
+    """
+    Búsqueda por nombre mientras se escribe (sin acentos ni mayúsculas)
+    Retorna los mismos fragmentos ItemRow paginados que /api/items
+    """
+    household_id = user.household_id
+    not_modified = not_modified_response(request, household_id)
+    if not_modified:
+        return not_modified
+
+    stmt = search_items_statement(session.get_bind().dialect.name, household_id, q, section_id)
+    if stmt is None:
+        # Búsqueda vacía: la lista normal
+        return await get_items_paginated(request, offset, limit, section_id, user, session)
+
+    html = fragment_cache.get_or_create(
+        (household_id, "search", q.strip().lower(), offset, limit, section_id),
+        lambda: render_items_page(
+            session, household_id, stmt, offset, limit, section_id, query=q.strip()
+        ),
+    )
+    return set_version_headers(HTMLResponse(html), household_id)
+
+
+def render_items_page(
+    session: Session,
+    household_id: int,
+    stmt,
+    offset: int,
+    limit: int,
+    section_id: int | None,
+    query: str | None = None,
+) -> str:
+    """Página de ItemRows (lista o búsqueda) con el scroll infinito a la siguiente"""
+    items = session.exec(stmt.offset(offset).limit(limit)).all()
+
+    # Preparar data para template (con "se acaba en ~N días")
+    quantities = {item.id: item.quantity for item in items}
+    days_left = consumption_forecast.days_left(household_id, quantities)
+    items_data = serialize_items_for_template(items, days_left)
+    return render_items_list(items_data, offset, limit, section_id, query)
+
+
+def render_items_list(
+    items_data: list[dict],
+    offset: int,
+    limit: int,
+    section_id: int | None,
+    query: str | None = None,
+) -> str:
+    """HTML de una página de items ya serializados"""
     # Determinar si hay más items por cargar
-    has_more = len(items) == limit
+    has_more = len(items_data) == limit
 
     # 🆕 Usar componente JinjaX
-    return HTMLResponse(
-        get_catalog().render(
-            "features/ItemsList",
-            items=items_data,
-            offset=offset + limit,
-            section_id=section_id,
-            has_more=has_more
-        )
+    return render_component(
+        "features/ItemsList",
+        items=items_data,
+        offset=offset + limit,
+        section_id=section_id,
+        query=query,
+        has_more=has_more
     )
 
 
 @router.get("/api/context", response_class=HTMLResponse)
 async def get_context(
+    request: Request,
     user: User = Depends(verify_credentials),
     session: Session = Depends(get_session),
 ):
@@ -133,15 +290,30 @@ async def get_context(
     Retorna <script> con contexto completo para el LLM
     Se carga asíncronamente al entrar a la app
     """
-    sections = session.exec(select(Section)).all()
-    items = session.exec(select(Item)).all()
+    household_id = user.household_id
+    # Solo nombres e ids: el ETag no depende de la hora
+    not_modified = not_modified_response(request, household_id, relative_times=False)
+    if not_modified:
+        return not_modified
+
+    html = fragment_cache.get_or_create(
+        (household_id, "context"), lambda: render_context(session, household_id)
+    )
+    return set_version_headers(HTMLResponse(html), household_id, relative_times=False)
+
+
+def render_context(session: Session, household_id: int) -> str:
+    """<script> con secciones e items (id, nombre) del hogar para el LLM"""
+    snapshot = inventory_snapshots.current(household_id)
+    sections, items = snapshot.context_rows() if snapshot else context_rows(session, household_id)
 
     context_data = {
-        "sections": [{"id": s.id, "name": s.name, "emoji": s.emoji} for s in sections],
-        "items": [{"id": i.id, "name": i.name, "section_id": i.section_id} for i in items]
+        "sections": [{"id": s[0], "name": s[1], "emoji": s[2]} for s in sections],
+        "items": [{"id": i[0], "name": i[1], "section_id": i[2]} for i in items]
     }
 
-    context_json = json.dumps(context_data, ensure_ascii=False)
+    # orjson no escapa "</", evitar que un nombre cierre el <script>
+    context_json = orjson.dumps(context_data).decode().replace("</", "<\\/")
 
     return f"""
 <script>
@@ -160,44 +332,45 @@ async def get_item_history_view(
     session: Session = Depends(get_session),
 ):
     """Vista completa de historial con infinite scroll"""
-    item = session.get(Item, item_id)
-    if not item:
+    household_id = user.household_id
+    not_modified = not_modified_response(request, household_id)
+    if not_modified:
+        return not_modified
+
+    html = fragment_cache.get_or_create(
+        (household_id, "history-view", item_id),
+        lambda: render_history_view(session, household_id, item_id),
+    )
+    if html is None:
         return HTMLResponse("<div class='text-red-500 p-4'>Item no encontrado</div>")
 
-    # Cargar primer batch de historial directamente
-    all_history = session.exec(
-        select(ItemHistory)
-        .where(ItemHistory.item_id == item_id)
-        .order_by(ItemHistory.changed_at.desc())
-    ).all()
+    return set_version_headers(HTMLResponse(html), household_id)
 
-    # Paginar primer batch
+
+def render_history_view(session: Session, household_id: int, item_id: int) -> str | None:
+    """HTML del modal de historial (primer batch), None si el item no existe en el hogar"""
+    snapshot = inventory_snapshots.current(household_id)
+    if snapshot:
+        item = snapshot.item(item_id)
+    else:
+        item = session.get(Item, item_id)
+        if item and item.household_id != household_id:
+            item = None
+    if not item:
+        return None
+
+    # Primer batch: una página (crudo + agregados), sin cargar todo el historial
     limit = HISTORY_RECORDS_PER_ITEM
-    history = all_history[0:limit]
-
-    # Calcular before/after
-    history_data = []
-    for i, record in enumerate(history):
-        before = all_history[i + 1].quantity if i + 1 < len(all_history) else 0
-        after = record.quantity
-        history_data.append({
-            "before": before,
-            "after": after,
-            "changed_at": record.changed_at,
-            "date_human": humanize_time(record.changed_at)
-        })
-
-    has_more = limit < len(all_history)
+    rows = session.exec(history_page_statement(household_id, item_id, 0, limit)).all()
+    history_data, has_more = serialize_history_page(rows, limit)
 
     # 🆕 Usar componente JinjaX
-    return HTMLResponse(
-        get_catalog().render(
-            "features/HistoryView",
-            item=item,
-            history=history_data,
-            offset=limit,
-            has_more=has_more
-        )
+    return render_component(
+        "features/HistoryView",
+        item=item,
+        history=history_data,
+        offset=limit,
+        has_more=has_more
     )
 
 
@@ -213,45 +386,32 @@ async def get_item_history_paginated(
     """
     Retorna historial paginado de un item con before/after calculado
     """
-    # Obtener todos los registros para calcular before correctamente
-    all_history = session.exec(
-        select(ItemHistory)
-        .where(ItemHistory.item_id == item_id)
-        .order_by(ItemHistory.changed_at.desc())
-    ).all()
-
-    # Paginar
-    history = all_history[offset:offset + limit]
-
-    # Calcular before/after
-    history_data = []
-    for i, record in enumerate(history):
-        actual_index = offset + i
-        before = all_history[actual_index + 1].quantity if actual_index + 1 < len(all_history) else 0
-        after = record.quantity
-        history_data.append({
-            "before": before,
-            "after": after,
-            "changed_at": record.changed_at,
-            "date_human": humanize_time(record.changed_at)
-        })
-
-    has_more = (offset + limit) < len(all_history)
-
-    # 🆕 Usar componente JinjaX
-    return HTMLResponse(
-        get_catalog().render(
+    household_id = user.household_id
+    not_modified = not_modified_response(request, household_id)
+    if not_modified:
+        return not_modified
+
+    def render():
+        # Una fila extra da el "before" del último registro y si hay más páginas
+        rows = session.exec(history_page_statement(household_id, item_id, offset, limit)).all()
+        history_data, has_more = serialize_history_page(rows, limit)
+
+        # 🆕 Usar componente JinjaX
+        return render_component(
             "features/HistoryList",
             history=history_data,
             item_id=item_id,
             offset=offset + limit,
             has_more=has_more
         )
-    )
+
+    html = fragment_cache.get_or_create((household_id, "history", item_id, offset, limit), render)
+    return set_version_headers(HTMLResponse(html), household_id)
 
 
 @router.get("/api/items/batch-history-views")
 async def get_batch_history_views(
+    request: Request,
     item_ids: str = Query(...),
     user: User = Depends(verify_credentials),
     session: Session = Depends(get_session),
@@ -260,48 +420,19 @@ async def get_batch_history_views(
     Retorna múltiples history-views en una sola llamada
     item_ids: string separado por comas (ej: "1,2,3,4,5")
     """
+    household_id = user.household_id
+    observe_client_version(request, household_id)
     ids = [int(id.strip()) for id in item_ids.split(",") if id.strip()]
 
     result = {}
     for item_id in ids:
-        item = session.get(Item, item_id)
-        if not item:
-            continue
-
-        # Cargar primer batch de historial
-        all_history = session.exec(
-            select(ItemHistory)
-            .where(ItemHistory.item_id == item_id)
-            .order_by(ItemHistory.changed_at.desc())
-        ).all()
-
-        # Paginar primer batch
-        limit = HISTORY_RECORDS_PER_ITEM
-        history = all_history[0:limit]
-
-        # Calcular before/after
-        history_data = []
-        for i, record in enumerate(history):
-            before = all_history[i + 1].quantity if i + 1 < len(all_history) else 0
-            after = record.quantity
-            history_data.append({
-                "before": before,
-                "after": after,
-                "changed_at": record.changed_at,
-                "date_human": humanize_time(record.changed_at)
-            })
-
-        has_more = limit < len(all_history)
-
-        # Renderizar componente
-        html = get_catalog().render(
-            "features/HistoryView",
-            item=item,
-            history=history_data,
-            offset=limit,
-            has_more=has_more
+        # Mismas entradas de cache que /item/{id}/history-view
+        html = fragment_cache.get_or_create(
+            (household_id, "history-view", item_id),
+            lambda: render_history_view(session, household_id, item_id),
         )
+        if html is not None:
+            result[str(item_id)] = html
 
-        result[str(item_id)] = html
-
-    return result
+    # La versión permite al cliente descartar entradas de cache obsoletas
+    return set_version_headers(ORJSONResponse(result), household_id)
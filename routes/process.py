@@ -1,53 +1,45 @@
-from datetime import datetime
+import logging
 
-from fastapi import APIRouter, Depends, Form, Request, Response
-from fastapi.responses import HTMLResponse
+import orjson
+from fastapi import APIRouter, Depends, Form, Request
+from fastapi.responses import HTMLResponse, ORJSONResponse
 from sqlmodel import Session
+from starlette.concurrency import run_in_threadpool
 
 from auth.basic import verify_credentials
 from config.database.db import get_session
-from config.database.models import Item, ItemHistory, Section, User
-from config.database.queries import find_item_by_name, find_section_by_name
+from config.database.models import User
+from config.settings import (
+    LLM_COALESCE_MAX_DICTATIONS,
+    LLM_COALESCE_WINDOW_MS,
+    LLM_MAX_CONCURRENT,
+    LLM_MAX_CONCURRENT_PER_USER,
+    LLM_MAX_QUEUE,
+    LLM_PROMPT_VERSION,
+    LLM_QUEUE_TIMEOUT,
+)
+from utils.admission import AdmissionController, AdmissionRejected
+from utils.coalescing import RequestCoalescer
+from utils.commands import CommandBatch, apply_commands
+from utils.idempotency import IdempotencyConflict, request_fingerprint, run_idempotent
 from utils.llm import prompt
-from utils.parsers import parse_llm_commands
+from utils.parsers import parse_llm_commands, split_by_dictation
+from utils.prompts import build_prompt
+from utils.templates import render_component
+from utils.versioning import bump_inventory_version, get_inventory_version
 
 router = APIRouter(prefix="/process", tags=["process"])
 
-def get_templates():
-    from fastapi.templating import Jinja2Templates
-    return Jinja2Templates(directory="templates")
+logger = logging.getLogger("inventario.llm")
 
-
-SYSTEM_PROMPT = """Eres un asistente para gestionar inventario de alimentos.
-El usuario dictará comandos por voz para actualizar su inventario.
-
-IMPORTANTE: Cuando el usuario mencione un item, SIEMPRE usa "create_item" porque NO sabes si existe o no en la base de datos.
-
-Debes devolver un array JSON con los comandos a ejecutar. Formato:
-
-[
-  {"action": "create_item", "item": "leche", "quantity": 2, "unit": "L", "section": "refrigerador", "emoji": "🥛", "threshold": 1},
-  {"action": "create_item", "item": "huevos", "quantity": 6, "unit": "unidades", "section": "refrigerador", "emoji": "🥚", "threshold": 3},
-  {"action": "create_item", "item": "arroz", "quantity": 2, "unit": "kg", "section": "almacen 1", "emoji": "🍚", "threshold": 1}
-]
-
-Acciones disponibles:
-- create_item: SIEMPRE usa esta acción para cualquier item mencionado. Si el item ya existe, se actualizará automáticamente.
-- create_section: crea nueva sección (infiere emoji)
-- move_item: mueve un item a otra sección. Formato: {"action": "move_item", "item": "leche", "to_section": "refrigerador"}
-- change_emoji: cambia emoji de item o sección. Formato: {"action": "change_emoji", "target_type": "item", "target_name": "leche", "emoji": "🥛"} o {"action": "change_emoji", "target_type": "section", "target_name": "refrigerador", "emoji": "❄️"}
-- delete_item: elimina un item. Formato: {"action": "delete_item", "item": "leche"}
-- delete_section: elimina una sección. Formato: {"action": "delete_section", "section": "almacen 1"}
-
-Reglas:
-- SIEMPRE usa "create_item" para todos los items mencionados
-- Nombres en minúsculas sin tildes (huevos, leche, arroz, etc)
-- Inferir unidades apropiadas (kg, L, unidades, gramos, etc)
-- Emojis apropiados para cada item (🥛 leche, 🥚 huevos, 🍚 arroz, 🥖 pan, etc)
-- Secciones comunes: refrigerador, almacen 1, almacen 2, congelador, despensa
-- Threshold razonable (1-3 unidades generalmente)
-
-Responde SOLO con el JSON, sin texto adicional."""
+# Llamadas simultáneas a OpenRouter (total y por usuario) en este worker
+llm_admission = AdmissionController(
+    "llm",
+    max_concurrent=LLM_MAX_CONCURRENT,
+    max_per_user=LLM_MAX_CONCURRENT_PER_USER,
+    max_queue=LLM_MAX_QUEUE,
+    queue_timeout=LLM_QUEUE_TIMEOUT,
+)
 
 
 @router.post("/text", response_class=HTMLResponse)
@@ -55,266 +47,219 @@ async def process_text(
     request: Request,
     text: str = Form(...),
     context: str = Form(None),
+    idempotency_key: str = Form(None),
     user: User = Depends(verify_credentials),
     session: Session = Depends(get_session),
 ):
     """Procesa texto dictado y ejecuta comandos LLM"""
 
-    # Preparar contexto para el LLM
-    context_info = ""
-    if context:
-        try:
-            import json
-            context_data = json.loads(context)
-            sections_list = ", ".join([s['name'] for s in context_data.get('sections', [])])
-            items_list = ", ".join([i['name'] for i in context_data.get('items', [])])
-            context_info = f"\n\nContexto actual del inventario:\n- Secciones disponibles: {sections_list}\n- Items existentes: {items_list}"
-        except:
-            pass  # Si falla el parseo, continuar sin contexto
-
-    # Llamar LLM con contexto
-    llm_input = f"{SYSTEM_PROMPT}{context_info}\n\nUsuario dice: {text}"
-    print(f"[LLM] Input: {llm_input}")
-    llm_response = prompt(llm_input)
+    # Idempotency-Key (header o campo del form): reintentos del mismo dictado
+    # comparten una sola ejecución y reciben la respuesta original
+    key = request.headers.get("Idempotency-Key") or idempotency_key
+    if not key:
+        response = await execute_text(text, context, user, session)
+        session.commit()
+        return response
+
+    try:
+        return await run_idempotent(
+            session,
+            str(user.id),
+            key,
+            request_fingerprint(text, context),
+            lambda: execute_text(text, context, user, session),
+        )
+    except IdempotencyConflict as conflict:
+        return HTMLResponse(
+            render_component("ui/Feedback", changes=[], errors=[conflict.message]),
+            status_code=conflict.status_code,
+        )
+
+
+class Dictation:
+    """Un dictado esperando su interpretación (puede compartir llamada con otros)"""
+
+    __slots__ = ("text", "context", "user_id", "household_id")
+
+    def __init__(self, text: str, context: str | None, user_id: int, household_id: int):
+        self.text = text
+        self.context = context
+        self.user_id = user_id
+        self.household_id = household_id
+
+
+async def interpret_dictations(dictations: list[Dictation]) -> list[tuple[str, list[dict], int]]:
+    """
+    Una llamada al LLM para uno o más dictados del mismo usuario.
+
+    Devuelve, por dictado, la respuesta cruda, sus comandos y el total de
+    comandos de la llamada.
+    """
+    first = dictations[0]
+    # El contexto más reciente que mandó el cliente
+    context = next((d.context for d in reversed(dictations) if d.context), None)
+    built = build_prompt(LLM_PROMPT_VERSION, [d.text for d in dictations], context)
+
+    print(f"[LLM] Input (prompt v{built.version}): {built.text}")
+    async with llm_admission.admit(first.user_id):
+        # En el threadpool: la llamada HTTP no bloquea el event loop
+        llm_response = await run_in_threadpool(prompt, built, first.household_id)
     print(f"[LLM] Response: {llm_response}")
 
-    # Parsear comandos
     commands = parse_llm_commands(llm_response)
+    if len(dictations) == 1:
+        return [(llm_response, commands, len(commands))]
+    parts = split_by_dictation(commands, [d.text for d in dictations])
+    return [(llm_response, part, len(commands)) for part in parts]
+
+
+# Dictados seguidos de un usuario comparten una llamada (desactivado con ventana 0)
+dictation_coalescer = RequestCoalescer(
+    "llm",
+    window=LLM_COALESCE_WINDOW_MS / 1000,
+    max_size=LLM_COALESCE_MAX_DICTATIONS,
+    run=interpret_dictations,
+)
+
+
+async def execute_text(
+    text: str, context: str | None, user: User, session: Session
+) -> HTMLResponse:
+    """Llama al LLM y aplica sus comandos; deja los cambios sin confirmar (commit del caller)"""
+
+    try:
+        llm_response, commands, call_commands = await dictation_coalescer.submit(
+            user.id, Dictation(text, context, user.id, user.household_id)
+        )
+    except AdmissionRejected as rejected:
+        logger.warning(
+            orjson.dumps(
+                {
+                    "event": "llm_rejected",
+                    "reason": rejected.reason,
+                    "retry_after": rejected.retry_after,
+                    "user_id": user.id,
+                }
+            ).decode()
+        )
+        return busy_response(rejected)
     print(f"[LLM] Parsed commands: {commands}")
 
     if not commands:
         error_msg = "No se pudieron entender los comandos. Intenta ser más específico."
-        if llm_response:
+        if call_commands:
+            # Agrupado con otros dictados que se llevaron todos los comandos
+            error_msg = "Este dictado no agregó cambios a los de tus mensajes anteriores."
+        elif llm_response:
             error_msg = f"Error parseando respuesta del LLM. Ver logs del servidor para detalles."
             print(f"[ERROR] No se pudieron parsear comandos de la respuesta: {llm_response}")
 
-        # Lazy import catalog
-        def get_catalog():
-            import jinjax
-            from fastapi.templating import Jinja2Templates
-            templates = Jinja2Templates(directory="templates")
-            if "catalog" not in templates.env.globals:
-                catalog = jinjax.Catalog(jinja_env=templates.env)
-                catalog.add_folder("components")
-                templates.env.globals["catalog"] = catalog
-            return templates.env.globals["catalog"]
-
         return HTMLResponse(
-            get_catalog().render("ui/Feedback", changes=[], errors=[error_msg])
+            render_component("ui/Feedback", changes=[], errors=[error_msg])
         )
 
     # Ejecutar comandos
-    changes = []
-    errors = []
-
-    for cmd in commands:
-        try:
-            action = cmd.get("action")
-
-            if action == "add":
-                item = find_item_by_name(session, cmd["item"])
-                if item:
-                    old_qty = item.quantity
-                    item.quantity += cmd["quantity"]
-                    item.updated_at = datetime.utcnow()
-
-                    # Guardar en historial
-                    session.add(ItemHistory(item_id=item.id, quantity=item.quantity))
-
-                    changes.append(
-                        f"Agregado: {item.name} {old_qty} → {item.quantity} {item.unit}"
-                    )
-                else:
-                    errors.append(f"Item '{cmd['item']}' no existe (usar create_item)")
-
-            elif action == "set":
-                item = find_item_by_name(session, cmd["item"])
-                if item:
-                    old_qty = item.quantity
-                    item.quantity = cmd["quantity"]
-                    item.updated_at = datetime.utcnow()
-
-                    # Guardar en historial
-                    session.add(ItemHistory(item_id=item.id, quantity=item.quantity))
-
-                    changes.append(
-                        f"Actualizado: {item.name} {old_qty} → {item.quantity} {item.unit}"
-                    )
-                else:
-                    errors.append(f"Item '{cmd['item']}' no existe")
-
-            elif action == "remove":
-                item = find_item_by_name(session, cmd["item"])
-                if item:
-                    session.delete(item)
-                    changes.append(f"Eliminado: {item.name}")
-                else:
-                    errors.append(f"Item '{cmd['item']}' no existe")
-
-            elif action == "create_item":
-                # Buscar si el item ya existe
-                existing_item = find_item_by_name(session, cmd["item"])
-
-                if existing_item:
-                    # Actualizar item existente
-                    old_qty = existing_item.quantity
-                    existing_item.quantity = cmd.get("quantity", existing_item.quantity)
-                    existing_item.updated_at = datetime.utcnow()
-
-                    # Guardar en historial
-                    session.add(ItemHistory(item_id=existing_item.id, quantity=existing_item.quantity))
-
-                    changes.append(
-                        f"Actualizado: {existing_item.emoji} {existing_item.name} {old_qty} → {existing_item.quantity} {existing_item.unit}"
-                    )
-                else:
-                    # Buscar sección
-                    section_name = cmd.get("section", "almacen 1")
-                    section = find_section_by_name(session, section_name)
-
-                    if not section:
-                        # Crear sección si no existe
-                        section = Section(
-                            name=section_name.title(),
-                            emoji=cmd.get("section_emoji", "📦"),
-                        )
-                        session.add(section)
-                        session.flush()
-
-                    # Crear item nuevo
-                    new_item = Item(
-                        name=cmd["item"],
-                        emoji=cmd.get("emoji", "🍽️"),
-                        quantity=cmd.get("quantity", 0),
-                        unit=cmd.get("unit", "unidades"),
-                        threshold=cmd.get("threshold", 1),
-                        section_id=section.id,
-                    )
-                    session.add(new_item)
-                    session.flush()  # Para obtener el ID del nuevo item
-
-                    # Guardar en historial
-                    session.add(ItemHistory(item_id=new_item.id, quantity=new_item.quantity))
-
-                    changes.append(
-                        f"Creado: {new_item.emoji} {new_item.name} ({new_item.quantity} {new_item.unit}) en {section.name}"
-                    )
-
-            elif action == "create_section":
-                section_name = cmd.get("section", "")
-                existing = find_section_by_name(session, section_name)
-
-                if not existing:
-                    new_section = Section(
-                        name=section_name.title(),
-                        emoji=cmd.get("emoji", "📦"),
-                    )
-                    session.add(new_section)
-                    changes.append(f"Creada sección: {new_section.emoji} {new_section.name}")
-                else:
-                    errors.append(f"Sección '{section_name}' ya existe")
-
-            elif action == "move_item":
-                item = find_item_by_name(session, cmd["item"])
-                if not item:
-                    errors.append(f"Item '{cmd['item']}' no existe")
-                else:
-                    section_name = cmd.get("to_section", "")
-                    new_section = find_section_by_name(session, section_name)
-
-                    if not new_section:
-                        errors.append(f"Sección '{section_name}' no existe")
-                    else:
-                        old_section = item.section.name
-                        item.section_id = new_section.id
-                        item.updated_at = datetime.utcnow()
-                        changes.append(
-                            f"Movido: {item.emoji} {item.name} de {old_section} → {new_section.name}"
-                        )
-
-            elif action == "change_emoji":
-                target_type = cmd.get("target_type")  # "item" o "section"
-                target_name = cmd.get("target_name", "")
-                new_emoji = cmd.get("emoji", "")
-
-                if target_type == "item":
-                    item = find_item_by_name(session, target_name)
-                    if item:
-                        old_emoji = item.emoji
-                        item.emoji = new_emoji
-                        item.updated_at = datetime.utcnow()
-                        changes.append(f"Emoji cambiado: {item.name} {old_emoji} → {new_emoji}")
-                    else:
-                        errors.append(f"Item '{target_name}' no existe")
-
-                elif target_type == "section":
-                    section = find_section_by_name(session, target_name)
-                    if section:
-                        old_emoji = section.emoji
-                        section.emoji = new_emoji
-                        changes.append(f"Emoji cambiado: {section.name} {old_emoji} → {new_emoji}")
-                    else:
-                        errors.append(f"Sección '{target_name}' no existe")
-                else:
-                    errors.append(f"target_type '{target_type}' inválido (debe ser 'item' o 'section')")
-
-            elif action == "delete_item":
-                item = find_item_by_name(session, cmd["item"])
-                if item:
-                    item_name = item.name
-                    item_emoji = item.emoji
-                    session.delete(item)
-                    changes.append(f"Eliminado: {item_emoji} {item_name}")
-                else:
-                    errors.append(f"Item '{cmd['item']}' no existe")
-
-            elif action == "delete_section":
-                section_name = cmd.get("section", "")
-                section = find_section_by_name(session, section_name)
-
-                if not section:
-                    errors.append(f"Sección '{section_name}' no existe")
-                else:
-                    # Verificar si tiene items
-                    from sqlmodel import select
-                    items_in_section = session.exec(
-                        select(Item).where(Item.section_id == section.id)
-                    ).all()
-
-                    if items_in_section:
-                        errors.append(
-                            f"No se puede eliminar '{section.name}' porque contiene {len(items_in_section)} items. Mueve o elimina los items primero."
-                        )
-                    else:
-                        section_name_display = section.name
-                        section_emoji_display = section.emoji
-                        session.delete(section)
-                        changes.append(f"Eliminada sección: {section_emoji_display} {section_name_display}")
-
-        except Exception as e:
-            errors.append(f"Error en comando {cmd}: {str(e)}")
-
-    # Commit cambios
-    session.commit()
-
-    # Lazy import catalog
-    def get_catalog():
-        import jinjax
-        from fastapi.templating import Jinja2Templates
-        templates = Jinja2Templates(directory="templates")
-        if "catalog" not in templates.env.globals:
-            catalog = jinjax.Catalog(jinja_env=templates.env)
-            catalog.add_folder("components")
-            templates.env.globals["catalog"] = catalog
-        return templates.env.globals["catalog"]
+    results = apply_commands(session, commands, user.household_id)
+    changes = [result.message for result in results if result.ok]
+    errors = [result.message for result in results if not result.ok]
+
+    # La versión del hogar sube en la misma transacción que los cambios
+    version = bump_inventory_version(session, user.household_id) if changes else None
+    session.flush()
 
     # Retornar feedback HTML con evento HTMX para invalidar cache
     response = HTMLResponse(
-        get_catalog().render("ui/Feedback", changes=changes, errors=errors)
+        render_component("ui/Feedback", changes=changes, errors=errors)
     )
 
     # Si hubo cambios exitosos, disparar evento para invalidar cache del inventario
     if changes:
         response.headers["HX-Trigger"] = "inventoryUpdated"
+    response.headers["X-Inventory-Version"] = (
+        str(version) if version else get_inventory_version(user.household_id)
+    )
 
     return response
+
+
+@router.post("/batch")
+async def process_batch(
+    request: Request,
+    batch: CommandBatch,
+    user: User = Depends(verify_credentials),
+    session: Session = Depends(get_session),
+):
+    """
+    Aplica comandos JSON validados sin pasar por el LLM (escáneres, importadores,
+    automatizaciones). Mismo vocabulario que el dictado, una sola transacción.
+    """
+    commands = [command.model_dump(exclude_none=True) for command in batch.commands]
+
+    key = request.headers.get("Idempotency-Key")
+    if not key:
+        response = await execute_batch(commands, batch.atomic, user.household_id, session)
+        session.commit()
+        return response
+
+    try:
+        return await run_idempotent(
+            session,
+            str(user.id),
+            key,
+            request_fingerprint(orjson.dumps(commands).decode(), str(batch.atomic)),
+            lambda: execute_batch(commands, batch.atomic, user.household_id, session),
+        )
+    except IdempotencyConflict as conflict:
+        return ORJSONResponse({"detail": conflict.message}, status_code=conflict.status_code)
+
+
+async def execute_batch(
+    commands: list[dict], atomic: bool, household_id: int, session: Session
+) -> ORJSONResponse:
+    """Aplica el lote y arma la respuesta con un resultado por comando (commit del caller)"""
+    results = apply_commands(session, commands, household_id)
+    failed = sum(1 for result in results if not result.ok)
+
+    if atomic and failed:
+        session.rollback()
+        return ORJSONResponse(
+            {
+                "applied": 0,
+                "failed": failed,
+                "version": get_inventory_version(household_id),
+                "results": [result.to_dict() for result in results],
+            },
+            status_code=422,
+        )
+
+    applied = len(results) - failed
+    version = bump_inventory_version(session, household_id) if applied else None
+    session.flush()
+
+    version_header = str(version) if version else get_inventory_version(household_id)
+    response = ORJSONResponse(
+        {
+            "applied": applied,
+            "failed": failed,
+            "version": version_header,
+            "results": [result.to_dict() for result in results],
+        }
+    )
+    response.headers["X-Inventory-Version"] = version_header
+    return response
+
+
+def busy_response(rejected: AdmissionRejected) -> HTMLResponse:
+    """429 con Retry-After y un Feedback legible (el outbox del SW reintenta solo)"""
+    return HTMLResponse(
+        render_component(
+            "ui/Feedback",
+            changes=[],
+            errors=[
+                "Hay muchos pedidos en proceso. "
+                f"Intenta de nuevo en {rejected.retry_after} segundos."
+            ],
+        ),
+        status_code=429,
+        headers={"Retry-After": str(rejected.retry_after)},
+    )
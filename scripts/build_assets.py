@@ -0,0 +1,134 @@
+"""
+Paso de build de assets estáticos.
+
+1. Fingerprint: copia cada asset a `nombre.<hash>.ext` y escribe
+   `static/asset-manifest.json` (ruta lógica -> ruta con hash + versión global),
+   que usan `asset_url()` en los templates y el service worker.
+2. Precompresión: genera variantes .br y .gz de los assets de texto.
+
+Uso:
+    python -m scripts.build_assets [--static-dir static]
+"""
+
+import argparse
+import gzip
+import hashlib
+import json
+import re
+from pathlib import Path
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+MANIFEST_NAME = "asset-manifest.json"
+
+# No se fingerprintean: el SW necesita URL estable y input.css es fuente de Tailwind
+FINGERPRINT_EXCLUDE = {"sw.js", MANIFEST_NAME, "css/input.css"}
+FINGERPRINT_SKIP_SUFFIXES = {".md", ".br", ".gz"}
+
+# Copias ya generadas: nombre.<10 hex>.ext
+HASHED_NAME_RE = re.compile(r"\.[0-9a-f]{10}\.[^./]+$")
+
+HASH_LENGTH = 10
+
+# Solo tiene sentido precomprimir formatos de texto
+COMPRESSIBLE_SUFFIXES = {".css", ".js", ".svg", ".json", ".html", ".txt", ".map"}
+
+# Archivos muy pequeños no ganan nada comprimidos
+MIN_SIZE = 256
+
+
+def iter_source_assets(static_dir: Path):
+    """Recorre los assets originales que deben llevar fingerprint"""
+    for path in sorted(static_dir.rglob("*")):
+        if not path.is_file():
+            continue
+        relative = path.relative_to(static_dir).as_posix()
+        if relative in FINGERPRINT_EXCLUDE or path.suffix in FINGERPRINT_SKIP_SUFFIXES:
+            continue
+        if HASHED_NAME_RE.search(path.name):
+            continue
+        yield path
+
+
+def remove_stale_copies(static_dir: Path):
+    """Borra copias con hash y variantes comprimidas de builds anteriores"""
+    for path in list(static_dir.rglob("*")):
+        if not path.is_file():
+            continue
+        name = path.name.removesuffix(".br").removesuffix(".gz")
+        if HASHED_NAME_RE.search(name) or path.suffix in (".br", ".gz"):
+            path.unlink()
+
+
+def fingerprint(static_dir: Path) -> dict:
+    """Crea las copias con hash y devuelve el manifest"""
+    assets = {}
+    digest = hashlib.sha256()
+
+    for path in iter_source_assets(static_dir):
+        data = path.read_bytes()
+        content_hash = hashlib.sha256(data).hexdigest()[:HASH_LENGTH]
+        hashed = path.with_name(f"{path.stem}.{content_hash}{path.suffix}")
+        hashed.write_bytes(data)
+
+        relative = path.relative_to(static_dir).as_posix()
+        assets[relative] = hashed.relative_to(static_dir).as_posix()
+        digest.update(f"{relative}:{content_hash}\n".encode())
+
+    # El SW también forma parte de la versión: cambiarlo debe invalidar su cache
+    sw_path = static_dir / "sw.js"
+    if sw_path.exists():
+        digest.update(sw_path.read_bytes())
+
+    return {"version": digest.hexdigest()[:HASH_LENGTH], "assets": assets}
+
+
+def iter_compressible(static_dir: Path):
+    """Recorre los assets comprimibles (ignora variantes ya generadas)"""
+    for path in sorted(static_dir.rglob("*")):
+        if path.is_file() and path.suffix in COMPRESSIBLE_SUFFIXES:
+            yield path
+
+
+def precompress(path: Path) -> list[Path]:
+    """Escribe path.gz y path.br si reducen el tamaño; devuelve los archivos escritos"""
+    data = path.read_bytes()
+    if len(data) < MIN_SIZE:
+        return []
+
+    variants = [(path.with_name(path.name + ".gz"), gzip.compress(data, 9, mtime=0))]
+    if brotli is not None:
+        variants.append((path.with_name(path.name + ".br"), brotli.compress(data, quality=11)))
+
+    written = []
+    for target, compressed in variants:
+        if len(compressed) < len(data):
+            target.write_bytes(compressed)
+            written.append(target)
+    return written
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fingerprint y precompresión de assets")
+    parser.add_argument("--static-dir", default="static", type=Path)
+    args = parser.parse_args()
+
+    remove_stale_copies(args.static_dir)
+
+    manifest = fingerprint(args.static_dir)
+    (args.static_dir / MANIFEST_NAME).write_text(json.dumps(manifest, indent=2))
+    print(f"[OK] {len(manifest['assets'])} assets con fingerprint (versión {manifest['version']})")
+
+    if brotli is None:
+        print("[WARN] brotli no instalado: solo se generan variantes .gz")
+
+    for path in iter_compressible(args.static_dir):
+        for target in precompress(path):
+            print(f"[OK] {target} ({target.stat().st_size} bytes)")
+
+
+if __name__ == "__main__":
+    main()
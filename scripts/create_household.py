@@ -0,0 +1,54 @@
+"""
+Alta de un hogar nuevo: el hogar, su usuario y las secciones por defecto.
+
+Cada hogar ve solo su inventario; varios hogares comparten la misma app y la
+misma base. Usa la base configurada por DATABASE_URL / USE_SQLITE.
+
+Uso:
+    python -m scripts.create_household --name "Familia Pérez" --username perez --password secreto
+"""
+
+import argparse
+
+from sqlmodel import Session, select
+
+from config.database.db import default_sections, engine, init_db
+from config.database.models import Household, Section, User
+from utils.versioning import AUTH_VERSION_KEY, bump_version
+
+
+def create_household(name: str, username: str, password: str) -> int:
+    """Crea el hogar con su usuario y secciones en una transacción; devuelve el id del hogar"""
+    import bcrypt
+
+    with Session(engine) as session:
+        if session.exec(select(User.id).where(User.username == username)).first() is not None:
+            raise SystemExit(f"[ERROR] El usuario '{username}' ya existe")
+
+        household = Household(name=name)
+        session.add(household)
+        session.flush()
+
+        password_hash = bcrypt.hashpw(password.encode(), bcrypt.gensalt()).decode()
+        session.add(User(username=username, password_hash=password_hash, household_id=household.id))
+        session.add_all(Section(**section) for section in default_sections(household.id))
+        # Invalida los logins cacheados en los workers en marcha
+        bump_version(session, AUTH_VERSION_KEY)
+        session.commit()
+        return household.id
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Crea un hogar con su usuario")
+    parser.add_argument("--name", required=True, help="nombre del hogar")
+    parser.add_argument("--username", required=True)
+    parser.add_argument("--password", required=True)
+    args = parser.parse_args()
+
+    init_db()
+    household_id = create_household(args.name, args.username, args.password)
+    print(f"[OK] Hogar '{args.name}' creado (id {household_id}), usuario '{args.username}'")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,263 @@
+"""
+Generador de inventarios sintéticos a escala para benchmarks.
+
+Crea N secciones, miles de items y millones de filas de ItemHistory con
+timestamps realistas (consumo gradual + reposiciones periódicas), insertadas
+en bloque con executemany por chunks. Funciona con SQLite y PostgreSQL.
+
+Uso:
+    python -m scripts.generate_data --database-url sqlite:///./bench.db \\
+        --sections 12 --items 10000 --history-per-item 200 --reset
+"""
+
+import argparse
+import math
+import os
+import random
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import delete, event, insert
+from sqlmodel import Session, create_engine
+
+from config.database.migrations import SCHEMA_VERSION_KEY, ensure_schema, read_meta
+from config.database.models import (
+    DEFAULT_HOUSEHOLD_ID,
+    DEFAULT_HOUSEHOLD_NAME,
+    Household,
+    Item,
+    ItemHistory,
+    Section,
+)
+
+# (nombre, emoji, unidad, cantidad típica, umbral)
+FOODS = [
+    ("leche", "🥛", "L", 4, 1),
+    ("huevos", "🥚", "unidades", 12, 3),
+    ("arroz", "🍚", "kg", 5, 1),
+    ("pan", "🥖", "unidades", 6, 2),
+    ("queso", "🧀", "gramos", 500, 100),
+    ("manzanas", "🍎", "unidades", 10, 3),
+    ("platanos", "🍌", "unidades", 8, 2),
+    ("tomates", "🍅", "unidades", 8, 2),
+    ("papas", "🥔", "kg", 5, 1),
+    ("cebollas", "🧅", "unidades", 6, 2),
+    ("pasta", "🍝", "gramos", 1000, 250),
+    ("aceite", "🫒", "L", 2, 0.5),
+    ("azucar", "🍬", "kg", 2, 0.5),
+    ("cafe", "☕", "gramos", 500, 100),
+    ("yogur", "🥣", "unidades", 8, 2),
+    ("pollo", "🍗", "kg", 2, 0.5),
+    ("zanahorias", "🥕", "unidades", 10, 3),
+    ("lentejas", "🫘", "kg", 2, 0.5),
+    ("atun", "🐟", "latas", 6, 2),
+    ("mantequilla", "🧈", "gramos", 250, 50),
+]
+
+VARIANTS = ["", "entera", "descremada", "integral", "organica", "grande", "chica", "light"]
+
+SECTIONS = [
+    ("Refrigerador", "🧊"),
+    ("Almacén 1", "📦"),
+    ("Almacén 2", "🏺"),
+    ("Congelador", "❄️"),
+    ("Despensa", "🥫"),
+    ("Frutero", "🧺"),
+    ("Bodega", "🏚️"),
+    ("Alacena", "🗄️"),
+]
+
+
+def section_rows(n_sections: int, now: datetime) -> list[dict]:
+    rows = []
+    for i in range(n_sections):
+        name, emoji = SECTIONS[i % len(SECTIONS)]
+        if i >= len(SECTIONS):
+            name = f"{name} {i // len(SECTIONS) + 1}"
+        rows.append({"id": i + 1, "name": name, "emoji": emoji, "created_at": now})
+    return rows
+
+
+def item_rows(n_items: int, n_sections: int, rng: random.Random, now: datetime) -> list[dict]:
+    rows = []
+    for i in range(n_items):
+        food, emoji, unit, typical, threshold = FOODS[i % len(FOODS)]
+        variant = VARIANTS[(i // len(FOODS)) % len(VARIANTS)]
+        serial = i // (len(FOODS) * len(VARIANTS))
+        name = " ".join(part for part in (food, variant, str(serial) if serial else "") if part)
+        rows.append(
+            {
+                "id": i + 1,
+                "name": name,
+                "emoji": emoji,
+                "quantity": 0.0,
+                "unit": unit,
+                "threshold": threshold,
+                "section_id": rng.randrange(n_sections) + 1,
+                "updated_at": now,
+                "_typical": typical,
+            }
+        )
+    return rows
+
+
+def history_for_item(
+    item: dict, n_rows: int, start: datetime, now: datetime, rng: random.Random
+) -> list[dict]:
+    """
+    Serie temporal de cantidades: consumo gradual con reposiciones cuando el
+    stock baja del umbral. Los intervalos entre cambios son exponenciales
+    (eventos de Poisson) y se concentran en horario diurno.
+    """
+    span = (now - start).total_seconds()
+    mean_gap = span / max(n_rows, 1)
+    typical = item["_typical"]
+
+    rows = []
+    quantity = typical
+    ts = start + timedelta(seconds=rng.expovariate(1 / mean_gap))
+    for _ in range(n_rows):
+        if ts >= now:
+            break
+        # Horario diurno (8:00-23:00)
+        if ts.hour < 8:
+            ts = ts.replace(hour=8 + rng.randrange(4), minute=rng.randrange(60))
+
+        if quantity <= item["threshold"] or rng.random() < 0.08:
+            quantity += typical * rng.uniform(0.5, 1.5)
+        else:
+            quantity = max(0.0, quantity - typical * rng.uniform(0.05, 0.3))
+        quantity = round(quantity, 2)
+
+        rows.append({"item_id": item["id"], "quantity": quantity, "changed_at": ts})
+        ts += timedelta(seconds=rng.expovariate(1 / mean_gap))
+
+    if rows:
+        item["quantity"] = rows[-1]["quantity"]
+        item["updated_at"] = rows[-1]["changed_at"]
+    else:
+        item["quantity"] = float(typical)
+    return rows
+
+
+def tune_sqlite_for_bulk_load(engine):
+    """Desactiva fsync durante la carga masiva (solo SQLite)"""
+
+    @event.listens_for(engine, "connect")
+    def _pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute("PRAGMA synchronous=OFF")
+        cursor.close()
+
+
+def generate(
+    database_url: str,
+    n_sections: int,
+    n_items: int,
+    history_per_item: int,
+    days: int,
+    chunk_size: int,
+    seed: int,
+    reset: bool,
+) -> dict:
+    rng = random.Random(seed)
+    engine = create_engine(database_url)
+    if engine.dialect.name == "sqlite":
+        tune_sqlite_for_bulk_load(engine)
+    # Mismo schema que la app (índice de búsqueda, schema_version incluidos)
+    ensure_schema(engine, read_meta(engine, (SCHEMA_VERSION_KEY,)))
+
+    now = datetime.utcnow()
+    start = now - timedelta(days=days)
+    started = time.perf_counter()
+    history_total = 0
+
+    with Session(engine) as session:
+        if reset:
+            session.execute(delete(ItemHistory))
+            session.execute(delete(Item))
+            session.execute(delete(Section))
+            session.commit()
+
+        # Todo va al hogar por defecto (la FK de PostgreSQL exige que exista)
+        if session.get(Household, DEFAULT_HOUSEHOLD_ID) is None:
+            session.add(Household(id=DEFAULT_HOUSEHOLD_ID, name=DEFAULT_HOUSEHOLD_NAME))
+            session.flush()
+        session.execute(insert(Section), section_rows(n_sections, now))
+
+        items = item_rows(n_items, n_sections, rng, now)
+        inserted = 0  # items[:inserted] ya están en la DB
+        pending: list[dict] = []
+        for index, item in enumerate(items):
+            # Número de filas por item con cola larga: pocos items muy activos
+            n_rows = max(1, int(rng.lognormvariate(math.log(history_per_item), 0.6)))
+            pending.extend(history_for_item(item, n_rows, start, now, rng))
+
+            if len(pending) < chunk_size and index < len(items) - 1:
+                continue
+
+            # Items primero: la FK de item_history debe existir en PostgreSQL
+            session.execute(insert(Item), [public_fields(i) for i in items[inserted : index + 1]])
+            inserted = index + 1
+            if pending:
+                session.execute(insert(ItemHistory), pending)
+            session.commit()
+            history_total += len(pending)
+            pending = []
+            print(f"[..] {inserted}/{n_items} items, {history_total} filas de historial")
+
+    if engine.dialect.name == "postgresql":
+        # Los ids se insertaron explícitamente: reajustar las secuencias
+        with engine.begin() as conn:
+            for table in ("household", "section", "item", "itemhistory"):
+                conn.exec_driver_sql(
+                    f"SELECT setval(pg_get_serial_sequence('{table}', 'id'), "
+                    f"COALESCE((SELECT MAX(id) FROM {table}), 1))"
+                )
+
+    engine.dispose()
+    return {
+        "sections": n_sections,
+        "items": n_items,
+        "history_rows": history_total,
+        "seconds": round(time.perf_counter() - started, 2),
+    }
+
+
+def public_fields(item: dict) -> dict:
+    """Fila de item sin las claves auxiliares del generador (prefijo _)"""
+    return {k: v for k, v in item.items() if not k.startswith("_")}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Genera un inventario sintético a escala")
+    parser.add_argument(
+        "--database-url", default=os.getenv("DATABASE_URL", "sqlite:///./bench.db")
+    )
+    parser.add_argument("--sections", type=int, default=12)
+    parser.add_argument("--items", type=int, default=10_000)
+    parser.add_argument(
+        "--history-per-item", type=int, default=200, help="media de filas de historial por item"
+    )
+    parser.add_argument("--days", type=int, default=365, help="días de historial")
+    parser.add_argument("--chunk-size", type=int, default=50_000)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--reset", action="store_true", help="borra items/secciones/historial")
+    args = parser.parse_args()
+
+    summary = generate(
+        args.database_url,
+        args.sections,
+        args.items,
+        args.history_per_item,
+        args.days,
+        args.chunk_size,
+        args.seed,
+        args.reset,
+    )
+    print(f"[OK] {summary}")
+
+
+if __name__ == "__main__":
+    main()
@@ -3,30 +3,92 @@
  * Busca "LAZY_LOADING_SYSTEM" en el código para encontrar implementaciones
  */
 
-// LAZY_LOADING_SYSTEM: Modal Cache Manager
+// LAZY_LOADING_SYSTEM: Configuración
+const LAZY_LOADING_CONFIG = {
+    modalCacheMaxBytes: 2 * 1024 * 1024,  // ~2 MB de HTML cacheado como máximo
+    prefetchBatchSize: 10,                // IDs por llamada a batch-history-views
+    prefetchMaxConcurrent: 2,             // Llamadas batch simultáneas
+    prefetchIdleTimeout: 2000             // ms máximos esperando un hueco idle
+};
+
+// LAZY_LOADING_SYSTEM: Versión del inventario (header X-Inventory-Version)
+let inventoryVersion = null;
+
+function updateInventoryVersion(version) {
+    if (version && version !== inventoryVersion) {
+        console.log(`[LAZY_LOADING_SYSTEM] Inventory version: ${version}`);
+        inventoryVersion = version;
+    }
+}
+
+// LAZY_LOADING_SYSTEM: Modal Cache Manager (LRU acotado por bytes)
+// Map mantiene el orden de inserción: la primera clave es la menos usada
 const ModalCache = {
-    cache: {},
+    entries: new Map(),
+    bytes: 0,
+    maxBytes: LAZY_LOADING_CONFIG.modalCacheMaxBytes,
+
+    // Strings JS son UTF-16: ~2 bytes por carácter
+    sizeOf(html) {
+        return html.length * 2;
+    },
+
+    save(modalId, html, version = inventoryVersion) {
+        const size = this.sizeOf(html);
+        if (size > this.maxBytes) {
+            console.log(`[MODAL_CACHE] Too large, not caching: ${modalId}`);
+            return;
+        }
 
-    save(modalId, html) {
         console.log(`[MODAL_CACHE] Saving: ${modalId}`);
         // NO remover triggers de intersect - los necesitamos para infinite scroll del historial
-        this.cache[modalId] = html;
+        this.invalidate(modalId);
+        this.entries.set(modalId, { html, size, version });
+        this.bytes += size;
+        this.evict();
     },
 
     get(modalId) {
-        const cached = this.cache[modalId];
-        console.log(`[MODAL_CACHE] ${cached ? 'Hit' : 'Miss'}: ${modalId}`);
-        return cached;
+        const entry = this.entries.get(modalId);
+        if (entry && entry.version !== inventoryVersion) {
+            console.log(`[MODAL_CACHE] Stale (version ${entry.version}): ${modalId}`);
+            this.invalidate(modalId);
+            return undefined;
+        }
+        if (entry) {
+            // Marcar como usado recientemente
+            this.entries.delete(modalId);
+            this.entries.set(modalId, entry);
+        }
+        console.log(`[MODAL_CACHE] ${entry ? 'Hit' : 'Miss'}: ${modalId}`);
+        return entry && entry.html;
+    },
+
+    has(modalId) {
+        const entry = this.entries.get(modalId);
+        return Boolean(entry && entry.version === inventoryVersion);
     },
 
     invalidate(modalId) {
-        console.log(`[MODAL_CACHE] Invalidating: ${modalId}`);
-        delete this.cache[modalId];
+        const entry = this.entries.get(modalId);
+        if (entry) {
+            this.entries.delete(modalId);
+            this.bytes -= entry.size;
+        }
+    },
+
+    evict() {
+        while (this.bytes > this.maxBytes && this.entries.size > 0) {
+            const oldest = this.entries.keys().next().value;
+            console.log(`[MODAL_CACHE] Evicting: ${oldest}`);
+            this.invalidate(oldest);
+        }
     },
 
     clear() {
         console.log(`[MODAL_CACHE] Clearing all`);
-        this.cache = {};
+        this.entries.clear();
+        this.bytes = 0;
     }
 };
 
@@ -64,57 +126,140 @@ function closeHistoryModal() {
     modal.innerHTML = '';
 }
 
-// LAZY_LOADING_SYSTEM: Track preloading to avoid duplicates
-const preloadingSet = new Set();
+// LAZY_LOADING_SYSTEM: Prefetch scheduler
+// Solo precarga historiales de items visibles en pantalla, en huecos idle del
+// navegador, agrupados en batches y con un máximo de llamadas simultáneas.
+const requestIdle = window.requestIdleCallback
+    ? (cb) => window.requestIdleCallback(cb, { timeout: LAZY_LOADING_CONFIG.prefetchIdleTimeout })
+    : (cb) => setTimeout(cb, 200);
 
-// LAZY_LOADING_SYSTEM: Preload visible item histories (BATCH)
-function preloadVisibleHistories() {
-    const itemCards = document.querySelectorAll('#items-container .bg-white');
-    console.log(`[LAZY_LOADING_SYSTEM] Found ${itemCards.length} item cards to preload`);
-
-    // Recolectar IDs que necesitan precarga
-    const idsToPreload = [];
-    itemCards.forEach((card) => {
-        const button = card.querySelector('button[onclick^="openHistoryModal"]');
-        if (button) {
-            const match = button.getAttribute('onclick').match(/openHistoryModal\((\d+)\)/);
-            if (match) {
-                const itemId = match[1];
-                // Skip if already cached or currently preloading
-                if (!ModalCache.get(`history-${itemId}`) && !preloadingSet.has(itemId)) {
-                    idsToPreload.push(itemId);
-                    preloadingSet.add(itemId);
+const PrefetchScheduler = {
+    visible: new Set(),    // IDs visibles pendientes de precarga
+    inFlight: new Set(),   // IDs en una llamada batch en curso
+    activeRequests: 0,
+    idleScheduled: false,
+    observer: null,
+
+    init() {
+        if (this.observer || !('IntersectionObserver' in window)) {
+            return;
+        }
+        this.observer = new IntersectionObserver((entries) => {
+            entries.forEach((entry) => {
+                const itemId = entry.target.dataset.historyItemId;
+                if (entry.isIntersecting) {
+                    this.visible.add(itemId);
+                } else {
+                    this.visible.delete(itemId);
                 }
+            });
+            this.schedule();
+        });
+    },
+
+    observe(root = document) {
+        this.init();
+        const buttons = root.querySelectorAll('#items-container [data-history-item-id]');
+        console.log(`[LAZY_LOADING_SYSTEM] Observing ${buttons.length} item cards for preload`);
+        if (!this.observer) {
+            return;
+        }
+        buttons.forEach((button) => this.observer.observe(button));
+    },
+
+    reset() {
+        if (this.observer) {
+            this.observer.disconnect();
+        }
+        this.visible.clear();
+    },
+
+    schedule() {
+        if (this.idleScheduled || this.visible.size === 0) {
+            return;
+        }
+        this.idleScheduled = true;
+        requestIdle(() => {
+            this.idleScheduled = false;
+            this.flush();
+        });
+    },
+
+    flush() {
+        while (this.activeRequests < LAZY_LOADING_CONFIG.prefetchMaxConcurrent) {
+            const batch = this.nextBatch();
+            if (batch.length === 0) {
+                return;
             }
+            this.fetchBatch(batch);
         }
-    });
+        // Quedan visibles pero no hay hueco: se reintenta al terminar una llamada
+    },
 
-    if (idsToPreload.length === 0) {
-        console.log('[LAZY_LOADING_SYSTEM] No items to preload');
-        return;
-    }
+    nextBatch() {
+        const batch = [];
+        for (const itemId of this.visible) {
+            this.visible.delete(itemId);
+            if (ModalCache.has(`history-${itemId}`) || this.inFlight.has(itemId)) {
+                continue;
+            }
+            batch.push(itemId);
+            if (batch.length >= LAZY_LOADING_CONFIG.prefetchBatchSize) {
+                break;
+            }
+        }
+        return batch;
+    },
+
+    fetchBatch(ids) {
+        console.log(`[LAZY_LOADING_SYSTEM] Batch preloading ${ids.length} histories:`, ids);
+        ids.forEach((id) => this.inFlight.add(id));
+        this.activeRequests += 1;
 
-    console.log(`[LAZY_LOADING_SYSTEM] Batch preloading ${idsToPreload.length} histories:`, idsToPreload);
-
-    // Hacer una sola llamada batch
-    fetch(`/inventory/api/items/batch-history-views?item_ids=${idsToPreload.join(',')}`)
-        .then(response => response.json())
-        .then(data => {
-            console.log(`[LAZY_LOADING_SYSTEM] Batch loaded ${Object.keys(data).length} histories`);
-            // Cachear cada historial
-            Object.entries(data).forEach(([itemId, html]) => {
-                ModalCache.save(`history-${itemId}`, html);
-                preloadingSet.delete(itemId);
-                console.log(`[LAZY_LOADING_SYSTEM] Cached history-${itemId}`);
+        const headers = inventoryVersion ? { 'X-Inventory-Version': inventoryVersion } : {};
+        fetch(`/inventory/api/items/batch-history-views?item_ids=${ids.join(',')}`, { headers })
+            .then((response) => {
+                updateInventoryVersion(response.headers.get('X-Inventory-Version'));
+                return response.json();
+            })
+            .then((data) => {
+                console.log(`[LAZY_LOADING_SYSTEM] Batch loaded ${Object.keys(data).length} histories`);
+                Object.entries(data).forEach(([itemId, html]) => {
+                    ModalCache.save(`history-${itemId}`, html);
+                });
+            })
+            .catch((err) => {
+                console.error(`[LAZY_LOADING_SYSTEM] Error batch preloading`, err);
+            })
+            .finally(() => {
+                ids.forEach((id) => this.inFlight.delete(id));
+                this.activeRequests -= 1;
+                this.schedule();
             });
-        })
-        .catch(err => {
-            console.error(`[LAZY_LOADING_SYSTEM] Error batch preloading`, err);
-            // Limpiar todos los IDs del set en caso de error
-            idsToPreload.forEach(id => preloadingSet.delete(id));
-        });
+    }
+};
+
+// LAZY_LOADING_SYSTEM: Preload visible item histories (idle + visibles)
+function preloadVisibleHistories() {
+    PrefetchScheduler.observe();
 }
 
+// LAZY_LOADING_SYSTEM: Track inventory version from HTMX responses
+document.body.addEventListener('htmx:afterRequest', function(evt) {
+    const xhr = evt.detail.xhr;
+    if (xhr) {
+        updateInventoryVersion(xhr.getResponseHeader('X-Inventory-Version'));
+    }
+});
+
+// LAZY_LOADING_SYSTEM: Send the last seen version so any worker serves data at
+// least as new as our own writes (the server re-reads its version if behind)
+document.body.addEventListener('htmx:configRequest', function(evt) {
+    if (inventoryVersion) {
+        evt.detail.headers['X-Inventory-Version'] = inventoryVersion;
+    }
+});
+
 // LAZY_LOADING_SYSTEM: Preload after infinite scroll
 document.body.addEventListener('htmx:afterSwap', function(evt) {
     const target = evt.detail.target;
@@ -126,16 +271,18 @@ document.body.addEventListener('htmx:afterSwap', function(evt) {
         console.log('[LAZY_LOADING_SYSTEM] Infinite scroll detected');
         const inventoryTab = document.getElementById('view-inventory');
         if (inventoryTab && !inventoryTab.classList.contains('hidden')) {
-            console.log('[LAZY_LOADING_SYSTEM] Inventory tab visible, preloading new items...');
-            setTimeout(() => preloadVisibleHistories(), 100);
+            console.log('[LAZY_LOADING_SYSTEM] Inventory tab visible, observing new items...');
+            preloadVisibleHistories();
         }
     }
 });
 
 // LAZY_LOADING_SYSTEM: Cache invalidation on inventory update
+// Las entradas de versiones anteriores se descartan al leerlas; aquí solo se
+// dejan de observar las tarjetas que van a ser reemplazadas.
 document.body.addEventListener('inventoryUpdated', function() {
-    console.log('[LAZY_LOADING_SYSTEM] Inventory updated, clearing cache');
-    ModalCache.clear();
+    console.log('[LAZY_LOADING_SYSTEM] Inventory updated, resetting prefetch');
+    PrefetchScheduler.reset();
 });
 
 // Debug helper
@@ -145,5 +292,9 @@ window.debugLazyLoading = function() {
         document.querySelectorAll('[data-lazy-type="background-preload"]').length);
     console.log('Infinite scrolls:',
         document.querySelectorAll('[data-lazy-type="infinite-scroll"]').length);
-    console.log('Cached modals:', Object.keys(ModalCache.cache));
+    console.log('Inventory version:', inventoryVersion);
+    console.log('Cached modals:', Array.from(ModalCache.entries.keys()));
+    console.log('Modal cache bytes:', ModalCache.bytes, '/', ModalCache.maxBytes);
+    console.log('Prefetch visible/in-flight:',
+        PrefetchScheduler.visible.size, PrefetchScheduler.inFlight.size);
 };
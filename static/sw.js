@@ -1,69 +1,379 @@
 // Service Worker for PWA
-const CACHE_NAME = 'inventario-alimentos-v1';
-const urlsToCache = [
+// La versión llega en la URL de registro (/sw.js?v=<versión>) y viene del
+// asset manifest generado por scripts/build_assets.py: cada deploy con assets
+// distintos instala un SW nuevo con su propio cache.
+const ASSET_VERSION = new URL(self.location.href).searchParams.get('v') || 'dev';
+const CACHE_NAME = `inventario-alimentos-${ASSET_VERSION}`;
+// El cache de datos también es por versión: un deploy nuevo empieza vacío
+const DATA_CACHE_NAME = `inventario-alimentos-data-${ASSET_VERSION}`;
+// Entrada interna del cache de datos con la cuenta (hogar:usuario) que lo llenó
+const ACCOUNT_KEY = '/__sw/account';
+const ASSET_MANIFEST_URL = '/static/asset-manifest.json';
+
+// Páginas que se precachean siempre (no tienen fingerprint)
+const APP_SHELL = [
     '/',
+    '/manifest.json'
+];
+
+// Fallback cuando no hay manifest (desarrollo sin build de assets)
+const DEV_ASSETS = [
     '/static/css/output.css',
     '/static/js/htmx.min.js',
-    '/static/icons/logo.svg',
-    '/manifest.json'
+    '/static/js/lazy-loading.js',
+    '/static/icons/logo.svg'
+];
+
+// Fragmentos de datos validados por la versión del inventario (ETag)
+const STALE_WHILE_REVALIDATE_ROUTES = [
+    /^\/inventory\/api\/items$/,
+    /^\/inventory\/api\/context$/,
+    /^\/inventory\/item\/\d+\/history-view$/,
+    /^\/inventory\/api\/item\/\d+\/history$/
 ];
 
+// Comandos dictados que se encolan si no hay conexión
+const OUTBOX_ROUTE = '/process/text';
+const OUTBOX_DB = 'inventario-outbox';
+const OUTBOX_STORE = 'commands';
+const OUTBOX_SYNC_TAG = 'process-outbox';
+
+// Lista de precache derivada del manifest de assets
+async function getPrecacheList() {
+    try {
+        const response = await fetch(ASSET_MANIFEST_URL, { cache: 'no-store' });
+        if (!response.ok) {
+            throw new Error(`HTTP ${response.status}`);
+        }
+        const manifest = await response.json();
+        const assets = Object.values(manifest.assets).map(path => `/static/${path}`);
+        return APP_SHELL.concat(assets);
+    } catch (err) {
+        console.log('Asset manifest not available, using dev assets', err);
+        return APP_SHELL.concat(DEV_ASSETS);
+    }
+}
+
 // Install event - cache assets
 self.addEventListener('install', event => {
     event.waitUntil(
-        caches.open(CACHE_NAME)
-            .then(cache => {
-                console.log('Opened cache');
+        Promise.all([caches.open(CACHE_NAME), getPrecacheList()])
+            .then(([cache, urlsToCache]) => {
+                console.log(`Opened cache ${CACHE_NAME}`);
                 return cache.addAll(urlsToCache);
             })
+            .then(() => self.skipWaiting())
     );
 });
 
-// Fetch event - serve from cache, fallback to network
+// Fetch event - estrategia según la ruta
 self.addEventListener('fetch', event => {
-    event.respondWith(
-        caches.match(event.request)
-            .then(response => {
-                // Cache hit - return response
-                if (response) {
-                    return response;
-                }
-
-                // Clone the request
-                const fetchRequest = event.request.clone();
-
-                return fetch(fetchRequest).then(response => {
-                    // Check if valid response
-                    if (!response || response.status !== 200 || response.type !== 'basic') {
-                        return response;
-                    }
+    const request = event.request;
+    const url = new URL(request.url);
 
-                    // Clone the response
-                    const responseToCache = response.clone();
+    if (url.origin !== self.location.origin) {
+        return;
+    }
 
-                    caches.open(CACHE_NAME)
-                        .then(cache => {
-                            cache.put(event.request, responseToCache);
-                        });
+    if (request.method === 'POST' && url.pathname === OUTBOX_ROUTE) {
+        event.respondWith(networkOrOutbox(request));
+        return;
+    }
 
-                    return response;
-                });
-            })
+    if (request.method !== 'GET') {
+        return;
+    }
+
+    if (STALE_WHILE_REVALIDATE_ROUTES.some(route => route.test(url.pathname))) {
+        event.respondWith(staleWhileRevalidate(event, request));
+        return;
+    }
+
+    if (url.pathname.startsWith('/static/')) {
+        event.respondWith(cacheFirst(request));
+        return;
+    }
+
+    if (request.mode === 'navigate' || url.pathname.startsWith('/app/')) {
+        event.respondWith(networkFirst(request));
+    }
+});
+
+// Assets con fingerprint: nunca cambian, el cache siempre es válido
+async function cacheFirst(request) {
+    const cached = await caches.match(request, { ignoreVary: true });
+    if (cached) {
+        return cached;
+    }
+
+    const response = await fetch(request);
+    if (response.ok && response.type === 'basic') {
+        const cache = await caches.open(CACHE_NAME);
+        cache.put(request, response.clone());
+    }
+    return response;
+}
+
+// Vistas HTML: red primero para ver cambios, cache si no hay conexión
+async function networkFirst(request) {
+    try {
+        const response = await fetch(request);
+        if (response.ok && response.type === 'basic') {
+            const cache = await caches.open(CACHE_NAME);
+            cache.put(request, response.clone());
+        }
+        return response;
+    } catch (err) {
+        const cached = await caches.match(request, { ignoreVary: true });
+        if (cached) {
+            return cached;
+        }
+        throw err;
+    }
+}
+
+// Datos del inventario: responde con el cache y revalida con If-None-Match.
+// Si el servidor tiene una versión nueva, actualiza el cache y avisa a la página.
+async function staleWhileRevalidate(event, request) {
+    const cache = await caches.open(DATA_CACHE_NAME);
+    const cached = await cache.match(request, { ignoreVary: true });
+
+    const revalidation = revalidate(cache, request, cached);
+
+    if (cached) {
+        event.waitUntil(revalidation.catch(err => console.log('Revalidation failed', err)));
+        return cached;
+    }
+    return revalidation;
+}
+
+let lastNotifiedVersion = null;
+
+async function revalidate(cache, request, cached) {
+    const headers = new Headers(request.headers);
+    const cachedEtag = cached && cached.headers.get('ETag');
+    if (cachedEtag) {
+        headers.set('If-None-Match', cachedEtag);
+    }
+
+    const response = await fetch(request.url, { headers, credentials: 'same-origin' });
+
+    if (response.status === 304 && cached) {
+        return cached;
+    }
+
+    // Credenciales inválidas o cambiadas: no seguir sirviendo datos de la cuenta anterior
+    if (response.status === 401) {
+        await clearAccountData();
+        return response;
+    }
+
+    if (response.ok) {
+        await cache.put(request, response.clone());
+
+        const version = response.headers.get('X-Inventory-Version');
+        if (cached && version && version !== lastNotifiedVersion) {
+            lastNotifiedVersion = version;
+            notifyClients({ type: 'inventory-stale', version });
+        }
+    }
+    return response;
+}
+
+// Borra lo que pertenece a una cuenta: el cache de datos completo y las vistas
+// /app/* guardadas por networkFirst (los assets con fingerprint se conservan)
+async function clearAccountData() {
+    await caches.delete(DATA_CACHE_NAME);
+    const cache = await caches.open(CACHE_NAME);
+    const requests = await cache.keys();
+    await Promise.all(
+        requests
+            .filter(request => new URL(request.url).pathname.startsWith('/app/'))
+            .map(request => cache.delete(request))
     );
+}
+
+// La página informa la cuenta con la que se cargó; si no es la que llenó el
+// cache (otro login u otro hogar), se descarta lo guardado antes de seguir
+async function setAccount(account) {
+    const cache = await caches.open(DATA_CACHE_NAME);
+    const stored = await cache.match(ACCOUNT_KEY);
+    if (stored && (await stored.text()) === account) {
+        return;
+    }
+    if (stored) {
+        console.log('Account changed, clearing cached data');
+    }
+    await clearAccountData();
+    const fresh = await caches.open(DATA_CACHE_NAME);
+    await fresh.put(ACCOUNT_KEY, new Response(account));
+}
+
+// Cuenta informada por la última página cargada (null si todavía no llegó o
+// se borró por un 401)
+async function currentAccount() {
+    const cache = await caches.open(DATA_CACHE_NAME);
+    const stored = await cache.match(ACCOUNT_KEY);
+    return stored ? stored.text() : null;
+}
+
+async function notifyClients(message) {
+    const clients = await self.clients.matchAll({ type: 'window' });
+    clients.forEach(client => client.postMessage(message));
+}
+
+// Outbox de comandos (IndexedDB)
+function openOutbox() {
+    return new Promise((resolve, reject) => {
+        const req = indexedDB.open(OUTBOX_DB, 1);
+        req.onupgradeneeded = () => {
+            req.result.createObjectStore(OUTBOX_STORE, { keyPath: 'id', autoIncrement: true });
+        };
+        req.onsuccess = () => resolve(req.result);
+        req.onerror = () => reject(req.error);
+    });
+}
+
+async function outboxRequest(mode, operation) {
+    const db = await openOutbox();
+    return new Promise((resolve, reject) => {
+        const tx = db.transaction(OUTBOX_STORE, mode);
+        const req = operation(tx.objectStore(OUTBOX_STORE));
+        tx.oncomplete = () => resolve(req.result);
+        tx.onerror = () => reject(tx.error);
+    });
+}
+
+const addToOutbox = entry => outboxRequest('readwrite', store => store.add(entry));
+const getOutboxEntries = () => outboxRequest('readonly', store => store.getAll());
+const deleteFromOutbox = id => outboxRequest('readwrite', store => store.delete(id));
+
+function newIdempotencyKey() {
+    if (self.crypto && self.crypto.randomUUID) {
+        return self.crypto.randomUUID();
+    }
+    return `${Date.now()}-${Math.random().toString(16).slice(2)}`;
+}
+
+// Envía el comando; si no hay red lo guarda en el outbox con su idempotency key
+// y la cuenta que lo dictó (solo se reenvía con esa misma cuenta)
+async function networkOrOutbox(request) {
+    const body = await request.clone().text();
+    const idempotencyKey = request.headers.get('Idempotency-Key') || newIdempotencyKey();
+
+    try {
+        return await fetch(request);
+    } catch (err) {
+        await addToOutbox({
+            body,
+            contentType: request.headers.get('Content-Type') || 'application/x-www-form-urlencoded',
+            idempotencyKey,
+            account: await currentAccount(),
+            queuedAt: Date.now()
+        });
+
+        if (self.registration.sync) {
+            self.registration.sync.register(OUTBOX_SYNC_TAG).catch(() => {});
+        }
+
+        return new Response(
+            `<div class="bg-white border-2 border-yellow-500 rounded-lg p-4 shadow-md">
+                <h3 class="text-lg font-semibold text-yellow-700 mb-2">&#128246; Sin conexión</h3>
+                <p class="text-sm">Tus cambios se guardaron y se enviarán automáticamente al recuperar la conexión.</p>
+            </div>`,
+            { status: 202, headers: { 'Content-Type': 'text/html; charset=utf-8' } }
+        );
+    }
+}
+
+let replaying = null;
+
+// Reenvía en orden los comandos encolados de la cuenta actual; se detiene al
+// primer fallo de red. Los de otra cuenta esperan a que esa cuenta vuelva.
+function replayOutbox() {
+    if (replaying) {
+        return replaying;
+    }
+
+    replaying = (async () => {
+        const account = await currentAccount();
+        if (!account) {
+            // Sin cuenta conocida no se sabe a qué hogar irían los comandos
+            return;
+        }
+        const entries = await getOutboxEntries();
+        for (const entry of entries) {
+            if (!entry.account) {
+                // Encolado sin cuenta: no se puede atribuir a ningún hogar
+                await deleteFromOutbox(entry.id);
+                continue;
+            }
+            if (entry.account !== account) {
+                continue;
+            }
+
+            let response;
+            try {
+                response = await fetch(OUTBOX_ROUTE, {
+                    method: 'POST',
+                    credentials: 'same-origin',
+                    headers: {
+                        'Content-Type': entry.contentType,
+                        'Idempotency-Key': entry.idempotencyKey,
+                        'HX-Request': 'true'
+                    },
+                    body: entry.body
+                });
+            } catch (err) {
+                console.log('Outbox replay paused (offline)', err);
+                return;
+            }
+
+            // 401 (sesión vencida o cambiada)/429/5xx: reintentar más tarde; el
+            // resto ya fue procesado o es inválido
+            if (response.status === 401 || response.status === 429 || response.status >= 500) {
+                return;
+            }
+
+            await deleteFromOutbox(entry.id);
+            notifyClients({ type: 'outbox-replayed', html: await response.text() });
+        }
+    })().finally(() => {
+        replaying = null;
+    });
+
+    return replaying;
+}
+
+self.addEventListener('sync', event => {
+    if (event.tag === OUTBOX_SYNC_TAG) {
+        event.waitUntil(replayOutbox());
+    }
+});
+
+self.addEventListener('message', event => {
+    if (event.data && event.data.type === 'replay-outbox') {
+        event.waitUntil(replayOutbox());
+    }
+    if (event.data && event.data.type === 'account' && event.data.account) {
+        // Con la cuenta confirmada se pueden reenviar sus comandos pendientes
+        event.waitUntil(setAccount(String(event.data.account)).then(() => replayOutbox()));
+    }
 });
 
-// Activate event - clean up old caches
+// Activate event - clean up old caches (assets y datos de versiones anteriores)
 self.addEventListener('activate', event => {
     event.waitUntil(
         caches.keys().then(cacheNames => {
             return Promise.all(
                 cacheNames.map(cacheName => {
-                    if (cacheName !== CACHE_NAME) {
+                    if (cacheName !== CACHE_NAME && cacheName !== DATA_CACHE_NAME) {
                         console.log('Deleting old cache:', cacheName);
                         return caches.delete(cacheName);
                     }
                 })
             );
-        })
+        }).then(() => self.clients.claim())
+          .then(() => replayOutbox())
     );
 });
@@ -0,0 +1,79 @@
+"""
+Fixtures comunes de los tests.
+
+La base es un SQLite temporal por sesión (configurado antes de importar la
+app) y la app corre con su lifespan dentro de un TestClient. Cada test que
+escribe usa hogares propios (fixtures `household` y `make_household`), así
+los tests no comparten inventario aunque compartan la base.
+"""
+
+import itertools
+import os
+import tempfile
+from pathlib import Path
+
+_DB_DIR = tempfile.mkdtemp(prefix="inventario-tests-")
+os.environ["USE_SQLITE"] = "false"
+os.environ["DATABASE_URL"] = f"sqlite:///{Path(_DB_DIR) / 'test.db'}"
+os.environ["HISTORY_RETENTION_ENABLED"] = "false"
+os.environ["LLM_COALESCE_WINDOW_MS"] = "0"
+os.environ["PROFILING_ENABLED"] = "false"
+
+import pytest  # noqa: E402  (después de configurar la base)
+from fastapi.testclient import TestClient  # noqa: E402
+
+_households = itertools.count(1)
+
+
+@pytest.fixture(scope="session")
+def client():
+    from app import app
+
+    with TestClient(app) as test_client:
+        yield test_client
+
+
+@pytest.fixture
+def make_household(client):
+    """Crea hogares nuevos con su usuario; cada llamada devuelve (household_id, auth)"""
+    from scripts.create_household import create_household
+
+    def make():
+        n = next(_households)
+        username, password = f"hogar{n}", "secreto"
+        household_id = create_household(f"Hogar {n}", username, password)
+        return household_id, (username, password)
+
+    return make
+
+
+@pytest.fixture
+def household(make_household):
+    """Hogar nuevo para el test: (household_id, auth)"""
+    return make_household()
+
+
+@pytest.fixture
+def run_batch(client):
+    """POST /process/batch con los comandos dados; devuelve la respuesta"""
+
+    def run(auth, commands, atomic=False, headers=None):
+        return client.post(
+            "/process/batch",
+            auth=auth,
+            json={"commands": commands, "atomic": atomic},
+            headers=headers or {},
+        )
+
+    return run
+
+
+@pytest.fixture
+def stock(client):
+    """Cantidad por nombre de item de un hogar (GET /inventory/items)"""
+
+    def read(auth):
+        items = client.get("/inventory/items", auth=auth).json()["items"]
+        return {item["name"]: item["quantity"] for item in items}
+
+    return read
@@ -0,0 +1,70 @@
+def test_batch_applies_commands_in_order(household, run_batch, stock):
+    _, auth = household
+    response = run_batch(
+        auth,
+        [
+            {"action": "create_item", "item": "leche", "quantity": 1},
+            {"action": "add", "item": "leche", "quantity": 2},
+            {"action": "create_item", "item": "pan", "quantity": 1},
+            {"action": "remove", "item": "pan"},
+        ],
+    )
+
+    body = response.json()
+    assert response.status_code == 200
+    assert (body["applied"], body["failed"]) == (4, 0)
+    assert response.headers["x-inventory-version"] == body["version"]
+    assert stock(auth) == {"leche": 3}
+
+
+def test_atomic_batch_rolls_back_on_failure(household, run_batch, stock):
+    _, auth = household
+    run_batch(auth, [{"action": "create_item", "item": "leche", "quantity": 1}])
+    before = run_batch(auth, [{"action": "add", "item": "leche", "quantity": 1}]).json()
+
+    response = run_batch(
+        auth,
+        [
+            {"action": "add", "item": "leche", "quantity": 5},
+            {"action": "create_item", "item": "pan", "quantity": 1},
+            {"action": "add", "item": "queso", "quantity": 1},
+        ],
+        atomic=True,
+    )
+
+    body = response.json()
+    assert response.status_code == 422
+    assert (body["applied"], body["failed"]) == (0, 1)
+    assert [result["ok"] for result in body["results"]] == [True, True, False]
+    assert body["version"] == before["version"]
+    assert stock(auth) == {"leche": 2}
+
+
+def test_non_atomic_batch_keeps_successful_commands(household, run_batch, stock):
+    _, auth = household
+    response = run_batch(
+        auth,
+        [
+            {"action": "create_item", "item": "pan", "quantity": 1},
+            {"action": "add", "item": "queso", "quantity": 1},
+        ],
+    )
+
+    body = response.json()
+    assert response.status_code == 200
+    assert (body["applied"], body["failed"]) == (1, 1)
+    assert stock(auth) == {"pan": 1}
+
+
+def test_invalid_commands_rejected_before_applying(household, run_batch, stock):
+    _, auth = household
+    response = run_batch(
+        auth,
+        [
+            {"action": "create_item", "item": "pan", "quantity": 1},
+            {"action": "add", "item": "pan", "quantity": "mucho"},
+        ],
+    )
+
+    assert response.status_code == 422
+    assert stock(auth) == {}
@@ -0,0 +1,126 @@
+import asyncio
+
+import pytest
+
+from utils.coalescing import RequestCoalescer
+from utils.parsers import split_by_dictation
+
+
+class Recorder:
+    """`run` de prueba: guarda cada grupo y devuelve los items en mayúsculas"""
+
+    def __init__(self, error: BaseException | None = None):
+        self.calls: list[list] = []
+        self.error = error
+
+    async def __call__(self, items: list) -> list:
+        self.calls.append(list(items))
+        if self.error is not None:
+            raise self.error
+        return [item.upper() for item in items]
+
+
+def _coalescer(run, window=0.05, max_size=5):
+    return RequestCoalescer("test", window, max_size, run)
+
+
+async def test_requests_within_window_share_one_call():
+    run = Recorder()
+    coalescer = _coalescer(run)
+
+    results = await asyncio.gather(*(coalescer.submit("ana", text) for text in ("a", "b", "c")))
+
+    assert results == ["A", "B", "C"]
+    assert run.calls == [["a", "b", "c"]]
+
+
+async def test_max_size_closes_group_early():
+    run = Recorder()
+    coalescer = _coalescer(run, window=10, max_size=2)
+
+    results = await asyncio.wait_for(
+        asyncio.gather(coalescer.submit("ana", "a"), coalescer.submit("ana", "b")), 1
+    )
+
+    assert results == ["A", "B"]
+    assert run.calls == [["a", "b"]]
+
+
+async def test_groups_are_per_key():
+    run = Recorder()
+    coalescer = _coalescer(run)
+
+    results = await asyncio.gather(coalescer.submit("ana", "a"), coalescer.submit("beto", "b"))
+
+    assert results == ["A", "B"]
+    assert sorted(run.calls) == [["a"], ["b"]]
+
+
+async def test_disabled_runs_each_request():
+    run = Recorder()
+    coalescer = _coalescer(run, window=0)
+
+    results = await asyncio.gather(coalescer.submit("ana", "a"), coalescer.submit("ana", "b"))
+
+    assert not coalescer.enabled
+    assert results == ["A", "B"]
+    assert run.calls == [["a"], ["b"]]
+
+
+async def test_failure_reaches_every_request():
+    coalescer = _coalescer(Recorder(error=RuntimeError("llm caído")))
+
+    results = await asyncio.gather(
+        coalescer.submit("ana", "a"), coalescer.submit("ana", "b"), return_exceptions=True
+    )
+
+    assert [type(result) for result in results] == [RuntimeError, RuntimeError]
+
+
+async def test_cancelled_call_resolves_the_group():
+    coalescer = _coalescer(Recorder(error=asyncio.CancelledError()))
+
+    first = asyncio.ensure_future(coalescer.submit("ana", "a"))
+    second = asyncio.ensure_future(coalescer.submit("ana", "b"))
+    await asyncio.wait({first, second}, timeout=1)
+
+    assert first.cancelled() and second.cancelled()
+
+
+async def test_disconnected_request_does_not_cancel_the_call():
+    run = Recorder()
+    coalescer = _coalescer(run)
+
+    first = asyncio.ensure_future(coalescer.submit("ana", "a"))
+    second = asyncio.ensure_future(coalescer.submit("ana", "b"))
+    await asyncio.sleep(0)
+    first.cancel()
+
+    assert await second == "B"
+    assert run.calls == [["a", "b"]]
+    with pytest.raises(asyncio.CancelledError):
+        await first
+
+
+def test_split_by_dictation_number():
+    commands = [
+        {"action": "add", "item": "leche", "dictation": 2},
+        {"action": "add", "item": "pan", "dictation": "1"},
+    ]
+
+    assert split_by_dictation(commands, ["compré pan", "compré leche"]) == [
+        [{"action": "add", "item": "pan"}],
+        [{"action": "add", "item": "leche"}],
+    ]
+
+
+def test_split_by_dictation_falls_back_to_names():
+    commands = [
+        {"action": "add", "item": "Leche", "dictation": 9},
+        {"action": "add", "item": "queso"},
+    ]
+
+    assert split_by_dictation(commands, ["compré pan", "compré leche"]) == [
+        [{"action": "add", "item": "queso"}],
+        [{"action": "add", "item": "Leche"}],
+    ]
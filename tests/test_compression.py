@@ -0,0 +1,108 @@
+import gzip
+
+import pytest
+from starlette.applications import Starlette
+from starlette.responses import Response, StreamingResponse
+from starlette.routing import Route
+from starlette.testclient import TestClient
+
+from middleware.compression import CompressionMiddleware, choose_encoding, parse_accept_encoding
+
+BODY = b"<p>leche</p>" * 200
+
+
+def _app() -> Starlette:
+    def page(request):
+        return Response(BODY, media_type="text/html", headers={"ETag": '"v1"'})
+
+    def small(request):
+        return Response(b"ok", media_type="text/html")
+
+    def image(request):
+        return Response(BODY, media_type="image/png")
+
+    def not_found(request):
+        return Response(BODY, status_code=404, media_type="text/html")
+
+    def partial(request):
+        return Response(
+            BODY[:100],
+            status_code=206,
+            media_type="text/html",
+            headers={"Content-Range": f"bytes 0-99/{len(BODY)}"},
+        )
+
+    def stream(request):
+        return StreamingResponse(iter([BODY, BODY]), media_type="application/x-ndjson")
+
+    app = Starlette(
+        routes=[
+            Route("/page", page),
+            Route("/small", small),
+            Route("/image", image),
+            Route("/not-found", not_found),
+            Route("/partial", partial),
+            Route("/stream", stream),
+        ]
+    )
+    app.add_middleware(CompressionMiddleware, content_types=("text/html", "application/x-ndjson"))
+    return app
+
+
+@pytest.fixture(scope="module")
+def client():
+    return TestClient(_app())
+
+
+def _get(client, path, accept_encoding):
+    # Sin decodificar: se ven los bytes y headers que manda el middleware
+    return client.get(path, headers={"Accept-Encoding": accept_encoding})
+
+
+def test_parse_accept_encoding_ignores_q_zero():
+    assert parse_accept_encoding("gzip, br;q=0, *;q=0.1") == {"gzip", "*"}
+
+
+def test_choose_encoding_prefers_brotli():
+    pytest.importorskip("brotli")
+    assert choose_encoding("gzip, br") == "br"
+    assert choose_encoding("gzip;q=1, br;q=0") == "gzip"
+    assert choose_encoding("identity") is None
+
+
+def test_gzip_when_accepted(client):
+    response = _get(client, "/page", "gzip")
+    assert response.headers["content-encoding"] == "gzip"
+    assert "Accept-Encoding" in response.headers["vary"]
+    assert response.content == BODY
+
+
+def test_identity_without_accept_encoding(client):
+    response = _get(client, "/page", "identity")
+    assert "content-encoding" not in response.headers
+    assert response.headers["etag"] == '"v1"'
+
+
+def test_strong_etag_weakened_when_compressed(client):
+    response = _get(client, "/page", "gzip")
+    assert response.headers["etag"] == 'W/"v1"'
+
+
+@pytest.mark.parametrize("path", ["/small", "/image", "/not-found", "/partial"])
+def test_not_compressed(client, path):
+    response = _get(client, path, "gzip")
+    assert "content-encoding" not in response.headers
+
+
+def test_partial_content_untouched(client):
+    response = _get(client, "/partial", "gzip")
+    assert response.status_code == 206
+    assert response.content == BODY[:100]
+
+
+def test_streaming_compressed_without_length(client):
+    with client.stream("GET", "/stream", headers={"Accept-Encoding": "gzip"}) as response:
+        raw = b"".join(response.iter_raw())
+    assert response.headers["content-encoding"] == "gzip"
+    assert "content-length" not in response.headers
+    assert gzip.decompress(raw) == BODY * 2
@@ -0,0 +1,51 @@
+from utils.forecast import ConsumptionForecast, load_history_arrays
+
+
+def _forecast(monkeypatch):
+    """Pronóstico nuevo que cuenta las cargas de historial (completas e incrementales)"""
+    loads = []
+
+    def counting_load(session, since, after_id=0):
+        loads.append(after_id)
+        return load_history_arrays(session, since, after_id)
+
+    monkeypatch.setattr("utils.forecast.load_history_arrays", counting_load)
+    return ConsumptionForecast(window_days=30, rebuild_interval=3600), loads
+
+
+def _item_ids(client, auth):
+    return {
+        item["name"]: item["id"]
+        for item in client.get("/inventory/items", auth=auth).json()["items"]
+    }
+
+
+def test_reads_never_load_full_history(client, household, run_batch, monkeypatch):
+    household_id, auth = household
+    run_batch(auth, [{"action": "create_item", "item": "leche", "quantity": 5}])
+    run_batch(auth, [{"action": "set", "item": "leche", "quantity": 3}])
+    leche = _item_ids(client, auth)["leche"]
+    forecast, loads = _forecast(monkeypatch)
+
+    # Sin carga completa todavía: sin pronóstico y sin tocar la DB
+    assert forecast.days_left(household_id, {leche: 3}) == {leche: None}
+    assert loads == []
+
+    forecast.rebuild()
+    assert loads == [0]
+    assert forecast.days_left(household_id, {leche: 3})[leche] is not None
+
+
+def test_new_writes_are_added_incrementally(client, household, run_batch, monkeypatch):
+    household_id, auth = household
+    run_batch(auth, [{"action": "create_item", "item": "leche", "quantity": 5}])
+    leche = _item_ids(client, auth)["leche"]
+    forecast, loads = _forecast(monkeypatch)
+    forecast.rebuild()
+    assert forecast.rates(household_id).get(leche, 0) == 0
+
+    run_batch(auth, [{"action": "set", "item": "leche", "quantity": 2}])
+
+    assert forecast.rates(household_id)[leche] > 0
+    # Solo filas nuevas (id mayor al último visto), nunca otra carga completa
+    assert loads[0] == 0 and all(after_id > 0 for after_id in loads[1:])
@@ -0,0 +1,98 @@
+import orjson
+import pytest
+
+import routes.process
+from utils.admission import AdmissionRejected
+
+
+class FakeLLM:
+    """Crea 1 unidad de la última palabra de cada dictado y registra las llamadas"""
+
+    def __init__(self):
+        self.calls = []
+        self.reject = 0  # próximas llamadas rechazadas por admisión
+
+    def __call__(self, built, household_id):
+        self.calls.append(built)
+        if self.reject:
+            self.reject -= 1
+            raise AdmissionRejected("queue_full", 1)
+        item = built.messages[-1]["content"].rsplit(" ", 1)[-1]
+        return orjson.dumps([{"action": "create_item", "item": item, "quantity": 1}]).decode()
+
+
+@pytest.fixture
+def llm(monkeypatch):
+    fake = FakeLLM()
+    monkeypatch.setattr(routes.process, "prompt", fake)
+    return fake
+
+
+def _dictate(client, auth, text, key):
+    return client.post(
+        "/process/text", auth=auth, data={"text": text}, headers={"Idempotency-Key": key}
+    )
+
+
+def test_retry_replays_original_response(client, household, llm, stock):
+    _, auth = household
+    first = _dictate(client, auth, "compré arroz", "key-1")
+    retry = _dictate(client, auth, "compré arroz", "key-1")
+
+    assert first.status_code == retry.status_code == 200
+    assert retry.headers["idempotent-replayed"] == "true"
+    assert retry.text == first.text
+    assert retry.headers["x-inventory-version"] == first.headers["x-inventory-version"]
+    assert len(llm.calls) == 1
+    assert stock(auth) == {"arroz": 1}
+
+
+def test_key_reused_with_other_text_conflicts(client, household, llm, stock):
+    _, auth = household
+    _dictate(client, auth, "compré arroz", "key-2")
+    response = _dictate(client, auth, "compré fideos", "key-2")
+
+    assert response.status_code == 422
+    assert len(llm.calls) == 1
+    assert stock(auth) == {"arroz": 1}
+
+
+def test_keys_are_scoped_per_user(client, make_household, llm, stock):
+    _, auth = make_household()
+    _, other_auth = make_household()
+    _dictate(client, auth, "compré arroz", "shared-key")
+    response = _dictate(client, other_auth, "compré arroz", "shared-key")
+
+    assert "idempotent-replayed" not in response.headers
+    assert stock(other_auth) == {"arroz": 1}
+
+
+def test_rejected_request_leaves_key_free(client, household, llm, stock):
+    _, auth = household
+    llm.reject = 1
+    busy = _dictate(client, auth, "compré arroz", "key-3")
+    retry = _dictate(client, auth, "compré arroz", "key-3")
+
+    assert busy.status_code == 429
+    assert retry.status_code == 200
+    assert "idempotent-replayed" not in retry.headers
+    assert stock(auth) == {"arroz": 1}
+
+
+def test_batch_retry_applies_once(household, run_batch, stock):
+    _, auth = household
+    run_batch(auth, [{"action": "create_item", "item": "leche", "quantity": 1}])
+    commands = [{"action": "add", "item": "leche", "quantity": 2}]
+    first = run_batch(auth, commands, headers={"Idempotency-Key": "batch-1"})
+    retry = run_batch(auth, commands, headers={"Idempotency-Key": "batch-1"})
+
+    assert retry.json() == first.json()
+    assert retry.headers["idempotent-replayed"] == "true"
+    assert stock(auth) == {"leche": 3}
+
+
+def test_invalid_key_rejected(client, household, llm):
+    _, auth = household
+    response = _dictate(client, auth, "compré arroz", "k" * 256)
+    assert response.status_code == 400
+    assert not llm.calls
@@ -0,0 +1,31 @@
+from sqlalchemy import create_engine, func, inspect, select
+from sqlmodel import SQLModel
+
+from config.database.migrations import (
+    SCHEMA_VERSION,
+    SCHEMA_VERSION_KEY,
+    ensure_schema,
+    read_meta,
+)
+from config.database.models import DEFAULT_HOUSEHOLD_ID, DEFAULT_HOUSEHOLD_NAME, Household
+
+
+def test_ensure_schema_on_create_all_database_without_version(tmp_path):
+    # Base armada con create_all y el hogar por defecto, sin schema_version
+    engine = create_engine(f"sqlite:///{tmp_path / 'create_all.db'}")
+    SQLModel.metadata.create_all(engine)
+    with engine.begin() as conn:
+        conn.execute(
+            Household.__table__.insert().values(
+                id=DEFAULT_HOUSEHOLD_ID, name=DEFAULT_HOUSEHOLD_NAME
+            )
+        )
+
+    assert ensure_schema(engine, read_meta(engine, (SCHEMA_VERSION_KEY,)))
+
+    meta = read_meta(engine, (SCHEMA_VERSION_KEY,))
+    assert meta == {SCHEMA_VERSION_KEY: str(SCHEMA_VERSION)}
+    assert not ensure_schema(engine, meta)
+    with engine.connect() as conn:
+        assert conn.execute(select(func.count()).select_from(Household.__table__)).scalar() == 1
+        assert inspect(conn).has_table("item_fts")
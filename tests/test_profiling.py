@@ -0,0 +1,34 @@
+import threading
+import time
+
+import orjson
+
+from utils.profiling import StackSampler
+
+
+def slow_llm_call(done: threading.Event):
+    """Trabajo de un hilo del threadpool (como prompt() dentro de run_in_threadpool)"""
+    while not done.is_set():
+        time.sleep(0.001)
+
+
+def test_sampler_profiles_worker_threads():
+    done = threading.Event()
+    worker = threading.Thread(target=slow_llm_call, args=(done,), name="worker-llm")
+    sampler = StackSampler(interval=0.001)
+
+    sampler.start()
+    worker.start()
+    time.sleep(0.05)
+    done.set()
+    worker.join()
+    sampler.stop()
+
+    profile = orjson.loads(sampler.speedscope("POST /process/text"))
+    frames = [frame["name"] for frame in profile["shared"]["frames"]]
+    names = [thread_profile["name"] for thread_profile in profile["profiles"]]
+    assert names[0].endswith("(event loop)]")
+    worker_profile = next(p for p in profile["profiles"] if "[worker-llm]" in p["name"])
+    assert any(
+        frames[index] == "slow_llm_call" for sample in worker_profile["samples"] for index in sample
+    )
@@ -0,0 +1,170 @@
+import gzip
+from datetime import datetime, timedelta
+
+import orjson
+import pytest
+from sqlmodel import Session, func, select
+
+import utils.retention as retention
+from config.database.db import engine
+from config.database.models import Item, ItemHistory, ItemHistoryRollup
+from config.database.queries import history_page_statement
+from utils.serializers import serialize_history_page
+
+NOW = datetime.utcnow()
+DAY = retention.day_start(NOW - timedelta(days=200))
+WEEK = retention.week_start(NOW - timedelta(days=500))
+
+
+@pytest.fixture
+def item(household, run_batch):
+    """Item con cambios de hace 500 días, 200 días (tres el mismo día) y 10 días"""
+    household_id, auth = household
+    run_batch(auth, [{"action": "create_item", "item": "leche", "quantity": 1}])
+    with Session(engine) as session:
+        item_id = session.exec(
+            select(Item.id).where(Item.household_id == household_id, Item.name == "leche")
+        ).one()
+        changes = [
+            (WEEK + timedelta(days=1), 1),
+            (WEEK + timedelta(days=2), 2),
+            (DAY + timedelta(hours=8), 5),
+            (DAY + timedelta(hours=12), 3),
+            (DAY + timedelta(hours=20), 4),
+            (NOW - timedelta(days=10), 6),
+        ]
+        for changed_at, quantity in changes:
+            session.add(
+                ItemHistory(
+                    household_id=household_id,
+                    item_id=item_id,
+                    quantity=quantity,
+                    changed_at=changed_at,
+                )
+            )
+        session.commit()
+    return household_id, item_id
+
+
+def _raw_dates(item_id):
+    with Session(engine) as session:
+        return session.exec(
+            select(ItemHistory.changed_at)
+            .where(ItemHistory.item_id == item_id)
+            .order_by(ItemHistory.changed_at)
+        ).all()
+
+
+def _rollups(item_id):
+    with Session(engine) as session:
+        rollups = session.exec(
+            select(ItemHistoryRollup)
+            .where(ItemHistoryRollup.item_id == item_id)
+            .order_by(ItemHistoryRollup.period_start)
+        ).all()
+        return [
+            (
+                r.granularity,
+                r.period_start,
+                r.last_quantity,
+                r.min_quantity,
+                r.max_quantity,
+                r.samples,
+            )
+            for r in rollups
+        ]
+
+
+def test_cutoffs_align_to_day_and_week():
+    raw_cutoff, daily_cutoff = retention.retention_cutoffs(NOW)
+    assert raw_cutoff == retention.day_start(raw_cutoff)
+    assert daily_cutoff.weekday() == 0 and daily_cutoff == retention.day_start(daily_cutoff)
+    assert daily_cutoff <= raw_cutoff
+
+
+def test_refused_without_archive_or_discard(item, monkeypatch):
+    _, item_id = item
+    monkeypatch.setattr(retention, "HISTORY_ARCHIVE_DIR", "")
+    monkeypatch.setattr(retention, "HISTORY_DISCARD_RAW", False)
+    before = _raw_dates(item_id)
+
+    assert retention.run_retention(now=NOW, force=True) is None
+    assert _raw_dates(item_id) == before
+    assert _rollups(item_id) == []
+
+
+def test_old_changes_become_day_and_week_rollups(item, monkeypatch):
+    _, item_id = item
+    monkeypatch.setattr(retention, "HISTORY_DISCARD_RAW", True)
+
+    summary = retention.run_retention(now=NOW, force=True)
+
+    assert summary["rolled_up"] >= 5
+    assert min(_raw_dates(item_id)) == NOW - timedelta(days=10)
+    assert _rollups(item_id) == [
+        ("week", WEEK, 2, 1, 2, 2),
+        ("day", DAY, 4, 3, 5, 3),
+    ]
+
+
+def test_history_page_is_continuous_across_boundary(item, monkeypatch):
+    household_id, item_id = item
+    monkeypatch.setattr(retention, "HISTORY_DISCARD_RAW", True)
+    retention.run_retention(now=NOW, force=True)
+
+    with Session(engine) as session:
+        rows = session.exec(history_page_statement(household_id, item_id, 0, 20)).all()
+    history, has_more = serialize_history_page(rows, 20)
+
+    assert not has_more
+    assert [entry["granularity"] for entry in history][-3:] == [None, "day", "week"]
+    dates = [entry["changed_at"] for entry in history]
+    assert dates == sorted(dates, reverse=True)
+    # La última fila cruda arranca donde termina el rollup diario
+    assert (history[-3]["before"], history[-3]["after"]) == (4, 6)
+    assert (history[-2]["before"], history[-2]["after"]) == (2, 4)
+
+
+def test_other_household_does_not_see_rollups(item, monkeypatch, make_household):
+    _, item_id = item
+    monkeypatch.setattr(retention, "HISTORY_DISCARD_RAW", True)
+    retention.run_retention(now=NOW, force=True)
+    other_household, _ = make_household()
+
+    with Session(engine) as session:
+        assert session.exec(history_page_statement(other_household, item_id, 0, 20)).all() == []
+
+
+def test_daily_rollups_merge_into_weeks(item, monkeypatch):
+    _, item_id = item
+    monkeypatch.setattr(retention, "HISTORY_DISCARD_RAW", True)
+    retention.run_retention(now=NOW, force=True)
+
+    # Con un límite diario más corto, el día de hace 200 días pasa a su semana
+    monkeypatch.setattr(retention, "HISTORY_DAILY_DAYS", 150)
+    summary = retention.run_retention(now=NOW, force=True)
+
+    assert summary["merged_daily"] >= 1
+    assert _rollups(item_id) == [
+        ("week", WEEK, 2, 1, 2, 2),
+        ("week", retention.week_start(DAY), 4, 3, 5, 3),
+    ]
+
+
+def test_archive_keeps_raw_rows(item, monkeypatch, tmp_path):
+    _, item_id = item
+    monkeypatch.setattr(retention, "HISTORY_ARCHIVE_DIR", str(tmp_path))
+
+    retention.run_retention(now=NOW, force=True)
+
+    archives = list(tmp_path.glob("itemhistory-*.ndjson.gz"))
+    assert len(archives) == 1
+    assert not list(tmp_path.glob("*.tmp"))
+    with gzip.open(archives[0]) as archive:
+        rows = [orjson.loads(line) for line in archive]
+    assert sorted(row["quantity"] for row in rows if row["item_id"] == item_id) == [1, 2, 3, 4, 5]
+    with Session(engine) as session:
+        remaining = session.exec(
+            select(func.count()).select_from(ItemHistory).where(ItemHistory.changed_at < DAY)
+        ).one()
+    assert remaining == 0
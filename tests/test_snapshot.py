@@ -0,0 +1,108 @@
+import pytest
+from sqlmodel import Session
+
+from config.database.db import engine
+from config.database.queries import (
+    item_rows_statement,
+    low_stock_statement,
+    section_rows_statement,
+)
+from utils.snapshot import InventorySnapshot, SnapshotChanges, inventory_snapshots
+
+
+@pytest.fixture
+def snapshot(household, run_batch):
+    """Copia cargada de un hogar con leche y pan"""
+    household_id, auth = household
+    run_batch(
+        auth,
+        [
+            {"action": "create_item", "item": "leche", "quantity": 2},
+            {"action": "create_item", "item": "pan", "quantity": 1},
+        ],
+    )
+    return inventory_snapshots.current(household_id)
+
+
+@pytest.fixture
+def no_reload(monkeypatch):
+    """Falla si la copia se recarga desde la DB: los cambios tienen que llegar write-through"""
+
+    def load(self):
+        raise AssertionError("snapshot reloaded")
+
+    monkeypatch.setattr(InventorySnapshot, "load", load)
+
+
+def _quantities(snapshot):
+    return {row[1]: row[3] for row in snapshot.item_rows()}
+
+
+def test_batch_updates_snapshot_without_reload(household, snapshot, no_reload, run_batch, stock):
+    household_id, auth = household
+    response = run_batch(
+        auth,
+        [
+            {"action": "add", "item": "leche", "quantity": 3},
+            {"action": "create_item", "item": "queso", "quantity": 1},
+        ],
+    )
+
+    assert snapshot.version == int(response.headers["x-inventory-version"])
+    assert inventory_snapshots.current(household_id) is snapshot
+    assert _quantities(snapshot) == {"leche": 5, "pan": 1, "queso": 1}
+    # Las lecturas salen de la copia (load falla si se recarga)
+    assert stock(auth) == {"leche": 5, "pan": 1, "queso": 1}
+
+
+def test_deleted_item_leaves_snapshot(household, snapshot, no_reload, run_batch):
+    _, auth = household
+    run_batch(auth, [{"action": "set", "item": "pan", "quantity": 0}])
+    assert [row[1] for row in snapshot.low_stock_rows()] == ["pan"]
+
+    run_batch(auth, [{"action": "remove", "item": "pan"}])
+
+    assert _quantities(snapshot) == {"leche": 2}
+    assert snapshot.low_stock_rows() == []
+
+
+def test_atomic_rollback_leaves_snapshot_unchanged(household, snapshot, no_reload, run_batch):
+    _, auth = household
+    version = snapshot.version
+    response = run_batch(
+        auth,
+        [
+            {"action": "add", "item": "leche", "quantity": 5},
+            {"action": "add", "item": "queso", "quantity": 1},
+        ],
+        atomic=True,
+    )
+
+    assert response.status_code == 422
+    assert snapshot.version == version
+    assert _quantities(snapshot) == {"leche": 2, "pan": 1}
+
+
+def test_missed_version_marks_snapshot_stale(snapshot):
+    snapshot.apply(SnapshotChanges(), snapshot.version + 2)
+
+    assert snapshot.version is None
+    assert inventory_snapshots.current(snapshot.household_id).version is not None
+    assert _quantities(snapshot) == {"leche": 2, "pan": 1}
+
+
+def test_snapshot_rows_match_database(household, snapshot, run_batch):
+    household_id, auth = household
+    run_batch(
+        auth,
+        [
+            {"action": "set", "item": "pan", "quantity": 0},
+            {"action": "create_item", "item": "arroz", "quantity": 4, "section": "despensa"},
+        ],
+    )
+    snapshot = inventory_snapshots.current(household_id)
+
+    with Session(engine) as session:
+        assert snapshot.item_rows() == session.exec(item_rows_statement(household_id)).all()
+        assert snapshot.low_stock_rows() == session.exec(low_stock_statement(household_id)).all()
+        assert snapshot.section_rows() == session.exec(section_rows_statement(household_id)).all()
@@ -0,0 +1,72 @@
+import pytest
+
+SECRET = "turron"
+SECTION = "escondite"
+
+LISTINGS = [
+    "/inventory/items",
+    "/inventory/low-stock",
+    "/inventory/shopping-list",
+    "/inventory/sections",
+    "/inventory/api/items",
+    f"/inventory/api/search?q={SECRET[:4]}",
+    "/inventory/api/context",
+    "/data/export/items?format=ndjson",
+    "/data/export/sections?format=csv",
+]
+
+
+@pytest.fixture
+def households(make_household, run_batch, client):
+    """Hogar A con un item bajo el umbral en su propia sección, y un hogar B vacío"""
+    _, auth_a = make_household()
+    _, auth_b = make_household()
+    run_batch(
+        auth_a,
+        [
+            {"action": "create_item", "item": SECRET, "quantity": 1, "section": SECTION},
+            {"action": "set", "item": SECRET, "quantity": 0},
+        ],
+    )
+    items = client.get("/inventory/items", auth=auth_a).json()["items"]
+    item_id = next(item["id"] for item in items if item["name"] == SECRET)
+    return auth_a, auth_b, item_id
+
+
+@pytest.mark.parametrize("path", LISTINGS)
+def test_listings_only_show_own_household(client, households, path):
+    auth_a, auth_b, _ = households
+    own = client.get(path, auth=auth_a).text.lower()
+    assert SECRET in own or SECTION in own
+
+    response = client.get(path, auth=auth_b)
+    other = response.text.lower()
+    assert response.status_code == 200
+    assert SECRET not in other and SECTION not in other
+
+
+def test_history_of_other_household_item_is_not_found(client, households):
+    _, auth_b, item_id = households
+    missing = 10**9
+
+    response = client.get(f"/inventory/item/{item_id}/history-view", auth=auth_b)
+    assert "no encontrado" in response.text
+    paginated = client.get(f"/inventory/api/item/{item_id}/history", auth=auth_b).text
+    assert paginated == client.get(f"/inventory/api/item/{missing}/history", auth=auth_b).text
+    batch = client.get(
+        "/inventory/api/items/batch-history-views", params={"item_ids": str(item_id)}, auth=auth_b
+    )
+    assert batch.json() == {}
+
+
+def test_same_name_in_other_household_is_independent(households, run_batch, stock):
+    auth_a, auth_b, _ = households
+
+    missing = run_batch(auth_b, [{"action": "remove", "item": SECRET}]).json()
+    assert missing["failed"] == 1
+
+    run_batch(auth_b, [{"action": "create_item", "item": SECRET, "quantity": 7}])
+    run_batch(auth_b, [{"action": "remove", "item": SECRET}])
+
+    assert stock(auth_a) == {SECRET: 0}
+    assert stock(auth_b) == {}
@@ -0,0 +1,78 @@
+import time
+
+import pytest
+
+import utils.versioning as versioning
+
+ITEMS = "/inventory/api/items"
+CONTEXT = "/inventory/api/context"
+
+
+@pytest.fixture
+def stocked(household, run_batch):
+    household_id, auth = household
+    response = run_batch(auth, [{"action": "create_item", "item": "leche", "quantity": 2}])
+    assert response.status_code == 200
+    return household_id, auth
+
+
+def test_etag_identifies_household_and_version(client, stocked):
+    household_id, auth = stocked
+    response = client.get(ITEMS, auth=auth)
+    etag = response.headers["etag"]
+    assert etag.startswith(f'W/"inv-{household_id}-{response.headers["x-inventory-version"]}-')
+    assert response.headers["cache-control"] == "no-cache"
+
+
+def test_matching_etag_is_not_modified(client, stocked):
+    _, auth = stocked
+    etag = client.get(ITEMS, auth=auth).headers["etag"]
+    response = client.get(ITEMS, auth=auth, headers={"If-None-Match": etag})
+    assert response.status_code == 304
+    assert response.headers["etag"] == etag
+    assert response.content == b""
+
+
+def test_write_changes_etag(client, stocked, run_batch):
+    _, auth = stocked
+    etag = client.get(ITEMS, auth=auth).headers["etag"]
+    run_batch(auth, [{"action": "add", "item": "leche", "quantity": 1}])
+    response = client.get(ITEMS, auth=auth, headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.headers["etag"] != etag
+
+
+def test_other_household_etag_is_not_reused(client, stocked, make_household):
+    _, auth = stocked
+    _, other_auth = make_household()
+    etag = client.get(ITEMS, auth=auth).headers["etag"]
+    response = client.get(ITEMS, auth=other_auth, headers={"If-None-Match": etag})
+    assert response.status_code == 200
+
+
+def test_asset_version_changes_etag(client, stocked, monkeypatch):
+    _, auth = stocked
+    etag = client.get(CONTEXT, auth=auth).headers["etag"]
+    monkeypatch.setattr(versioning, "asset_version", lambda: "nuevo-deploy")
+    response = client.get(CONTEXT, auth=auth, headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert "nuevo-deploy" in response.headers["etag"]
+
+
+def test_relative_times_expire_with_the_bucket(client, stocked, monkeypatch):
+    _, auth = stocked
+    items_etag = client.get(ITEMS, auth=auth).headers["etag"]
+    context_etag = client.get(CONTEXT, auth=auth).headers["etag"]
+
+    later = time.time() + versioning.RELATIVE_TIME_BUCKET
+    monkeypatch.setattr(time, "time", lambda: later)
+
+    # "hace 2h" / "se acaba en ~3 días" ya no valen; el contexto (nombres) sí
+    assert client.get(ITEMS, auth=auth, headers={"If-None-Match": items_etag}).status_code == 200
+    response = client.get(CONTEXT, auth=auth, headers={"If-None-Match": context_etag})
+    assert response.status_code == 304
+
+
+def test_client_etag_parsing():
+    match = versioning.CLIENT_ETAG_RE.search('W/"inv-3-41-abc123-t99"')
+    assert match.groups() == ("3", "41")
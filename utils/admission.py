@@ -0,0 +1,123 @@
+"""
+Control de admisión para trabajo caro (llamadas al LLM).
+
+Limita las operaciones simultáneas en total y por usuario. Lo que no entra
+espera en una cola acotada; si la cola está llena o la espera supera el
+timeout se rechaza enseguida con un `Retry-After` estimado, en vez de abrir
+más conexiones a OpenRouter o agotar el threadpool.
+
+Los límites son por proceso: con N workers el máximo global es N veces el
+configurado.
+"""
+
+import asyncio
+import math
+import time
+from contextlib import asynccontextmanager
+from typing import Hashable
+
+from utils.metrics import Counter, Histogram, register
+
+ADMISSION_WAIT = register(
+    Histogram("admission_wait_seconds", "Tiempo en cola antes de ser admitido", ("controller",))
+)
+ADMISSION_REJECTIONS = register(
+    Counter(
+        "admission_rejections_total", "Requests rechazados por admisión", ("controller", "reason")
+    )
+)
+
+
+class AdmissionRejected(Exception):
+    """No hay capacidad: el cliente debe reintentar tras `retry_after` segundos"""
+
+    def __init__(self, reason: str, retry_after: int):
+        super().__init__(reason)
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class AdmissionController:
+    """Semáforo global + semáforo por usuario con cola de espera acotada"""
+
+    def __init__(
+        self,
+        name: str,
+        max_concurrent: int,
+        max_per_user: int,
+        max_queue: int,
+        queue_timeout: float,
+    ):
+        self.name = name
+        self.max_concurrent = max_concurrent
+        self.max_per_user = max_per_user
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self._global = asyncio.Semaphore(max_concurrent)
+        # usuario -> [semáforo, requests que lo usan]; se borra al quedar sin uso
+        self._users: dict[Hashable, list] = {}
+        self._waiting = 0
+        # Media móvil de cuánto se retiene un cupo (estima Retry-After)
+        self._avg_hold = 1.0
+
+    @property
+    def waiting(self) -> int:
+        return self._waiting
+
+    def retry_after(self) -> int:
+        """Segundos estimados hasta que se libere capacidad para la cola actual"""
+        rounds = self._waiting / self.max_concurrent + 1
+        return max(1, math.ceil(self._avg_hold * rounds))
+
+    def _reject(self, reason: str):
+        ADMISSION_REJECTIONS.inc(controller=self.name, reason=reason)
+        raise AdmissionRejected(reason, self.retry_after())
+
+    @asynccontextmanager
+    async def admit(self, user_key: Hashable):
+        """
+        Holds a global and a per-user slot for the duration of the block.
+
+        Args:
+            user_key: Identifies the user for the per-user limit
+
+        Raises:
+            AdmissionRejected: Queue full or wait longer than queue_timeout
+        """
+        entry = self._users.setdefault(user_key, [asyncio.Semaphore(self.max_per_user), 0])
+        entry[1] += 1
+        user_semaphore = entry[0]
+        held: list[asyncio.Semaphore] = []
+        start = time.perf_counter()
+        try:
+            if user_semaphore.locked() or self._global.locked():
+                if self._waiting >= self.max_queue:
+                    self._reject("queue_full")
+                self._waiting += 1
+                try:
+                    await asyncio.wait_for(self._acquire(user_semaphore, held), self.queue_timeout)
+                except asyncio.TimeoutError:
+                    self._reject("timeout")
+                finally:
+                    self._waiting -= 1
+            else:
+                await self._acquire(user_semaphore, held)
+
+            admitted = time.perf_counter()
+            ADMISSION_WAIT.observe(admitted - start, controller=self.name)
+            yield
+            self._avg_hold = 0.8 * self._avg_hold + 0.2 * (time.perf_counter() - admitted)
+        finally:
+            for semaphore in reversed(held):
+                semaphore.release()
+            entry[1] -= 1
+            if entry[1] == 0:
+                self._users.pop(user_key, None)
+
+    async def _acquire(self, user_semaphore: asyncio.Semaphore, held: list):
+        # Primero el cupo del usuario: sus requests extra esperan sin ocupar
+        # cupos globales que otros usuarios podrían usar
+        await user_semaphore.acquire()
+        held.append(user_semaphore)
+        await self._global.acquire()
+        held.append(self._global)
@@ -0,0 +1,43 @@
+"""URLs de assets con fingerprint leídas del manifest generado por scripts/build_assets.py"""
+
+import json
+from functools import lru_cache
+from pathlib import Path
+
+STATIC_DIR = Path("static")
+ASSET_MANIFEST_PATH = STATIC_DIR / "asset-manifest.json"
+STATIC_URL = "/static/"
+
+
+@lru_cache(maxsize=1)
+def load_asset_manifest() -> dict:
+    """
+    Loads the asset manifest once per process.
+
+    Returns:
+        Dictionary with "version" and "assets" (logical path -> hashed path).
+        In development, when the build step has not run, an empty manifest
+        with version "dev" is returned so templates fall back to raw paths.
+    """
+    try:
+        return json.loads(ASSET_MANIFEST_PATH.read_text())
+    except (OSError, ValueError):
+        return {"version": "dev", "assets": {}}
+
+
+def asset_url(path: str) -> str:
+    """
+    Returns the public URL of a static asset, fingerprinted when available.
+
+    Args:
+        path: Path relative to static/ (e.g. "css/output.css")
+
+    Returns:
+        URL such as "/static/css/output.3f2a1b9c0d.css"
+    """
+    return STATIC_URL + load_asset_manifest()["assets"].get(path, path)
+
+
+def asset_version() -> str:
+    """Versión global de los assets (cambia en cada deploy con assets distintos)"""
+    return load_asset_manifest()["version"]
@@ -0,0 +1,103 @@
+"""
+Caches en memoria por proceso, coherentes entre workers.
+
+Cada entrada guarda la versión compartida (utils/versioning.py) vigente al
+empezar a calcularla; si otra escritura (en cualquier worker) sube esa versión,
+la entrada deja de ser válida. El TTL acota además datos que envejecen solos
+(p.ej. "hace 5 minutos" en los fragmentos de historial).
+
+Las caches por hogar derivan la versión de la clave (household_version_key):
+cada hogar tiene su partición lógica y una escritura solo invalida la suya.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Hashable, TypeVar, Union
+
+from utils.metrics import Counter, register
+from utils.versioning import get_version
+
+T = TypeVar("T")
+
+CACHE_REQUESTS = register(
+    Counter("app_cache_requests_total", "Consultas a caches en memoria", ("cache", "result"))
+)
+
+
+class VersionedTTLCache:
+    """LRU acotado por entradas, invalidado por TTL o por cambio de versión"""
+
+    def __init__(
+        self,
+        name: str,
+        version_key: Union[str, Callable[[Hashable], str]],
+        maxsize: int,
+        ttl: float,
+    ):
+        self.name = name
+        self.version_key = version_key
+        self.maxsize = maxsize
+        self.ttl = ttl
+        # key -> (versión, vence en, valor)
+        self._entries: OrderedDict[Hashable, tuple[int, float, object]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return self.maxsize > 0
+
+    def version(self, key: Hashable = None) -> int:
+        """Versión vigente para `key` (la clave importa si version_key es una función)"""
+        version_key = self.version_key(key) if callable(self.version_key) else self.version_key
+        return get_version(version_key)
+
+    def get(self, key: Hashable, default=None):
+        if not self.enabled:
+            return default
+        version = self.version(key)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and (entry[0] != version or entry[1] < time.monotonic()):
+                del self._entries[key]
+                entry = None
+            if entry is not None:
+                self._entries.move_to_end(key)
+        CACHE_REQUESTS.inc(cache=self.name, result="hit" if entry is not None else "miss")
+        return entry[2] if entry is not None else default
+
+    def set(self, key: Hashable, value, version: int):
+        """Guarda `value` calculado con los datos de `version` (leída antes de calcular)"""
+        if not self.enabled:
+            return
+        with self._lock:
+            self._entries[key] = (version, time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def get_or_create(self, key: Hashable, factory: Callable[[], T]) -> T:
+        """
+        Returns the cached value or computes and stores it.
+
+        Args:
+            key: Cache key
+            factory: Computes the value on a miss
+
+        Returns:
+            Cached or freshly computed value
+        """
+        missing = object()
+        value = self.get(key, missing)
+        if value is not missing:
+            return value
+        # Versión antes de leer: si alguien escribe mientras tanto, la entrada
+        # queda con la versión vieja y se descarta en la próxima lectura
+        version = self.version(key)
+        value = factory()
+        self.set(key, value, version)
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
@@ -0,0 +1,137 @@
+"""
+Agrupación de requests seguidos de un mismo usuario en una sola llamada cara.
+
+El primer request de un usuario abre una ventana de `window` segundos; los que
+llegan mientras está abierta se suman al grupo (hasta `max_size`, que la cierra
+antes). Al cerrar se llama una sola vez a `run` con todo el grupo y cada
+request recibe su parte del resultado.
+
+Es especulativo: el primer request paga la espera de la ventana aunque no
+llegue ningún otro. Las métricas muestran las llamadas ahorradas y la latencia
+agregada. Como la admisión, los grupos son por proceso.
+"""
+
+import asyncio
+import time
+from typing import Any, Awaitable, Callable, Hashable
+
+from utils.metrics import Counter, Histogram, register
+
+COALESCE_WAIT = register(
+    Histogram(
+        "coalesce_wait_seconds", "Latencia agregada esperando a que cierre el grupo", ("coalescer",)
+    )
+)
+COALESCE_GROUP_SIZE = register(
+    Histogram(
+        "coalesce_group_size",
+        "Requests por llamada agrupada",
+        ("coalescer",),
+        (1, 2, 3, 4, 5, 8, 13),
+    )
+)
+COALESCE_CALLS_SAVED = register(
+    Counter("coalesce_calls_saved_total", "Llamadas evitadas al agrupar requests", ("coalescer",))
+)
+
+
+class _Group:
+    """Requests de un usuario esperando la misma llamada"""
+
+    __slots__ = ("items", "arrivals", "full", "future", "task")
+
+    def __init__(self):
+        self.items: list = []
+        self.arrivals: list[float] = []
+        self.full = asyncio.Event()
+        self.future: asyncio.Future = asyncio.get_running_loop().create_future()
+        # Nadie espera el resultado si todos los requests se cancelaron
+        self.future.add_done_callback(lambda future: future.cancelled() or future.exception())
+        self.task: asyncio.Task | None = None
+
+
+class RequestCoalescer:
+    """Ventana por usuario que junta requests en una llamada a `run`"""
+
+    def __init__(
+        self,
+        name: str,
+        window: float,
+        max_size: int,
+        run: Callable[[list], Awaitable[list]],
+    ):
+        self.name = name
+        self.window = window
+        self.max_size = max_size
+        self.run = run
+        # usuario -> grupo con la ventana abierta
+        self._open: dict[Hashable, _Group] = {}
+
+    @property
+    def enabled(self) -> bool:
+        return self.window > 0 and self.max_size > 1
+
+    async def submit(self, key: Hashable, item: Any) -> Any:
+        """
+        Adds `item` to the open group of `key` (opening one if needed) and waits for its result.
+
+        Args:
+            key: Only items with the same key are grouped (the user)
+            item: Payload passed to `run` together with the rest of the group
+
+        Returns:
+            The element of `run`'s result at this item's position
+
+        Raises:
+            Whatever `run` raised, in every request of the group
+        """
+        if not self.enabled:
+            return (await self.run([item]))[0]
+
+        group = self._open.get(key)
+        if group is None:
+            group = self._open[key] = _Group()
+            group.task = asyncio.create_task(self._flush(key, group))
+
+        index = len(group.items)
+        group.items.append(item)
+        group.arrivals.append(time.perf_counter())
+        if len(group.items) >= self.max_size:
+            self._close(key, group)
+
+        # shield: si el cliente de este request corta, la llamada sigue para el resto
+        return (await asyncio.shield(group.future))[index]
+
+    def _close(self, key: Hashable, group: _Group):
+        if self._open.get(key) is group:
+            del self._open[key]
+        group.full.set()
+
+    async def _flush(self, key: Hashable, group: _Group):
+        try:
+            try:
+                await asyncio.wait_for(group.full.wait(), self.window)
+            except asyncio.TimeoutError:
+                pass
+            self._close(key, group)
+
+            closed = time.perf_counter()
+            for arrival in group.arrivals:
+                COALESCE_WAIT.observe(closed - arrival, coalescer=self.name)
+            COALESCE_GROUP_SIZE.observe(len(group.items), coalescer=self.name)
+            if len(group.items) > 1:
+                COALESCE_CALLS_SAVED.inc(len(group.items) - 1, coalescer=self.name)
+
+            results = await self.run(group.items)
+        except BaseException as exc:
+            # Cancelación (apagado, threadpool) incluida: el grupo nunca queda
+            # esperando un futuro sin resolver
+            self._close(key, group)
+            if isinstance(exc, asyncio.CancelledError):
+                group.future.cancel()
+            else:
+                group.future.set_exception(exc)
+            if not isinstance(exc, Exception):
+                raise
+        else:
+            group.future.set_result(results)
@@ -0,0 +1,438 @@
+"""
+Vocabulario de comandos del inventario y su ejecución en bloque.
+
+Lo usan el dictado (POST /process/text, comandos que devuelve el LLM) y la API
+JSON (POST /process/batch, comandos validados con los modelos de este módulo).
+
+`apply_commands()` resuelve todos los nombres del hogar con dos queries
+(secciones del hogar + items mencionados), aplica los comandos sobre esos mapas en
+memoria e inserta items nuevos e historial con INSERTs multi-fila. No hace commit;
+los registros cambiados quedan en la sesión para actualizar la copia en memoria
+(utils.snapshot) cuando el llamador confirma.
+"""
+
+from datetime import datetime
+from typing import Annotated, Any, Literal, Union
+
+from pydantic import BaseModel, Field
+from sqlalchemy import delete, func, insert
+from sqlmodel import Session, select
+
+from config.database.models import Item, ItemHistory, ItemHistoryRollup, Section
+from config.settings import BATCH_MAX_COMMANDS
+from utils.snapshot import stage_changes
+
+Name = Annotated[str, Field(min_length=1, max_length=200)]
+
+
+class AddCommand(BaseModel):
+    action: Literal["add"]
+    item: Name
+    quantity: float
+
+
+class SetCommand(BaseModel):
+    action: Literal["set"]
+    item: Name
+    quantity: float
+
+
+class RemoveCommand(BaseModel):
+    action: Literal["remove"]
+    item: Name
+
+
+class CreateItemCommand(BaseModel):
+    action: Literal["create_item"]
+    item: Name
+    quantity: float | None = None
+    unit: str | None = None
+    section: Name | None = None
+    section_emoji: str | None = None
+    emoji: str | None = None
+    threshold: float | None = None
+
+
+class CreateSectionCommand(BaseModel):
+    action: Literal["create_section"]
+    section: Name
+    emoji: str | None = None
+
+
+class MoveItemCommand(BaseModel):
+    action: Literal["move_item"]
+    item: Name
+    to_section: Name
+
+
+class ChangeEmojiCommand(BaseModel):
+    action: Literal["change_emoji"]
+    target_type: Literal["item", "section"]
+    target_name: Name
+    emoji: str
+
+
+class DeleteItemCommand(BaseModel):
+    action: Literal["delete_item"]
+    item: Name
+
+
+class DeleteSectionCommand(BaseModel):
+    action: Literal["delete_section"]
+    section: Name
+
+
+Command = Annotated[
+    Union[
+        AddCommand,
+        SetCommand,
+        RemoveCommand,
+        CreateItemCommand,
+        CreateSectionCommand,
+        MoveItemCommand,
+        ChangeEmojiCommand,
+        DeleteItemCommand,
+        DeleteSectionCommand,
+    ],
+    Field(discriminator="action"),
+]
+
+
+class CommandBatch(BaseModel):
+    """Cuerpo de POST /process/batch"""
+
+    commands: list[Command] = Field(min_length=1, max_length=BATCH_MAX_COMMANDS)
+    # True: si algún comando falla no se aplica ninguno
+    atomic: bool = False
+
+
+class CommandResult:
+    """Resultado de un comando: mensaje de cambio o de error"""
+
+    __slots__ = ("index", "action", "ok", "message")
+
+    def __init__(self, index: int, action: str | None, ok: bool, message: str):
+        self.index = index
+        self.action = action
+        self.ok = ok
+        self.message = message
+
+    def to_dict(self) -> dict:
+        return {"index": self.index, "action": self.action, "ok": self.ok, "message": self.message}
+
+
+class CommandError(Exception):
+    """Comando inválido para el estado actual del inventario (se informa y se sigue)"""
+
+
+def _mentioned_item_names(commands: list[dict[str, Any]]) -> set[str]:
+    names = set()
+    for cmd in commands:
+        name = cmd.get("target_name") if cmd.get("target_type") == "item" else cmd.get("item")
+        if isinstance(name, str):
+            names.add(name.lower())
+    return names
+
+
+NEW_ITEM_COLUMNS = (
+    "household_id",
+    "name",
+    "emoji",
+    "quantity",
+    "unit",
+    "threshold",
+    "section_id",
+    "updated_at",
+)
+
+
+class InventoryBatch:
+    """Estado en memoria de un lote de un hogar: mapas por nombre, items nuevos e historial"""
+
+    def __init__(self, session: Session, commands: list[dict[str, Any]], household_id: int):
+        self.session = session
+        self.household_id = household_id
+        sections = session.exec(select(Section).where(Section.household_id == household_id)).all()
+        self.sections = {section.name.lower(): section for section in sections}
+        self.sections_by_id = {section.id: section for section in sections}
+
+        names = _mentioned_item_names(commands)
+        items = (
+            session.exec(
+                select(Item).where(
+                    Item.household_id == household_id, func.lower(Item.name).in_(names)
+                )
+            ).all()
+            if names
+            else []
+        )
+        self.items: dict[str, Item] = {}
+        for item in items:
+            # Igual que find_item_by_name(): el primero con ese nombre
+            self.items.setdefault(item.name.lower(), item)
+
+        # Items creados en el lote: fuera de la sesión hasta el INSERT multi-fila
+        self.new_items: dict[int, Item] = {}
+        # (item, cantidad, fecha): se insertan al final, ya con ids asignados
+        self.history: list[tuple[Item, float, datetime]] = []
+        # Ids borrados, para la copia en memoria del inventario
+        self.deleted_items: list[int] = []
+        self.deleted_sections: list[int] = []
+
+    def item(self, name: str) -> Item | None:
+        return self.items.get(name.lower())
+
+    def section(self, name: str) -> Section | None:
+        return self.sections.get(name.lower())
+
+    def section_of(self, item: Item) -> Section:
+        return self.sections_by_id[item.section_id]
+
+    def record_history(self, item: Item, now: datetime):
+        self.history.append((item, item.quantity, now))
+
+    def add_section(self, name: str, emoji: str) -> Section:
+        section = Section(household_id=self.household_id, name=name.title(), emoji=emoji)
+        self.session.add(section)
+        # Flush inmediato (raro: pocas secciones nuevas) para tener su id
+        self.session.flush()
+        self.sections[section.name.lower()] = section
+        self.sections_by_id[section.id] = section
+        return section
+
+    def add_item(self, item: Item):
+        self.new_items[id(item)] = item
+        self.items[item.name.lower()] = item
+
+    def delete_item(self, item: Item):
+        if self.new_items.pop(id(item), None) is None:
+            # Historial primero: sin cascade, el ORM intentaría dejar item_id en NULL
+            self.session.execute(delete(ItemHistory).where(ItemHistory.item_id == item.id))
+            self.session.execute(
+                delete(ItemHistoryRollup).where(ItemHistoryRollup.item_id == item.id)
+            )
+            self.session.delete(item)
+            self.deleted_items.append(item.id)
+        self.items.pop(item.name.lower(), None)
+        self.history = [entry for entry in self.history if entry[0] is not item]
+
+    def delete_section(self, section: Section):
+        self.session.delete(section)
+        self.deleted_sections.append(section.id)
+        self.sections.pop(section.name.lower(), None)
+        self.sections_by_id.pop(section.id, None)
+
+    def count_items_in(self, section: Section) -> int:
+        """Items en la sección contando los cambios pendientes del lote"""
+        self.session.flush()
+        persisted = self.session.exec(
+            select(func.count()).select_from(Item).where(Item.section_id == section.id)
+        ).one()
+        pending = sum(1 for item in self.new_items.values() if item.section_id == section.id)
+        return persisted + pending
+
+    def flush(self):
+        """UPDATE/DELETE por el ORM; items nuevos e historial en INSERTs multi-fila"""
+        self.session.flush()
+
+        if self.new_items:
+            rows = [
+                {column: getattr(item, column) for column in NEW_ITEM_COLUMNS}
+                for item in self.new_items.values()
+            ]
+            # RETURNING no garantiza el orden: ids por nombre (únicos dentro del lote)
+            inserted = self.session.execute(insert(Item).returning(Item.id, Item.name), rows)
+            ids = {name.lower(): item_id for item_id, name in inserted}
+            for item in self.new_items.values():
+                item.id = ids[item.name.lower()]
+            self.new_items.clear()
+
+        rows = [
+            {
+                "household_id": self.household_id,
+                "item_id": item.id,
+                "quantity": quantity,
+                "changed_at": changed_at,
+            }
+            for item, quantity, changed_at in self.history
+        ]
+        if rows:
+            self.session.execute(insert(ItemHistory), rows)
+        self.history.clear()
+
+        # Items y secciones tocados (todos con id): write-through al confirmar
+        stage_changes(
+            self.session,
+            self.household_id,
+            self.items.values(),
+            self.sections_by_id.values(),
+            self.deleted_items,
+            self.deleted_sections,
+        )
+
+
+def _apply(batch: InventoryBatch, cmd: dict[str, Any]) -> str:
+    """Aplica un comando y devuelve el mensaje de cambio; CommandError si no aplica"""
+    action = cmd.get("action")
+    now = datetime.utcnow()
+
+    if action == "add":
+        item = batch.item(cmd["item"])
+        if not item:
+            raise CommandError(f"Item '{cmd['item']}' no existe (usar create_item)")
+        old_qty = item.quantity
+        item.quantity += cmd["quantity"]
+        item.updated_at = now
+        batch.record_history(item, now)
+        return f"Agregado: {item.name} {old_qty} → {item.quantity} {item.unit}"
+
+    if action == "set":
+        item = batch.item(cmd["item"])
+        if not item:
+            raise CommandError(f"Item '{cmd['item']}' no existe")
+        old_qty = item.quantity
+        item.quantity = cmd["quantity"]
+        item.updated_at = now
+        batch.record_history(item, now)
+        return f"Actualizado: {item.name} {old_qty} → {item.quantity} {item.unit}"
+
+    if action == "remove":
+        item = batch.item(cmd["item"])
+        if not item:
+            raise CommandError(f"Item '{cmd['item']}' no existe")
+        batch.delete_item(item)
+        return f"Eliminado: {item.name}"
+
+    if action == "create_item":
+        existing_item = batch.item(cmd["item"])
+        if existing_item:
+            # Actualizar item existente
+            old_qty = existing_item.quantity
+            existing_item.quantity = cmd.get("quantity", existing_item.quantity)
+            existing_item.updated_at = now
+            batch.record_history(existing_item, now)
+            return (
+                f"Actualizado: {existing_item.emoji} {existing_item.name} {old_qty} → "
+                f"{existing_item.quantity} {existing_item.unit}"
+            )
+
+        section_name = cmd.get("section", "almacen 1")
+        section = batch.section(section_name) or batch.add_section(
+            section_name, cmd.get("section_emoji", "📦")
+        )
+        new_item = Item(
+            household_id=batch.household_id,
+            name=cmd["item"],
+            emoji=cmd.get("emoji", "🍽️"),
+            quantity=cmd.get("quantity", 0),
+            unit=cmd.get("unit", "unidades"),
+            threshold=cmd.get("threshold", 1),
+            section_id=section.id,
+            updated_at=now,
+        )
+        batch.add_item(new_item)
+        batch.record_history(new_item, now)
+        return (
+            f"Creado: {new_item.emoji} {new_item.name} ({new_item.quantity} {new_item.unit}) "
+            f"en {section.name}"
+        )
+
+    if action == "create_section":
+        section_name = cmd.get("section", "")
+        if batch.section(section_name):
+            raise CommandError(f"Sección '{section_name}' ya existe")
+        new_section = batch.add_section(section_name, cmd.get("emoji", "📦"))
+        return f"Creada sección: {new_section.emoji} {new_section.name}"
+
+    if action == "move_item":
+        item = batch.item(cmd["item"])
+        if not item:
+            raise CommandError(f"Item '{cmd['item']}' no existe")
+        section_name = cmd.get("to_section", "")
+        new_section = batch.section(section_name)
+        if not new_section:
+            raise CommandError(f"Sección '{section_name}' no existe")
+        old_section = batch.section_of(item).name
+        item.section_id = new_section.id
+        item.updated_at = now
+        return f"Movido: {item.emoji} {item.name} de {old_section} → {new_section.name}"
+
+    if action == "change_emoji":
+        target_type = cmd.get("target_type")  # "item" o "section"
+        target_name = cmd.get("target_name", "")
+        new_emoji = cmd.get("emoji", "")
+
+        if target_type == "item":
+            item = batch.item(target_name)
+            if not item:
+                raise CommandError(f"Item '{target_name}' no existe")
+            old_emoji = item.emoji
+            item.emoji = new_emoji
+            item.updated_at = now
+            return f"Emoji cambiado: {item.name} {old_emoji} → {new_emoji}"
+
+        if target_type == "section":
+            section = batch.section(target_name)
+            if not section:
+                raise CommandError(f"Sección '{target_name}' no existe")
+            old_emoji = section.emoji
+            section.emoji = new_emoji
+            return f"Emoji cambiado: {section.name} {old_emoji} → {new_emoji}"
+
+        raise CommandError(f"target_type '{target_type}' inválido (debe ser 'item' o 'section')")
+
+    if action == "delete_item":
+        item = batch.item(cmd["item"])
+        if not item:
+            raise CommandError(f"Item '{cmd['item']}' no existe")
+        item_name, item_emoji = item.name, item.emoji
+        batch.delete_item(item)
+        return f"Eliminado: {item_emoji} {item_name}"
+
+    if action == "delete_section":
+        section_name = cmd.get("section", "")
+        section = batch.section(section_name)
+        if not section:
+            raise CommandError(f"Sección '{section_name}' no existe")
+
+        items_in_section = batch.count_items_in(section)
+        if items_in_section:
+            raise CommandError(
+                f"No se puede eliminar '{section.name}' porque contiene {items_in_section} items. "
+                "Mueve o elimina los items primero."
+            )
+        batch.delete_section(section)
+        return f"Eliminada sección: {section.emoji} {section.name}"
+
+    raise CommandError(f"Acción '{action}' desconocida")
+
+
+def apply_commands(
+    session: Session, commands: list[dict[str, Any]], household_id: int
+) -> list[CommandResult]:
+    """
+    Applies inventory commands in order, leaving the changes pending in `session`.
+
+    A failing command is reported and the rest continue, as with dictation.
+
+    Args:
+        session: Database session (the caller commits)
+        commands: Commands as dicts ({"action": ..., ...})
+        household_id: Household whose inventory is modified (names resolve only there)
+
+    Returns:
+        One CommandResult per command, in the same order
+    """
+    batch = InventoryBatch(session, commands, household_id)
+    results = []
+    for index, cmd in enumerate(commands):
+        try:
+            results.append(CommandResult(index, cmd.get("action"), True, _apply(batch, cmd)))
+        except CommandError as e:
+            results.append(CommandResult(index, cmd.get("action"), False, str(e)))
+        except Exception as e:
+            results.append(
+                CommandResult(index, cmd.get("action"), False, f"Error en comando {cmd}: {str(e)}")
+            )
+    batch.flush()
+    return results
@@ -0,0 +1,278 @@
+"""
+Pronóstico de consumo: "se acaba en ~4 días" por item.
+
+La tasa de consumo de un item es lo que bajó su cantidad (solo las bajas; las
+reposiciones no cuentan) dividido por el tiempo desde su primer cambio dentro
+de la ventana de FORECAST_WINDOW_DAYS. El historial se carga en bloque como
+arrays columnares y se agrega para todos los items en una sola pasada NumPy
+(diff + reduceat), sin recorrer filas en Python.
+
+Las estadísticas quedan en memoria por item (los ids son globales, una sola
+copia para todos los hogares). La carga completa corre en una tarea de fondo
+del lifespan (`forecast_loop`, en el threadpool) al arrancar y cada
+FORECAST_REBUILD_INTERVAL, para que la ventana avance y recoger filas que
+llegaron con ids fuera de orden. Los requests nunca la disparan: leen lo último
+calculado y, si cambió la versión del hogar, solo suman las filas de historial
+nuevas (id mayor al último visto). Hasta la primera carga no hay pronóstico.
+
+NumPy se importa en la primera carga de historial: routes.inventory importa
+este módulo y no debe pesar en el arranque en frío.
+"""
+
+import asyncio
+import logging
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import TYPE_CHECKING
+
+from sqlalchemy import String, cast
+from sqlmodel import Session, select
+from starlette.concurrency import run_in_threadpool
+
+from config.database.db import engine
+from config.database.models import ItemHistory
+from config.settings import FORECAST_REBUILD_INTERVAL, FORECAST_WINDOW_DAYS
+from utils.metrics import Counter, register
+from utils.versioning import get_version, inventory_version_key
+
+if TYPE_CHECKING:
+    import numpy as np
+
+logger = logging.getLogger("inventario.forecast")
+
+FORECAST_REFRESHES = register(
+    Counter("forecast_refreshes_total", "Recargas del pronóstico de consumo", ("kind",))
+)
+
+SECONDS_PER_DAY = 86400.0
+MIN_SPAN_DAYS = 1.0  # un solo día de datos no extrapola consumos de minutos
+
+
+class ItemConsumption:
+    """Consumo acumulado de un item dentro de la ventana"""
+
+    __slots__ = ("first_at", "consumed", "last_quantity")
+
+    def __init__(self, first_at: float, consumed: float, last_quantity: float):
+        self.first_at = first_at  # epoch del primer cambio en la ventana
+        self.consumed = consumed  # suma de las bajas de cantidad
+        self.last_quantity = last_quantity  # para el delta con la próxima fila nueva
+
+    def rate(self, now: float) -> float:
+        """Unidades consumidas por día"""
+        span = max((now - self.first_at) / SECONDS_PER_DAY, MIN_SPAN_DAYS)
+        return self.consumed / span
+
+
+def load_history_arrays(
+    session: Session, since: datetime, after_id: int = 0
+) -> dict[str, "np.ndarray"]:
+    """
+    Loads history rows as columnar arrays ordered by (item_id, changed_at, id).
+
+    Args:
+        session: Database session
+        since: Only rows changed at or after this moment
+        after_id: Only rows with a greater id (incremental refresh)
+
+    Returns:
+        Dictionary with "id", "item_id", "quantity" and "changed_at" (epoch seconds) arrays
+    """
+    import numpy as np
+
+    # Core (sin la capa ORM) y fechas como texto: NumPy las parsea en bloque,
+    # mucho más rápido que convertir un datetime de Python por fila
+    rows = session.connection().execute(
+        select(
+            ItemHistory.id,
+            ItemHistory.item_id,
+            ItemHistory.quantity,
+            cast(ItemHistory.changed_at, String),
+        )
+        .where(ItemHistory.changed_at >= since, ItemHistory.id > after_id)
+        .order_by(ItemHistory.item_id, ItemHistory.changed_at, ItemHistory.id)
+    ).all()
+    if not rows:
+        no_ids = np.empty(0, dtype=np.int64)
+        return {"id": no_ids, "item_id": no_ids, "quantity": np.empty(0), "changed_at": np.empty(0)}
+
+    ids, item_ids, quantities, changed_at = zip(*rows)
+    return {
+        "id": np.fromiter(ids, dtype=np.int64, count=len(rows)),
+        "item_id": np.fromiter(item_ids, dtype=np.int64, count=len(rows)),
+        "quantity": np.fromiter(quantities, dtype=np.float64, count=len(rows)),
+        "changed_at": np.array(changed_at, dtype="datetime64[us]").astype(np.int64) / 1e6,
+    }
+
+
+def aggregate_consumption(
+    arrays: dict[str, "np.ndarray"], previous: dict[int, ItemConsumption]
+) -> dict[int, ItemConsumption]:
+    """
+    Aggregates consumption per item in one vectorized pass, merging into `previous`.
+
+    Args:
+        arrays: Output of load_history_arrays() (sorted by item, then time)
+        previous: Per-item state to extend (rows must be newer than its data)
+
+    Returns:
+        Updated per-item state (a new dictionary; `previous` is not modified)
+    """
+    import numpy as np
+
+    result = dict(previous)
+    item_ids = arrays["item_id"]
+    if not len(item_ids):
+        return result
+
+    quantities = arrays["quantity"]
+    times = arrays["changed_at"]
+    unique_ids, starts = np.unique(item_ids, return_index=True)
+    ends = np.append(starts[1:], len(item_ids)) - 1
+
+    deltas = np.diff(quantities, prepend=np.nan)
+    # Primera fila de cada item: delta contra la última cantidad ya acumulada
+    previous_last = np.array(
+        [previous[i].last_quantity if i in previous else np.nan for i in unique_ids.tolist()]
+    )
+    deltas[starts] = quantities[starts] - previous_last
+    consumed = np.add.reduceat(np.where(deltas < 0, -deltas, 0.0), starts)
+
+    for item_id, first_at, total, last_quantity in zip(
+        unique_ids.tolist(), times[starts].tolist(), consumed.tolist(), quantities[ends].tolist()
+    ):
+        state = previous.get(item_id)
+        if state is None:
+            result[item_id] = ItemConsumption(first_at, total, last_quantity)
+        else:
+            result[item_id] = ItemConsumption(state.first_at, state.consumed + total, last_quantity)
+    return result
+
+
+def days_until_empty(quantity: float, rate: float | None) -> float | None:
+    """Días hasta agotar `quantity` al ritmo `rate` (None sin consumo registrado)"""
+    if not rate or rate <= 0:
+        return None
+    return max(quantity, 0) / rate
+
+
+def rank_by_depletion(rows: list[tuple], days_left: dict[int, float | None]) -> list[tuple]:
+    """
+    Orders item rows by forecast depletion, soonest first.
+
+    Args:
+        rows: Tuples whose first element is the item id, already in fallback order
+        days_left: Output of ConsumptionForecast.days_left()
+
+    Returns:
+        New list; items without a forecast keep their relative order at the end
+    """
+    return sorted(rows, key=lambda row: (days_left.get(row[0]) is None, days_left.get(row[0]) or 0))
+
+
+class ConsumptionForecast:
+    """Tasas de consumo por item: carga completa de fondo, incremental en cada lectura"""
+
+    def __init__(self, window_days: int, rebuild_interval: float):
+        self.window_days = window_days
+        self.rebuild_interval = rebuild_interval
+        self._lock = threading.Lock()
+        self._state: dict[int, ItemConsumption] = {}
+        self._last_id = 0
+        # household_id -> versión vista; otra versión trae filas nuevas
+        self._versions: dict[int, int] = {}
+        self._built = False
+
+    def rebuild(self):
+        """Carga completa de la ventana (tarea de fondo, fuera del lock mientras lee)"""
+        since = datetime.utcnow() - timedelta(days=self.window_days)
+        with Session(engine) as session:
+            arrays = load_history_arrays(session, since)
+        state = aggregate_consumption(arrays, {})
+
+        with self._lock:
+            # Filas escritas durante la carga: las suma el próximo incremental
+            self._state = state
+            self._last_id = int(arrays["id"].max()) if len(arrays["id"]) else 0
+            self._versions = {}
+            self._built = True
+        FORECAST_REFRESHES.inc(kind="rebuild")
+
+    def _refresh(self, household_id: int):
+        if not self._built:
+            return
+        version = get_version(inventory_version_key(household_id))
+        if version == self._versions.get(household_id):
+            return
+
+        since = datetime.utcnow() - timedelta(days=self.window_days)
+        with Session(engine) as session:
+            arrays = load_history_arrays(session, since, self._last_id)
+
+        self._state = aggregate_consumption(arrays, self._state)
+        if len(arrays["id"]):
+            self._last_id = max(self._last_id, int(arrays["id"].max()))
+        self._versions[household_id] = version
+        FORECAST_REFRESHES.inc(kind="incremental")
+
+    def _snapshot(self, household_id: int) -> dict[int, ItemConsumption]:
+        with self._lock:
+            self._refresh(household_id)
+            return self._state
+
+    def rates(self, household_id: int) -> dict[int, float]:
+        """
+        Returns the consumption rate (units per day) of every item with history.
+
+        Args:
+            household_id: Household whose version is checked before answering
+
+        Returns:
+            Dictionary item_id -> units per day (all households)
+        """
+        now = time.time()
+        return {
+            item_id: consumption.rate(now)
+            for item_id, consumption in self._snapshot(household_id).items()
+        }
+
+    def days_left(self, household_id: int, quantities: dict[int, float]) -> dict[int, float | None]:
+        """
+        Estimates days until each item runs out.
+
+        Args:
+            household_id: Household that owns the items
+            quantities: item_id -> current quantity
+
+        Returns:
+            item_id -> days left, or None when the item has no recorded consumption
+        """
+        state = self._snapshot(household_id)
+        now = time.time()
+        rates = {item_id: state[item_id].rate(now) for item_id in quantities if item_id in state}
+        return {
+            item_id: days_until_empty(quantity, rates.get(item_id))
+            for item_id, quantity in quantities.items()
+        }
+
+    def clear(self):
+        with self._lock:
+            self._state = {}
+            self._last_id = 0
+            self._versions = {}
+            self._built = False
+
+
+consumption_forecast = ConsumptionForecast(FORECAST_WINDOW_DAYS, FORECAST_REBUILD_INTERVAL)
+
+
+
+async def forecast_loop():
+    """Tarea de fondo del lifespan: carga completa al arrancar y cada intervalo"""
+    while True:
+        try:
+            await run_in_threadpool(consumption_forecast.rebuild)
+        except Exception:
+            logger.exception("forecast rebuild failed")
+        await asyncio.sleep(consumption_forecast.rebuild_interval)
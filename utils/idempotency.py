@@ -0,0 +1,243 @@
+"""
+Idempotency-Key para POSTs que modifican el inventario.
+
+- El primer request con una key la reclama (fila "en curso" en IdempotencyRecord,
+  visible para todos los workers) y se ejecuta normalmente.
+- Duplicados en el mismo proceso esperan el mismo Future: una sola llamada al
+  LLM y una sola transacción. En otro worker, esperan consultando la fila.
+- La respuesta final se guarda en la misma transacción que los cambios, así
+  que un reintento nunca vuelve a aplicar un `add`. Durante IDEMPOTENCY_TTL los
+  reintentos reciben la respuesta original (header Idempotent-Replayed).
+- 429 y 5xx no se guardan: la key queda libre para reintentar.
+"""
+
+import asyncio
+import hashlib
+import time
+from datetime import datetime, timedelta
+from typing import Awaitable, Callable
+
+import orjson
+from fastapi import Response
+from sqlalchemy import delete
+from sqlalchemy.exc import IntegrityError
+from sqlmodel import Session
+
+from config.database.db import engine
+from config.database.models import IdempotencyRecord
+from config.settings import IDEMPOTENCY_TTL, IDEMPOTENCY_WAIT_TIMEOUT
+
+MAX_KEY_LENGTH = 255
+POLL_INTERVAL = 0.25  # segundos entre consultas al esperar a otro worker
+PURGE_INTERVAL = 600  # segundos entre borrados de registros vencidos
+
+# Headers de la respuesta original que se devuelven en un replay
+REPLAYED_HEADERS = ("content-type", "hx-trigger", "x-inventory-version")
+
+# key -> Future con (request_hash, snapshot) del request en curso en este proceso
+_in_flight: dict[str, asyncio.Future] = {}
+_last_purge = float("-inf")
+
+
+class IdempotencyConflict(Exception):
+    """La key no se puede usar: otro contenido, key inválida o el original no terminó a tiempo"""
+
+    def __init__(self, status_code: int, message: str):
+        super().__init__(message)
+        self.status_code = status_code
+        self.message = message
+
+
+def request_fingerprint(*parts: str | None) -> str:
+    """Hash del contenido del request (detecta una key reutilizada con otro texto)"""
+    return hashlib.sha256("\x1f".join(part or "" for part in parts).encode()).hexdigest()
+
+
+def is_retryable(status_code: int) -> bool:
+    return status_code == 429 or status_code >= 500
+
+
+def snapshot(response: Response) -> dict:
+    return {
+        "status_code": response.status_code,
+        "headers": {k: v for k, v in response.headers.items() if k in REPLAYED_HEADERS},
+        "body": response.body.decode(),
+    }
+
+
+def replay(saved: dict) -> Response:
+    """Respuesta original reconstruida, marcada como replay"""
+    return Response(
+        content=saved["body"],
+        status_code=saved["status_code"],
+        headers={**saved["headers"], "Idempotent-Replayed": "true"},
+    )
+
+
+def _record_snapshot(record: IdempotencyRecord) -> dict:
+    return {
+        "status_code": record.status_code,
+        "headers": orjson.loads(record.headers or "{}"),
+        "body": record.body or "",
+    }
+
+
+def _purge_expired(session: Session, now: datetime):
+    global _last_purge
+    if time.monotonic() - _last_purge < PURGE_INTERVAL:
+        return
+    _last_purge = time.monotonic()
+    session.execute(delete(IdempotencyRecord).where(IdempotencyRecord.expires_at < now))
+
+
+def _claim(key: str, request_hash: str) -> IdempotencyRecord | None:
+    """
+    Inserts the in-progress record for `key`.
+
+    Args:
+        key: Scoped key ("{user_id}:{Idempotency-Key}")
+        request_hash: Fingerprint of the request content
+
+    Returns:
+        None if this request owns the key, or the existing record otherwise
+    """
+    now = datetime.utcnow()
+    with Session(engine) as session:
+        _purge_expired(session, now)
+        session.add(
+            IdempotencyRecord(
+                key=key,
+                request_hash=request_hash,
+                expires_at=now + timedelta(seconds=IDEMPOTENCY_TTL),
+            )
+        )
+        try:
+            session.commit()
+            return None
+        except IntegrityError:
+            session.rollback()
+
+        existing = session.get(IdempotencyRecord, key)
+        if existing is None:
+            # El dueño falló y liberó la key entre el INSERT y la lectura
+            return _claim(key, request_hash)
+
+        abandoned = existing.status_code is None and (
+            now - existing.created_at > timedelta(seconds=2 * IDEMPOTENCY_WAIT_TIMEOUT)
+        )
+        if existing.expires_at < now or abandoned:
+            # Vencido, o el worker que lo tomó murió sin terminar: reclamarlo
+            existing.request_hash = request_hash
+            existing.status_code = existing.headers = existing.body = None
+            existing.created_at = now
+            existing.expires_at = now + timedelta(seconds=IDEMPOTENCY_TTL)
+            session.add(existing)
+            session.commit()
+            return None
+        return existing
+
+
+def _release(key: str):
+    """Borra el registro en curso: el request falló y se puede reintentar"""
+    with Session(engine) as session:
+        session.execute(
+            delete(IdempotencyRecord).where(
+                IdempotencyRecord.key == key, IdempotencyRecord.status_code.is_(None)
+            )
+        )
+        session.commit()
+
+
+async def _wait_for_other_worker(key: str) -> dict:
+    """Espera a que el request original (en otro worker) guarde su respuesta"""
+    deadline = time.monotonic() + IDEMPOTENCY_WAIT_TIMEOUT
+    while time.monotonic() < deadline:
+        await asyncio.sleep(POLL_INTERVAL)
+        with Session(engine) as session:
+            record = session.get(IdempotencyRecord, key)
+            if record is None:
+                break
+            if record.status_code is not None:
+                return _record_snapshot(record)
+    raise IdempotencyConflict(
+        409, "El pedido original sigue en proceso o falló; reintenta en unos segundos."
+    )
+
+
+def _check_hash(saved_hash: str, request_hash: str):
+    if saved_hash != request_hash:
+        raise IdempotencyConflict(422, "La Idempotency-Key ya se usó con otro contenido.")
+
+
+async def run_idempotent(
+    session: Session,
+    scope: str,
+    key: str,
+    request_hash: str,
+    handler: Callable[[], Awaitable[Response]],
+) -> Response:
+    """
+    Executes `handler` at most once per (scope, key), committing `session`.
+
+    The handler must leave its changes pending (flush, no commit): the stored
+    response is written in the same transaction.
+
+    Args:
+        session: Request session used by the handler
+        scope: Owner of the key (user id), keys never collide across users
+        key: Client-provided Idempotency-Key
+        request_hash: request_fingerprint() of the request content
+        handler: Produces the response on first execution
+
+    Returns:
+        The handler's response, or a replay of the original one
+
+    Raises:
+        IdempotencyConflict: Invalid key, key reused with other content, or
+            the original request did not finish in time
+    """
+    if not key or len(key) > MAX_KEY_LENGTH:
+        raise IdempotencyConflict(400, "Idempotency-Key inválida.")
+    scoped = f"{scope}:{key}"
+
+    pending = _in_flight.get(scoped)
+    if pending is not None:
+        saved_hash, saved = await asyncio.shield(pending)
+        _check_hash(saved_hash, request_hash)
+        return replay(saved)
+
+    existing = _claim(scoped, request_hash)
+    if existing is not None:
+        _check_hash(existing.request_hash, request_hash)
+        if existing.status_code is not None:
+            return replay(_record_snapshot(existing))
+        return replay(await _wait_for_other_worker(scoped))
+
+    future = asyncio.get_running_loop().create_future()
+    _in_flight[scoped] = future
+    try:
+        response = await handler()
+        saved = snapshot(response)
+        if is_retryable(response.status_code):
+            session.commit()
+            _release(scoped)
+        else:
+            record = session.get(IdempotencyRecord, scoped)
+            record.status_code = saved["status_code"]
+            record.headers = orjson.dumps(saved["headers"]).decode()
+            record.body = saved["body"]
+            session.add(record)
+            session.commit()
+        future.set_result((request_hash, saved))
+        return response
+    except BaseException as exc:
+        session.rollback()
+        _release(scoped)
+        if isinstance(exc, asyncio.CancelledError):
+            future.cancel()
+        else:
+            future.set_exception(exc)
+            future.exception()  # marcada como leída aunque nadie la espere
+        raise
+    finally:
+        _in_flight.pop(scoped, None)
@@ -1,28 +1,92 @@
-import requests
+import hashlib
 import json
-import dotenv
-import os
-
-dotenv.load_dotenv()
-
-def prompt(message):
-    response = requests.post(
-        url="https://openrouter.ai/api/v1/chat/completions",
-        headers={
-            "Authorization": f"Bearer {os.getenv('OPENROUTER_API_KEY')}",
-            "Content-Type": "application/json",
-        },
-        data=json.dumps({
-            "model": "ibm-granite/granite-4.0-h-micro",
-            "messages": [
-                {
-                    "role": "user",
-                    "content": message
-                }
-            ]
-        })
+import logging
+
+import orjson
+
+from config.settings import LLM_CACHE_SIZE, LLM_CACHE_TTL, OPENROUTER_API_KEY
+from utils.cache import VersionedTTLCache
+from utils.metrics import Counter, current_metrics, register, timed
+from utils.prompts import Prompt
+from utils.versioning import household_version_key
+
+MODEL = "ibm-granite/granite-4.0-h-micro"
+
+logger = logging.getLogger("inventario.llm")
+
+# Tokens informados por OpenRouter en cada llamada (kind: prompt, cached, completion)
+LLM_TOKENS = register(
+    Counter("llm_tokens_total", "Tokens por llamada al LLM", ("kind", "prompt_version"))
+)
+
+# Respuestas por (hogar, prompt exacto). El prompt incluye el contexto del
+# inventario: tras un cambio en el hogar la misma frase se vuelve a consultar.
+llm_cache = VersionedTTLCache("llm", household_version_key, LLM_CACHE_SIZE, LLM_CACHE_TTL)
+
+
+def prompt(built: Prompt, household_id: int):
+    key = (household_id, hashlib.sha256(orjson.dumps(built.messages)).hexdigest())
+    return llm_cache.get_or_create(key, lambda: request_completion(built))
+
+
+def request_completion(built: Prompt) -> str:
+    content, usage = complete(built.messages)
+    record_usage(usage, built.version)
+    return content
+
+
+def record_usage(usage: dict, prompt_version: int):
+    """Suma los tokens de una llamada a /metrics, al request actual y al log"""
+    prompt_tokens = usage.get("prompt_tokens", 0)
+    cached_tokens = (usage.get("prompt_tokens_details") or {}).get("cached_tokens", 0)
+    completion_tokens = usage.get("completion_tokens", 0)
+    LLM_TOKENS.inc(prompt_tokens, kind="prompt", prompt_version=prompt_version)
+    LLM_TOKENS.inc(cached_tokens, kind="cached", prompt_version=prompt_version)
+    LLM_TOKENS.inc(completion_tokens, kind="completion", prompt_version=prompt_version)
+    metrics = current_metrics()
+    if metrics is not None:
+        metrics.llm_tokens += prompt_tokens + completion_tokens
+    logger.info(
+        orjson.dumps(
+            {
+                "event": "llm_usage",
+                "prompt_version": prompt_version,
+                "prompt_tokens": prompt_tokens,
+                "cached_tokens": cached_tokens,
+                "completion_tokens": completion_tokens,
+            }
+        ).decode()
     )
 
+
+def complete(messages: list[dict]) -> tuple[str, dict]:
+    """
+    Calls the chat completions API.
+
+    Args:
+        messages: Chat messages (system prefix first, so it can be cached)
+
+    Returns:
+        Tuple (content, usage) with the token counts reported by OpenRouter
+    """
+    # requests se importa en la primera llamada: no pesa en el arranque en frío
+    import requests
+
+    with timed("llm"):
+        response = requests.post(
+            url="https://openrouter.ai/api/v1/chat/completions",
+            headers={
+                "Authorization": f"Bearer {OPENROUTER_API_KEY}",
+                "Content-Type": "application/json",
+            },
+            data=json.dumps({
+                "model": MODEL,
+                "messages": messages,
+                # Conteo exacto de tokens (incluye los leídos de la cache del proveedor)
+                "usage": {"include": True},
+            })
+        )
+
     result = response.json()
 
     # Manejo de errores de la API
@@ -32,10 +96,13 @@ def prompt(message):
     if "choices" not in result or len(result["choices"]) == 0:
         raise ValueError(f"Unexpected API response: {result}")
 
-    return result['choices'][0]['message']['content']
+    return result['choices'][0]['message']['content'], result.get("usage") or {}
 
 
 if __name__ == "__main__":
-    print(prompt("Hola, ¿cómo estás?"))
-
+    from config.database.models import DEFAULT_HOUSEHOLD_ID
+    from config.settings import LLM_PROMPT_VERSION
+    from utils.prompts import build_prompt
 
+    built = build_prompt(LLM_PROMPT_VERSION, ["Hola, ¿cómo estás?"], None)
+    print(prompt(built, DEFAULT_HOUSEHOLD_ID))
@@ -0,0 +1,269 @@
+"""
+Métricas por request: tiempo total, DB (tiempo + nº de sentencias), render de
+templates JinjaX y LLM.
+
+Cada request tiene un `RequestMetrics` en un ContextVar; los hooks de SQLAlchemy,
+`render_component()` y `prompt()` acumulan sobre él. El middleware
+(middleware/metrics.py) lo convierte en header `Server-Timing`, en un log JSON y
+en histogramas agregados por ruta que se exponen en `/metrics` (Prometheus).
+"""
+
+import logging
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+import orjson
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+logger = logging.getLogger("inventario.metrics")
+
+# Buckets (segundos) comunes para latencias de request, DB, templates y LLM
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+STATEMENT_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 250)
+
+
+class RequestMetrics:
+    """Acumulador de tiempos de un request (segundos)"""
+
+    __slots__ = (
+        "start",
+        "db_time",
+        "db_statements",
+        "template_time",
+        "llm_time",
+        "llm_calls",
+        "llm_tokens",
+    )
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.db_time = 0.0
+        self.db_statements = 0
+        self.template_time = 0.0
+        self.llm_time = 0.0
+        self.llm_calls = 0
+        self.llm_tokens = 0
+
+    @property
+    def total_time(self) -> float:
+        return time.perf_counter() - self.start
+
+    def server_timing(self) -> str:
+        """Valor del header Server-Timing (duraciones en ms)"""
+        return ", ".join(
+            [
+                f"total;dur={self.total_time * 1000:.1f}",
+                f'db;dur={self.db_time * 1000:.1f};desc="{self.db_statements} queries"',
+                f"tpl;dur={self.template_time * 1000:.1f}",
+                f"llm;dur={self.llm_time * 1000:.1f}",
+            ]
+        )
+
+
+_current: ContextVar[RequestMetrics | None] = ContextVar("request_metrics", default=None)
+
+
+def start_request_metrics() -> tuple[RequestMetrics, object]:
+    """Crea el acumulador del request actual; devuelve (metrics, token para reset)"""
+    metrics = RequestMetrics()
+    return metrics, _current.set(metrics)
+
+
+def reset_request_metrics(token):
+    _current.reset(token)
+
+
+def current_metrics() -> RequestMetrics | None:
+    return _current.get()
+
+
+@contextmanager
+def timed(kind: str):
+    """
+    Accumulates the elapsed time of the block into the current request.
+
+    Args:
+        kind: "template" or "llm"
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        metrics = _current.get()
+        if metrics is not None:
+            elapsed = time.perf_counter() - start
+            if kind == "template":
+                metrics.template_time += elapsed
+            elif kind == "llm":
+                metrics.llm_time += elapsed
+                metrics.llm_calls += 1
+
+
+def install_sqlalchemy_hooks(engine: Engine):
+    """Registra hooks que cuentan sentencias y tiempo de DB del request actual"""
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        start = conn.info["query_start"].pop()
+        metrics = _current.get()
+        if metrics is not None:
+            metrics.db_time += time.perf_counter() - start
+            metrics.db_statements += 1
+
+
+class Histogram:
+    """Histograma Prometheus con labels (acumulativo, thread-safe)"""
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: tuple[str, ...],
+        buckets=DEFAULT_BUCKETS,
+    ):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self.buckets = tuple(buckets)
+        self._series: dict[tuple, list] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels):
+        key = tuple(str(labels[name]) for name in self.labelnames)
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                # [conteos por bucket..., +Inf, suma]
+                series = self._series[key] = [0] * (len(self.buckets) + 1) + [0.0]
+            series[index] += 1
+            series[-1] += value
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            snapshot = {key: list(series) for key, series in self._series.items()}
+        for key, series in sorted(snapshot.items()):
+            labels = ",".join(
+                f'{name}="{_escape(value)}"' for name, value in zip(self.labelnames, key)
+            )
+            cumulative = 0
+            for bound, count in zip(self.buckets, series):
+                cumulative += count
+                lines.append(f'{self.name}_bucket{{{labels},le="{bound}"}} {cumulative}')
+            cumulative += series[len(self.buckets)]
+            lines.append(f'{self.name}_bucket{{{labels},le="+Inf"}} {cumulative}')
+            lines.append(f"{self.name}_sum{{{labels}}} {series[-1]}")
+            lines.append(f"{self.name}_count{{{labels}}} {cumulative}")
+        return lines
+
+
+class Counter:
+    """Contador Prometheus con labels (thread-safe)"""
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple[str, ...]):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self._values: dict[tuple, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1, **labels):
+        key = tuple(str(labels[name]) for name in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            snapshot = dict(self._values)
+        for key, value in sorted(snapshot.items()):
+            labels = ",".join(f'{name}="{_escape(v)}"' for name, v in zip(self.labelnames, key))
+            lines.append(f"{self.name}{{{labels}}} {value}")
+        return lines
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+REQUEST_DURATION = Histogram(
+    "http_request_duration_seconds", "Tiempo total del request", ("route", "method", "status")
+)
+REQUEST_DB_TIME = Histogram("http_request_db_seconds", "Tiempo en la base de datos", ("route",))
+REQUEST_DB_STATEMENTS = Histogram(
+    "http_request_db_statements", "Sentencias SQL por request", ("route",), STATEMENT_BUCKETS
+)
+REQUEST_TEMPLATE_TIME = Histogram(
+    "http_request_template_seconds", "Tiempo renderizando componentes JinjaX", ("route",)
+)
+REQUEST_LLM_TIME = Histogram("http_request_llm_seconds", "Tiempo esperando al LLM", ("route",))
+
+REGISTRY: list = [
+    REQUEST_DURATION,
+    REQUEST_DB_TIME,
+    REQUEST_DB_STATEMENTS,
+    REQUEST_TEMPLATE_TIME,
+    REQUEST_LLM_TIME,
+]
+
+
+def register(metric):
+    """Agrega una métrica al registro expuesto en /metrics"""
+    REGISTRY.append(metric)
+    return metric
+
+
+def record_request(metrics: RequestMetrics, route: str, method: str, status: int):
+    """Agrega el request a los histogramas y emite el log estructurado"""
+    total = metrics.total_time
+    REQUEST_DURATION.observe(total, route=route, method=method, status=status)
+    REQUEST_DB_TIME.observe(metrics.db_time, route=route)
+    REQUEST_DB_STATEMENTS.observe(metrics.db_statements, route=route)
+    REQUEST_TEMPLATE_TIME.observe(metrics.template_time, route=route)
+    if metrics.llm_calls:
+        REQUEST_LLM_TIME.observe(metrics.llm_time, route=route)
+
+    logger.info(
+        orjson.dumps(
+            {
+                "event": "request",
+                "route": route,
+                "method": method,
+                "status": status,
+                "total_ms": round(total * 1000, 2),
+                "db_ms": round(metrics.db_time * 1000, 2),
+                "db_statements": metrics.db_statements,
+                "template_ms": round(metrics.template_time * 1000, 2),
+                "llm_ms": round(metrics.llm_time * 1000, 2),
+                "llm_calls": metrics.llm_calls,
+                "llm_tokens": metrics.llm_tokens,
+            }
+        ).decode()
+    )
+
+
+def render_prometheus() -> str:
+    """Todas las métricas registradas en formato de texto Prometheus"""
+    lines = []
+    for metric in REGISTRY:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+def setup_logging(level: str = "INFO"):
+    """Handler de consola para los logs estructurados de la app (logger 'inventario')"""
+    app_logger = logging.getLogger("inventario")
+    app_logger.setLevel(level)
+    if not app_logger.handlers:
+        handler = logging.StreamHandler()
+        handler.setFormatter(logging.Formatter("%(message)s"))
+        app_logger.addHandler(handler)
@@ -47,3 +47,36 @@ def parse_llm_commands(llm_response: str) -> list[dict[str, Any]]:
             pass
 
         return []
+
+
+# Campos de un comando que nombran lo que el usuario dijo
+NAME_FIELDS = ("item", "section", "target_name", "to_section")
+
+
+def split_by_dictation(
+    commands: list[dict[str, Any]], texts: list[str]
+) -> list[list[dict[str, Any]]]:
+    """
+    Reparte los comandos de una llamada agrupada entre los dictados que la formaron.
+
+    Usa el campo "dictation" (número 1..N que el prompt pide agregar). Si falta
+    o es inválido, el primer dictado que menciona el nombre del comando; si
+    ninguno lo menciona, el primero del grupo.
+    """
+    lowered = [text.lower() for text in texts]
+    parts: list[list[dict[str, Any]]] = [[] for _ in texts]
+    for cmd in commands:
+        cmd = dict(cmd)
+        try:
+            number = int(cmd.pop("dictation", 0))
+        except (TypeError, ValueError):
+            number = 0
+        if 1 <= number <= len(texts):
+            parts[number - 1].append(cmd)
+            continue
+        names = [str(cmd[field]).lower() for field in NAME_FIELDS if cmd.get(field)]
+        index = next(
+            (i for i, text in enumerate(lowered) if any(name in text for name in names)), 0
+        )
+        parts[index].append(cmd)
+    return parts
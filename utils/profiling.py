@@ -0,0 +1,188 @@
+"""
+Profiling de requests individuales con salida en formato speedscope
+(https://www.speedscope.app) y almacén rotativo en disco.
+
+Si pyinstrument está instalado se usa (entiende async); si no, un sampler
+propio toma cada `interval` segundos la pila de todos los hilos: el del event
+loop y los del threadpool, donde corren las llamadas al LLM y el trabajo
+síncrono con la DB (run_in_threadpool). Cada hilo queda como un perfil aparte
+del archivo speedscope, con su nombre.
+"""
+
+import itertools
+import re
+import sys
+import threading
+import time
+from pathlib import Path
+
+import orjson
+
+try:
+    from pyinstrument import Profiler as _PyinstrumentProfiler
+    from pyinstrument.renderers import SpeedscopeRenderer
+except ImportError:  # pyinstrument es opcional
+    _PyinstrumentProfiler = None
+
+SPEEDSCOPE_SCHEMA = "https://www.speedscope.app/file-format-schema.json"
+
+# Nombres de archivo generados por el propio store (evita path traversal)
+PROFILE_NAME_RE = re.compile(r"^[\w.-]+\.speedscope\.json$")
+
+_sequence = itertools.count()
+
+
+class StackSampler:
+    """Sampler de pila de todos los hilos; el que lo inicia se marca como event loop"""
+
+    def __init__(self, interval: float):
+        self.interval = interval
+        self._thread_id = threading.get_ident()
+        self._stop = threading.Event()
+        # hilo -> pilas muestreadas (raíz -> hoja)
+        self._samples: dict[int, list[tuple]] = {}
+        self._names: dict[int, str] = {}
+        self._start = 0.0
+        self._end = 0.0
+        self._sampler: threading.Thread | None = None
+
+    def start(self):
+        self._start = time.perf_counter()
+        self._sampler = threading.Thread(target=self._run, daemon=True)
+        self._sampler.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._sampler is not None:
+            self._sampler.join()
+        self._end = time.perf_counter()
+
+    def _run(self):
+        sampler_id = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            frames = sys._current_frames()
+            if not frames.keys() <= self._names.keys():
+                # Nombre de los hilos nuevos mientras siguen vivos
+                self._names.update((t.ident, t.name) for t in threading.enumerate())
+                for thread_id in frames.keys() - self._names.keys():
+                    self._names[thread_id] = f"thread-{thread_id}"
+            for thread_id, frame in frames.items():
+                if thread_id == sampler_id:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append((code.co_name, code.co_filename, frame.f_lineno))
+                    frame = frame.f_back
+                if stack:
+                    stack.reverse()
+                    self._samples.setdefault(thread_id, []).append(tuple(stack))
+
+    def _thread_label(self, thread_id: int) -> str:
+        label = self._names[thread_id]
+        return f"{label} (event loop)" if thread_id == self._thread_id else label
+
+    def speedscope(self, name: str) -> bytes:
+        """Un perfil 'sampled' de speedscope por hilo (pila raíz -> hoja por muestra)"""
+        frame_index: dict[tuple, int] = {}
+        frames = []
+        profiles = []
+        # El event loop primero: es el perfil que speedscope abre
+        thread_ids = sorted(self._samples, key=lambda thread_id: thread_id != self._thread_id)
+        for thread_id in thread_ids:
+            samples = []
+            for stack in self._samples[thread_id]:
+                indexes = []
+                for frame in stack:
+                    if frame not in frame_index:
+                        frame_index[frame] = len(frames)
+                        frames.append({"name": frame[0], "file": frame[1], "line": frame[2]})
+                    indexes.append(frame_index[frame])
+                samples.append(indexes)
+            profiles.append(
+                {
+                    "type": "sampled",
+                    "name": f"{name} [{self._thread_label(thread_id)}]",
+                    "unit": "seconds",
+                    "startValue": 0,
+                    "endValue": self._end - self._start,
+                    "samples": samples,
+                    "weights": [self.interval] * len(samples),
+                }
+            )
+
+        return orjson.dumps(
+            {
+                "$schema": SPEEDSCOPE_SCHEMA,
+                "name": name,
+                "exporter": "inventario-alimentos",
+                "activeProfileIndex": 0,
+                "shared": {"frames": frames},
+                "profiles": profiles,
+            }
+        )
+
+
+class PyinstrumentSampler:
+    """Adaptador de pyinstrument con la misma interfaz que StackSampler"""
+
+    def __init__(self, interval: float):
+        self._profiler = _PyinstrumentProfiler(interval=interval, async_mode="enabled")
+
+    def start(self):
+        self._profiler.start()
+
+    def stop(self):
+        self._profiler.stop()
+
+    def speedscope(self, name: str) -> bytes:
+        return self._profiler.output(SpeedscopeRenderer()).encode()
+
+
+def new_profiler(interval: float):
+    """Profiler disponible: pyinstrument si está instalado, el sampler propio si no"""
+    if _PyinstrumentProfiler is not None:
+        return PyinstrumentSampler(interval)
+    return StackSampler(interval)
+
+
+class ProfileStore:
+    """Directorio de perfiles que conserva solo los `max_files` más recientes"""
+
+    def __init__(self, directory: str, max_files: int):
+        self.directory = Path(directory)
+        self.max_files = max_files
+
+    def save(self, name: str, data: bytes) -> Path:
+        self.directory.mkdir(parents=True, exist_ok=True)
+        path = self.directory / name
+        path.write_bytes(data)
+        self._rotate()
+        return path
+
+    def list(self) -> list[dict]:
+        if not self.directory.exists():
+            return []
+        files = sorted(self._files(), key=lambda p: p.stat().st_mtime, reverse=True)
+        return [{"name": p.name, "size": p.stat().st_size} for p in files]
+
+    def path(self, name: str) -> Path | None:
+        if not PROFILE_NAME_RE.match(name):
+            return None
+        path = self.directory / name
+        return path if path.is_file() else None
+
+    def _files(self):
+        return [p for p in self.directory.iterdir() if PROFILE_NAME_RE.match(p.name)]
+
+    def _rotate(self):
+        files = sorted(self._files(), key=lambda p: p.stat().st_mtime)
+        for old in files[: max(0, len(files) - self.max_files)]:
+            old.unlink(missing_ok=True)
+
+
+def profile_name(method: str, path: str) -> str:
+    """Nombre de archivo único y legible: 20251019-101500-123_GET_inventory_api_items"""
+    stamp = time.strftime("%Y%m%d-%H%M%S") + f"-{int(time.time() * 1000) % 1000:03d}"
+    slug = re.sub(r"[^\w]+", "_", path).strip("_") or "root"
+    return f"{stamp}_{method}_{slug[:60]}_{next(_sequence)}.speedscope.json"
@@ -0,0 +1,183 @@
+"""
+Prompts del intérprete de dictados, versionados.
+
+Cada versión fija el texto de sistema y cómo se codifica el contexto del
+inventario. Desde la v2 el texto de sistema va solo en el mensaje "system" y
+no cambia entre llamadas: es un prefijo estable que el proveedor puede cachear
+(prompt caching); lo variable (inventario y dictados) va después, en el
+mensaje "user". La v1 se conserva tal cual como referencia para el corpus de
+regresión (benchmarks/prompts.py).
+
+Cambiar el texto de una versión publicada invalida las comparaciones: agregar
+una versión nueva y subir LLM_PROMPT_VERSION.
+"""
+
+from typing import Any
+
+import orjson
+
+SYSTEM_PROMPT_V1 = """Eres un asistente para gestionar inventario de alimentos.
+El usuario dictará comandos por voz para actualizar su inventario.
+
+IMPORTANTE: Cuando el usuario mencione un item, SIEMPRE usa "create_item" porque NO sabes si \
+existe o no en la base de datos.
+
+Debes devolver un array JSON con los comandos a ejecutar. Formato:
+
+[
+  {"action": "create_item", "item": "leche", "quantity": 2, "unit": "L", \
+"section": "refrigerador", "emoji": "🥛", "threshold": 1},
+  {"action": "create_item", "item": "huevos", "quantity": 6, "unit": "unidades", \
+"section": "refrigerador", "emoji": "🥚", "threshold": 3},
+  {"action": "create_item", "item": "arroz", "quantity": 2, "unit": "kg", \
+"section": "almacen 1", "emoji": "🍚", "threshold": 1}
+]
+
+Acciones disponibles:
+- create_item: SIEMPRE usa esta acción para cualquier item mencionado. \
+Si el item ya existe, se actualizará automáticamente.
+- create_section: crea nueva sección (infiere emoji)
+- move_item: mueve un item a otra sección. \
+Formato: {"action": "move_item", "item": "leche", "to_section": "refrigerador"}
+- change_emoji: cambia emoji de item o sección. \
+Formato: {"action": "change_emoji", "target_type": "item", "target_name": "leche", "emoji": "🥛"} \
+o {"action": "change_emoji", "target_type": "section", "target_name": "refrigerador", "emoji": "❄️"}
+- delete_item: elimina un item. Formato: {"action": "delete_item", "item": "leche"}
+- delete_section: elimina una sección. Formato: {"action": "delete_section", "section": "almacen 1"}
+
+Reglas:
+- SIEMPRE usa "create_item" para todos los items mencionados
+- Nombres en minúsculas sin tildes (huevos, leche, arroz, etc)
+- Inferir unidades apropiadas (kg, L, unidades, gramos, etc)
+- Emojis apropiados para cada item (🥛 leche, 🥚 huevos, 🍚 arroz, 🥖 pan, etc)
+- Secciones comunes: refrigerador, almacen 1, almacen 2, congelador, despensa
+- Threshold razonable (1-3 unidades generalmente)
+
+Responde SOLO con el JSON, sin texto adicional."""
+
+COALESCED_INSTRUCTIONS_V1 = """
+
+El usuario dictó varios mensajes seguidos. Interprétalos todos y agrega a cada comando el campo \
+"dictation" con el número del mensaje que lo originó, por ejemplo \
+{"action": "create_item", "item": "pan", "quantity": 1, "dictation": 2}.
+"""
+
+SYSTEM_PROMPT_V2 = """Convierte dictados sobre un inventario de alimentos en un array JSON de \
+comandos. Responde solo el JSON.
+Comandos:
+{"action":"create_item","item":"leche","quantity":2,"unit":"L","section":"refrigerador","emoji":"🥛","threshold":1}
+{"action":"create_section","section":"despensa","emoji":"🥫"}
+{"action":"move_item","item":"leche","to_section":"congelador"}
+{"action":"change_emoji","target_type":"item","target_name":"leche","emoji":"🥛"} \
+(target_type: item o section)
+{"action":"delete_item","item":"leche"}
+{"action":"delete_section","section":"almacen 1"}
+Reglas:
+- create_item para todo item mencionado (si ya existe se actualiza)
+- item en minúsculas sin tildes; unit, emoji y threshold (1-3) apropiados
+- section: nombre tal como aparece en el inventario; si no hay, refrigerador, almacen 1, \
+almacen 2, congelador o despensa
+- con varios mensajes numerados, agregar a cada comando "dictation": número del mensaje"""
+
+# versión -> texto de sistema
+SYSTEM_PROMPTS = {1: SYSTEM_PROMPT_V1, 2: SYSTEM_PROMPT_V2}
+
+
+class Prompt:
+    """Mensajes listos para la API de chat, con la versión que los armó"""
+
+    __slots__ = ("version", "messages")
+
+    def __init__(self, version: int, messages: list[dict[str, str]]):
+        self.version = version
+        self.messages = messages
+
+    @property
+    def text(self) -> str:
+        """Todos los mensajes como un solo texto (logs y LLMs falsos de los benchmarks)"""
+        return "\n\n".join(message["content"] for message in self.messages)
+
+
+def _parse_context(context: str | None) -> dict[str, Any] | None:
+    """Contexto JSON que manda el cliente ({"sections": [...], "items": [...]}), o None"""
+    if not context:
+        return None
+    try:
+        data = orjson.loads(context)
+    except orjson.JSONDecodeError:
+        return None  # Si falla el parseo, continuar sin contexto
+    return data if isinstance(data, dict) else None
+
+
+def encode_context_v1(data: dict[str, Any]) -> str:
+    sections_list = ", ".join([s['name'] for s in data.get('sections', [])])
+    items_list = ", ".join([i['name'] for i in data.get('items', [])])
+    return (
+        f"\n\nContexto actual del inventario:\n- Secciones disponibles: {sections_list}"
+        f"\n- Items existentes: {items_list}"
+    )
+
+
+def encode_context_v2(data: dict[str, Any]) -> str:
+    """
+    Encodes the inventory as one line per section with its item names.
+
+    Args:
+        data: Client context with sections (id, name) and items (name, section_id)
+
+    Returns:
+        Lines like "refrigerador: leche, huevos"; sections without items end in ":"
+    """
+    names: dict[Any, list[str]] = {section.get("id"): [] for section in data.get("sections", [])}
+    orphans = []
+    for item in data.get("items", []):
+        names.get(item.get("section_id"), orphans).append(item["name"])
+    lines = [
+        f"{section['name'].lower()}: {', '.join(names[section.get('id')])}".rstrip()
+        for section in data.get("sections", [])
+    ]
+    if orphans:
+        lines.append(f"otros: {', '.join(orphans)}")
+    return "\n".join(lines)
+
+
+def _numbered(texts: list[str]) -> str:
+    return "\n".join(f"Mensaje {n}: {text}" for n, text in enumerate(texts, start=1))
+
+
+def build_prompt(version: int, texts: list[str], context: str | None) -> Prompt:
+    """
+    Builds the chat messages for one or more dictations of the same user.
+
+    Args:
+        version: Key of SYSTEM_PROMPTS
+        texts: Dictations in arrival order (more than one when coalesced)
+        context: Inventory context JSON sent by the client, if any
+
+    Returns:
+        Prompt with the messages for the chat completions API
+    """
+    if version not in SYSTEM_PROMPTS:
+        raise ValueError(f"Versión de prompt desconocida: {version}")
+
+    data = _parse_context(context)
+    encode_context = encode_context_v1 if version == 1 else encode_context_v2
+    try:
+        inventory = encode_context(data) if data else ""
+    except (KeyError, TypeError, AttributeError):
+        inventory = ""  # Contexto mal formado: continuar sin contexto
+
+    if version == 1:
+        if len(texts) == 1:
+            content = f"{SYSTEM_PROMPT_V1}{inventory}\n\nUsuario dice: {texts[0]}"
+        else:
+            instructions = COALESCED_INSTRUCTIONS_V1
+            content = f"{SYSTEM_PROMPT_V1}{inventory}{instructions}\n{_numbered(texts)}"
+        return Prompt(version, [{"role": "user", "content": content}])
+
+    dictated = f"Dictado: {texts[0]}" if len(texts) == 1 else _numbered(texts)
+    user = f"Inventario:\n{inventory}\n\n{dictated}" if inventory else dictated
+    return Prompt(
+        version,
+        [{"role": "system", "content": SYSTEM_PROMPTS[version]}, {"role": "user", "content": user}],
+    )
@@ -0,0 +1,377 @@
+"""
+Retención del historial de cantidades.
+
+ItemHistory recibe una fila por cada cambio y es la tabla que más crece. Una
+tarea en segundo plano (una vez por HISTORY_RETENTION_INTERVAL, en un solo
+worker gracias a un lease en app_meta) compacta lo viejo:
+
+- cambios más viejos que HISTORY_RAW_DAYS -> un ItemHistoryRollup por item y día
+  (cantidad final, mínima y máxima del día, cantidad de cambios)
+- más viejos que HISTORY_DAILY_DAYS -> un rollup por item y semana (los rollups
+  diarios que cruzan ese límite se fusionan en el semanal)
+- con HISTORY_ARCHIVE_DIR, las filas originales se guardan antes de borrarlas
+  en NDJSON+gzip (mismo formato que /data/export/history?format=ndjson); sin
+  archivo solo se borran con HISTORY_DISCARD_RAW=true
+
+Los límites se alinean a medianoche / lunes: un período nunca queda partido
+entre filas crudas y agregadas, y todo rollup es más viejo que toda fila cruda.
+"""
+
+import asyncio
+import gzip
+import logging
+import os
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import orjson
+from sqlalchemy import delete, or_, tuple_, update
+from sqlalchemy.exc import IntegrityError
+from sqlmodel import Session, select
+from starlette.concurrency import run_in_threadpool
+
+from config.database.db import engine
+from config.database.models import AppMeta, Item, ItemHistory, ItemHistoryRollup
+from config.settings import (
+    HISTORY_ARCHIVE_DIR,
+    HISTORY_DAILY_DAYS,
+    HISTORY_DISCARD_RAW,
+    HISTORY_RAW_DAYS,
+    HISTORY_RETENTION_BATCH_SIZE,
+    HISTORY_RETENTION_ENABLED,
+    HISTORY_RETENTION_INTERVAL,
+)
+from utils.metrics import Counter, register
+from utils.versioning import bump_inventory_version
+
+logger = logging.getLogger("inventario.retention")
+
+RETENTION_ROWS = register(
+    Counter(
+        "history_retention_rows_total",
+        "Filas procesadas por la retención del historial",
+        ("action",),
+    )
+)
+
+LEASE_KEY = "history_retention_last_run"
+
+RAW_COLUMNS = ("id", "household_id", "item_id", "quantity", "changed_at")
+
+
+def retention_mode() -> str:
+    """
+    "disabled", "archive" (copia antes de borrar), "discard" (borra sin copia,
+    pedido explícito) o "refused" (habilitada sin archivo ni HISTORY_DISCARD_RAW)
+    """
+    if not HISTORY_RETENTION_ENABLED:
+        return "disabled"
+    if HISTORY_ARCHIVE_DIR:
+        return "archive"
+    return "discard" if HISTORY_DISCARD_RAW else "refused"
+
+
+def day_start(moment: datetime) -> datetime:
+    return moment.replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+def week_start(moment: datetime) -> datetime:
+    return day_start(moment) - timedelta(days=moment.weekday())
+
+
+def retention_cutoffs(now: datetime) -> tuple[datetime, datetime]:
+    """(límite de filas crudas, límite de rollups diarios), alineados a día y semana"""
+    raw_cutoff = day_start(now - timedelta(days=HISTORY_RAW_DAYS))
+    daily_cutoff = min(week_start(now - timedelta(days=HISTORY_DAILY_DAYS)), raw_cutoff)
+    return raw_cutoff, daily_cutoff
+
+
+class RollupBuckets:
+    """Acumula agregados por (item_id, granularity, period_start) y los fusiona con los guardados"""
+
+    def __init__(self):
+        self.buckets: dict[tuple[int, str, datetime], dict] = {}
+
+    def add(
+        self,
+        key: tuple[int, str, datetime],
+        last_quantity: float,
+        last_changed_at: datetime,
+        min_quantity: float,
+        max_quantity: float,
+        samples: int,
+    ):
+        bucket = self.buckets.get(key)
+        if bucket is None:
+            self.buckets[key] = {
+                "last_quantity": last_quantity,
+                "last_changed_at": last_changed_at,
+                "min_quantity": min_quantity,
+                "max_quantity": max_quantity,
+                "samples": samples,
+            }
+            return
+        if last_changed_at >= bucket["last_changed_at"]:
+            bucket["last_quantity"] = last_quantity
+            bucket["last_changed_at"] = last_changed_at
+        bucket["min_quantity"] = min(bucket["min_quantity"], min_quantity)
+        bucket["max_quantity"] = max(bucket["max_quantity"], max_quantity)
+        bucket["samples"] += samples
+
+    def save(self, session: Session) -> int:
+        """
+        Merges the buckets into existing rollups and inserts the new ones.
+
+        Args:
+            session: Session of the compaction transaction
+
+        Returns:
+            Number of rollup rows written
+        """
+        if not self.buckets:
+            return 0
+        existing = session.exec(
+            select(ItemHistoryRollup).where(
+                tuple_(
+                    ItemHistoryRollup.item_id,
+                    ItemHistoryRollup.granularity,
+                    ItemHistoryRollup.period_start,
+                ).in_(list(self.buckets))
+            )
+        ).all()
+        for rollup in existing:
+            self.add(
+                (rollup.item_id, rollup.granularity, rollup.period_start),
+                rollup.last_quantity,
+                rollup.last_changed_at,
+                rollup.min_quantity,
+                rollup.max_quantity,
+                rollup.samples,
+            )
+        by_key = {(r.item_id, r.granularity, r.period_start): r for r in existing}
+
+        for (item_id, granularity, period_start), values in self.buckets.items():
+            rollup = by_key.get((item_id, granularity, period_start))
+            if rollup is None:
+                rollup = ItemHistoryRollup(
+                    item_id=item_id, granularity=granularity, period_start=period_start, **values
+                )
+            else:
+                for name, value in values.items():
+                    setattr(rollup, name, value)
+            session.add(rollup)
+        return len(self.buckets)
+
+
+def _archive(rows: list, directory: Path) -> Path:
+    """Escribe filas crudas a un .tmp; se renombra recién después del commit"""
+    directory.mkdir(parents=True, exist_ok=True)
+    first, last = rows[0], rows[-1]
+    name = f"itemhistory-{datetime.utcnow():%Y%m%dT%H%M%S}-{first.id}-{last.id}.ndjson.gz"
+    path = directory / f"{name}.tmp"
+    with gzip.open(path, "wb") as archive:
+        for row in rows:
+            archive.write(orjson.dumps(dict(zip(RAW_COLUMNS, row))) + b"\n")
+    return path
+
+
+def _finish_archive(path: Path | None, committed: bool):
+    if path is None:
+        return
+    if committed:
+        path.rename(path.with_suffix(""))
+    else:
+        path.unlink(missing_ok=True)
+
+
+def rollup_raw_rows(
+    raw_cutoff: datetime, daily_cutoff: datetime, households: set[int] | None = None
+) -> int:
+    """
+    Moves raw history older than raw_cutoff into day/week rollups, in batches.
+
+    Args:
+        raw_cutoff: Raw rows before this moment are aggregated
+        daily_cutoff: Rows before this moment go to weekly buckets instead of daily
+        households: If given, collects the households whose history changed
+
+    Returns:
+        Number of raw rows removed
+    """
+    archive_dir = Path(HISTORY_ARCHIVE_DIR) if HISTORY_ARCHIVE_DIR else None
+    removed = 0
+    while True:
+        with Session(engine) as session:
+            rows = session.exec(
+                select(
+                    ItemHistory.id,
+                    ItemHistory.household_id,
+                    ItemHistory.item_id,
+                    ItemHistory.quantity,
+                    ItemHistory.changed_at,
+                )
+                .where(ItemHistory.changed_at < raw_cutoff)
+                .order_by(ItemHistory.changed_at, ItemHistory.id)
+                .limit(HISTORY_RETENTION_BATCH_SIZE)
+            ).all()
+            if not rows:
+                return removed
+
+            buckets = RollupBuckets()
+            for row in rows:
+                if row.changed_at < daily_cutoff:
+                    key = (row.item_id, "week", week_start(row.changed_at))
+                else:
+                    key = (row.item_id, "day", day_start(row.changed_at))
+                buckets.add(key, row.quantity, row.changed_at, row.quantity, row.quantity, 1)
+            written = buckets.save(session)
+
+            archive = _archive(rows, archive_dir) if archive_dir else None
+            committed = False
+            try:
+                raw_ids = [row.id for row in rows]
+                session.execute(delete(ItemHistory).where(ItemHistory.id.in_(raw_ids)))
+                session.commit()
+                committed = True
+            finally:
+                _finish_archive(archive, committed)
+
+        removed += len(rows)
+        if households is not None:
+            households.update(row.household_id for row in rows)
+        RETENTION_ROWS.inc(len(rows), action="rolled_up")
+        if archive:
+            RETENTION_ROWS.inc(len(rows), action="archived")
+        logger.debug(f"retention batch: {len(rows)} raw rows -> {written} rollups")
+
+
+def merge_daily_rollups(daily_cutoff: datetime, households: set[int] | None = None) -> int:
+    """
+    Folds daily rollups older than daily_cutoff into weekly rollups.
+
+    Args:
+        daily_cutoff: Daily rollups starting before this moment are merged
+        households: If given, collects the households whose history changed
+
+    Returns:
+        Number of daily rollups removed
+    """
+    merged = 0
+    while True:
+        with Session(engine) as session:
+            daily = session.exec(
+                select(ItemHistoryRollup)
+                .where(
+                    ItemHistoryRollup.granularity == "day",
+                    ItemHistoryRollup.period_start < daily_cutoff,
+                )
+                .order_by(ItemHistoryRollup.period_start, ItemHistoryRollup.id)
+                .limit(HISTORY_RETENTION_BATCH_SIZE)
+            ).all()
+            if not daily:
+                return merged
+
+            buckets = RollupBuckets()
+            for rollup in daily:
+                buckets.add(
+                    (rollup.item_id, "week", week_start(rollup.period_start)),
+                    rollup.last_quantity,
+                    rollup.last_changed_at,
+                    rollup.min_quantity,
+                    rollup.max_quantity,
+                    rollup.samples,
+                )
+            ids = [rollup.id for rollup in daily]
+            buckets.save(session)
+            session.execute(delete(ItemHistoryRollup).where(ItemHistoryRollup.id.in_(ids)))
+            if households is not None:
+                # Los rollups no tienen household_id: el de sus items
+                item_ids = {rollup.item_id for rollup in daily}
+                households.update(
+                    session.exec(select(Item.household_id).where(Item.id.in_(item_ids)).distinct()).all()
+                )
+            session.commit()
+
+        merged += len(daily)
+        RETENTION_ROWS.inc(len(daily), action="merged_daily")
+
+
+def _claim_run(interval: float) -> bool:
+    """Lease en app_meta: un solo worker ejecuta la retención por intervalo"""
+    now = int(time.time())
+    # Epoch con ancho fijo: se compara como string en cualquier dialecto
+    value, threshold = f"{now:012d}", f"{now - int(interval):012d}"
+    with Session(engine) as session:
+        claimed = session.execute(
+            update(AppMeta)
+            .where(AppMeta.key == LEASE_KEY, or_(AppMeta.value <= threshold, AppMeta.value > value))
+            .values(value=value)
+        ).rowcount
+        if not claimed and session.get(AppMeta, LEASE_KEY) is None:
+            session.add(AppMeta(key=LEASE_KEY, value=value))
+            try:
+                session.flush()
+                claimed = 1
+            except IntegrityError:
+                session.rollback()
+                return False
+        session.commit()
+    return bool(claimed)
+
+
+def run_retention(now: datetime | None = None, force: bool = False) -> dict | None:
+    """
+    Runs one retention pass if no other worker ran it within the interval.
+
+    Args:
+        now: Reference time (defaults to utcnow)
+        force: Skip the lease check
+
+    Returns:
+        Summary of the pass, or None if another worker holds the lease or raw
+        rows would be deleted without archive and without HISTORY_DISCARD_RAW
+    """
+    if not HISTORY_ARCHIVE_DIR and not HISTORY_DISCARD_RAW:
+        logger.warning(
+            "history retention refused: set HISTORY_ARCHIVE_DIR or HISTORY_DISCARD_RAW=true"
+        )
+        return None
+    if not force and not _claim_run(HISTORY_RETENTION_INTERVAL):
+        return None
+
+    start = time.perf_counter()
+    raw_cutoff, daily_cutoff = retention_cutoffs(now or datetime.utcnow())
+    households: set[int] = set()
+    rolled_up = rollup_raw_rows(raw_cutoff, daily_cutoff, households)
+    merged = merge_daily_rollups(daily_cutoff, households)
+
+    if households:
+        # Las vistas de historial cacheadas de esos hogares cambian
+        with Session(engine) as session:
+            for household_id in sorted(households):
+                bump_inventory_version(session, household_id)
+            session.commit()
+
+    return {
+        "event": "history_retention",
+        "rolled_up": rolled_up,
+        "merged_daily": merged,
+        "households": len(households),
+        "raw_cutoff": raw_cutoff.isoformat(),
+        "daily_cutoff": daily_cutoff.isoformat(),
+        "ms": round((time.perf_counter() - start) * 1000, 2),
+    }
+
+
+async def retention_loop():
+    """Tarea de fondo del lifespan: una pasada por intervalo, errores solo al log"""
+    while True:
+        try:
+            summary = await run_in_threadpool(run_retention)
+            if summary:
+                logger.info(orjson.dumps(summary).decode())
+        except Exception:
+            logger.exception("history retention failed")
+        # Desfase por proceso: los workers no consultan el lease a la vez
+        await asyncio.sleep(HISTORY_RETENTION_INTERVAL + os.getpid() % 30)
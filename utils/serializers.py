@@ -1,15 +1,21 @@
 """Data serialization utilities for converting database models to template-ready dictionaries"""
 
+from itertools import chain
+from typing import Iterable
+
+import orjson
+
 from config.database.models import Item, Section
-from utils.time import humanize_time
+from utils.time import humanize_days_left, humanize_time
 
 
-def serialize_item_for_template(item: Item) -> dict:
+def serialize_item_for_template(item: Item, days_left: float | None = None) -> dict:
     """
     Converts an Item model instance to a template-ready dictionary.
 
     Args:
         item: Item instance from database
+        days_left: Forecast days until the item runs out (None if unknown)
 
     Returns:
         Dictionary with item data formatted for template rendering
@@ -24,20 +30,25 @@ def serialize_item_for_template(item: Item) -> dict:
         "section_name": item.section.name,
         "updated_at_human": humanize_time(item.updated_at),
         "is_below_threshold": item.is_below_threshold,
+        "days_left_human": humanize_days_left(days_left),
     }
 
 
-def serialize_items_for_template(items: list[Item]) -> list[dict]:
+def serialize_items_for_template(
+    items: list[Item], days_left: dict[int, float | None] | None = None
+) -> list[dict]:
     """
     Converts a list of Item instances to template-ready dictionaries.
 
     Args:
         items: List of Item instances from database
+        days_left: Optional forecast per item id (see utils.forecast)
 
     Returns:
         List of dictionaries with item data formatted for template rendering
     """
-    return [serialize_item_for_template(item) for item in items]
+    days_left = days_left or {}
+    return [serialize_item_for_template(item, days_left.get(item.id)) for item in items]
 
 
 def serialize_section_for_template(section: Section) -> dict:
@@ -68,3 +79,192 @@ def serialize_sections_for_template(sections: list[Section]) -> list[dict]:
         List of dictionaries with section data formatted for template rendering
     """
     return [serialize_section_for_template(section) for section in sections]
+
+
+def serialize_item_row(row: tuple) -> dict:
+    """
+    Converts a projected item row (see ITEM_ROW_FIELDS) to a JSON-ready dictionary.
+
+    Args:
+        row: Tuple from item_rows_statement()
+
+    Returns:
+        Dictionary with the same shape the ORM-based serializer produced
+    """
+    (
+        item_id,
+        name,
+        emoji,
+        quantity,
+        unit,
+        threshold,
+        section_id,
+        section_name,
+        section_emoji,
+        updated_at,
+    ) = row
+    return {
+        "id": item_id,
+        "name": name,
+        "emoji": emoji,
+        "quantity": quantity,
+        "unit": unit,
+        "threshold": threshold,
+        "section_id": section_id,
+        "section_name": section_name,
+        "section_emoji": section_emoji,
+        "updated_at": updated_at,
+        "is_below_threshold": quantity < threshold,
+    }
+
+
+def serialize_item_row_for_template(row: tuple, days_left: float | None = None) -> dict:
+    """
+    Converts a projected item row (see ITEM_ROW_FIELDS) to a template-ready dictionary.
+
+    Args:
+        row: Tuple in ITEM_ROW_FIELDS order (e.g. from the in-memory snapshot)
+        days_left: Forecast days until the item runs out (None if unknown)
+
+    Returns:
+        Dictionary with the same keys as serialize_item_for_template()
+    """
+    item_id, name, emoji, quantity, unit, threshold = row[:6]
+    section_name, section_emoji, updated_at = row[7:]
+    return {
+        "id": item_id,
+        "name": name,
+        "emoji": emoji,
+        "quantity": quantity,
+        "unit": unit,
+        "section_emoji": section_emoji,
+        "section_name": section_name,
+        "updated_at_human": humanize_time(updated_at),
+        "is_below_threshold": quantity < threshold,
+        "days_left_human": humanize_days_left(days_left),
+    }
+
+
+def serialize_low_stock_row(row: tuple, days_left: float | None = None) -> dict:
+    """
+    Converts a row from low_stock_statement() to a JSON-ready dictionary.
+
+    Args:
+        row: Tuple in ITEM_ROW_FIELDS order
+        days_left: Forecast days until the item runs out (None if unknown)
+
+    Returns:
+        Item row dictionary plus the quantity missing to reach the threshold
+        and the depletion forecast
+    """
+    item = serialize_item_row(row)
+    item["missing"] = round(item["threshold"] - item["quantity"], 3)
+    item["days_left"] = None if days_left is None else round(days_left, 1)
+    return item
+
+
+def _format_quantity(value: float) -> str:
+    return f"{value:g}"
+
+
+def format_shopping_list(
+    rows: list[tuple], days_left: dict[int, float | None] | None = None
+) -> str:
+    """
+    Formats low-stock rows as a plain-text shopping list (e.g. to paste in WhatsApp).
+
+    Args:
+        rows: Tuples from low_stock_statement(), most urgent first
+        days_left: Optional forecast per item id, appended to each line
+
+    Returns:
+        Text grouped by section, keeping the priority order inside each section
+    """
+    if not rows:
+        return "🛒 Lista de compras\n\nNo falta nada 🎉\n"
+
+    days_left = days_left or {}
+    sections: dict[tuple[str, str], list[str]] = {}
+    for item_id, name, emoji, quantity, unit, threshold, _, section_name, section_emoji, _ in rows:
+        line = (
+            f"- {emoji} {name.capitalize()}: quedan {_format_quantity(quantity)} {unit}"
+            f" (mínimo {_format_quantity(threshold)})"
+        )
+        forecast = humanize_days_left(days_left.get(item_id))
+        if forecast:
+            line += f", {forecast}"
+        sections.setdefault((section_emoji, section_name), []).append(line)
+
+    lines = ["🛒 Lista de compras"]
+    for (section_emoji, section_name), entries in sections.items():
+        lines.append("")
+        lines.append(f"{section_emoji} {section_name}")
+        lines.extend(entries)
+    return "\n".join(lines) + "\n"
+
+
+def serialize_section_row(row: tuple) -> dict:
+    """
+    Converts a projected section row (see SECTION_ROW_FIELDS) to a JSON-ready dictionary.
+
+    Args:
+        row: Tuple from section_rows_statement()
+
+    Returns:
+        Dictionary with section data
+    """
+    section_id, name, emoji, created_at = row
+    return {"id": section_id, "name": name, "emoji": emoji, "created_at": created_at}
+
+
+def serialize_history_page(rows: list[tuple], limit: int) -> tuple[list[dict], bool]:
+    """
+    Converts rows from history_page_statement() to template-ready history records.
+
+    Args:
+        rows: Up to limit + 1 tuples in HISTORY_ENTRY_FIELDS order, newest first
+        limit: Page size requested
+
+    Returns:
+        Tuple of (records with before/after quantities, whether more pages exist)
+    """
+    history = []
+    for i, (changed_at, quantity, granularity, min_quantity, max_quantity, samples) in enumerate(
+        rows[:limit]
+    ):
+        history.append({
+            "before": rows[i + 1][1] if i + 1 < len(rows) else 0,
+            "after": quantity,
+            "changed_at": changed_at,
+            "date_human": humanize_time(changed_at),
+            # Solo en rollups: "day" | "week", rango y cantidad de cambios
+            "granularity": granularity,
+            "min": min_quantity,
+            "max": max_quantity,
+            "samples": samples,
+        })
+    return history, len(rows) > limit
+
+
+def stream_json_array(key: str, first_chunk: list, chunks: Iterable[list], serialize):
+    """
+    Streams a ``{"<key>": [...]}`` JSON document chunk by chunk with orjson.
+
+    Args:
+        key: Top-level key of the JSON object
+        first_chunk: Rows already fetched (used to decide whether to stream)
+        chunks: Iterator over the remaining row partitions
+        serialize: Function converting one row into a JSON-ready value
+
+    Yields:
+        Encoded bytes of the JSON document
+    """
+    yield b'{"' + key.encode() + b'":['
+    separator = b""
+    for chunk in chain((first_chunk,), chunks):
+        if not chunk:
+            continue
+        body = orjson.dumps([serialize(row) for row in chunk])
+        yield separator + body[1:-1]
+        separator = b","
+    yield b"]}"
@@ -0,0 +1,396 @@
+"""
+Copia en memoria del inventario (secciones e items) para servir lecturas sin DB.
+
+Una copia por hogar. El conjunto de trabajo es chico: cada item es un registro
+con __slots__ y se mantienen dos índices ordenados por (updated_at desc, id
+desc), uno del hogar y uno por sección, sobre los que las páginas del scroll
+infinito son un slice.
+
+- Se cargan todas al arrancar (lifespan, dos queries para todos los hogares);
+  un hogar creado después se carga en su primera lectura. Cada copia se
+  recarga cuando la versión de su hogar avanza por escrituras de otro worker
+  o de otros caminos (imports, retención).
+- process_text/process_batch la actualizan write-through: el lote deja los
+  registros cambiados en la sesión y se aplican tras el commit, solo si la
+  versión confirmada es la siguiente a la de la copia (si no, recarga).
+- `version` es la inventory_version que refleja la copia; un rollback
+  descarta los cambios pendientes.
+
+Con SNAPSHOT_ENABLED=false `current(household_id)` devuelve None y las rutas
+leen de la DB.
+"""
+
+import threading
+import time
+from bisect import bisect_left, insort
+from datetime import datetime
+from typing import Iterable
+
+from sqlmodel import Session, select
+
+from config.database.db import engine
+from config.database.migrations import read_meta
+from config.database.models import Household, Item, Section
+from config.settings import SNAPSHOT_ENABLED
+from utils.metrics import Counter, register
+from utils.versioning import bumped_version, get_version, inventory_version_key, on_commit
+
+SNAPSHOT_UPDATES = register(
+    Counter(
+        "snapshot_updates_total", "Actualizaciones de la copia en memoria del inventario", ("kind",)
+    )
+)
+
+EPOCH = datetime(1970, 1, 1)
+
+
+class SectionRecord:
+    __slots__ = ("id", "name", "emoji", "created_at")
+
+    def __init__(self, id: int, name: str, emoji: str, created_at: datetime):
+        self.id = id
+        self.name = name
+        self.emoji = emoji
+        self.created_at = created_at
+
+    def row(self) -> tuple:
+        """Tupla en el orden de SECTION_ROW_FIELDS"""
+        return (self.id, self.name, self.emoji, self.created_at)
+
+
+class ItemRecord:
+    __slots__ = ("id", "name", "emoji", "quantity", "unit", "threshold", "section_id", "updated_at")
+
+    def __init__(
+        self,
+        id: int,
+        name: str,
+        emoji: str,
+        quantity: float,
+        unit: str,
+        threshold: float,
+        section_id: int,
+        updated_at: datetime,
+    ):
+        self.id = id
+        self.name = name
+        self.emoji = emoji
+        self.quantity = quantity
+        self.unit = unit
+        self.threshold = threshold
+        self.section_id = section_id
+        self.updated_at = updated_at
+
+    @classmethod
+    def from_item(cls, item: Item) -> "ItemRecord":
+        return cls(
+            item.id,
+            item.name,
+            item.emoji,
+            item.quantity,
+            item.unit,
+            item.threshold,
+            item.section_id,
+            item.updated_at,
+        )
+
+    @property
+    def sort_key(self) -> tuple[float, int]:
+        """Más recientes primero, como ORDER BY updated_at DESC"""
+        return (-(self.updated_at - EPOCH).total_seconds(), -self.id)
+
+    @property
+    def is_below_threshold(self) -> bool:
+        return self.quantity < self.threshold
+
+
+class SnapshotChanges:
+    """Cambios de un lote, aplicados a la copia después del commit"""
+
+    __slots__ = ("items", "sections", "deleted_items", "deleted_sections")
+
+    def __init__(self):
+        self.items: list[ItemRecord] = []
+        self.sections: list[SectionRecord] = []
+        self.deleted_items: set[int] = set()
+        self.deleted_sections: set[int] = set()
+
+
+SECTION_COLUMNS = (Section.id, Section.name, Section.emoji, Section.created_at)
+ITEM_COLUMNS = (
+    Item.id,
+    Item.name,
+    Item.emoji,
+    Item.quantity,
+    Item.unit,
+    Item.threshold,
+    Item.section_id,
+    Item.updated_at,
+)
+
+
+class InventorySnapshot:
+    """Secciones e items de un hogar con índices ordenados (todos y por sección)"""
+
+    def __init__(self, household_id: int):
+        self.household_id = household_id
+        self.version_key = inventory_version_key(household_id)
+        self.version: int | None = None
+        self._lock = threading.RLock()
+        self._sections: dict[int, SectionRecord] = {}
+        self._items: dict[int, ItemRecord] = {}
+        self._order: list[tuple[float, int]] = []
+        self._by_section: dict[int, list[tuple[float, int]]] = {}
+        self._low_stock: set[int] = set()
+
+    # Carga y actualización
+
+    def load(self):
+        """Carga completa del hogar desde la DB"""
+        # Versión leída antes que los datos: si alguien escribe entre medio, la
+        # próxima lectura ve una versión mayor y recarga
+        version = get_version(self.version_key, force=True)
+        with Session(engine) as session:
+            sections = [
+                SectionRecord(*row)
+                for row in session.exec(
+                    select(*SECTION_COLUMNS).where(Section.household_id == self.household_id)
+                )
+            ]
+            rows = session.exec(
+                select(*ITEM_COLUMNS).where(Item.household_id == self.household_id)
+            )
+            items = [ItemRecord(*row) for row in rows]
+        self.fill(sections, items, version)
+
+    def fill(self, sections: list[SectionRecord], items: list[ItemRecord], version: int):
+        """Reemplaza el contenido con los registros de `version`"""
+        order = sorted((item.sort_key for item in items))
+        by_section: dict[int, list[tuple[float, int]]] = {}
+        items_by_id = {item.id: item for item in items}
+        for key in order:
+            by_section.setdefault(items_by_id[-key[1]].section_id, []).append(key)
+
+        with self._lock:
+            self._sections = {section.id: section for section in sections}
+            self._items = items_by_id
+            self._order = order
+            self._by_section = by_section
+            self._low_stock = {item.id for item in items if item.is_below_threshold}
+            self.version = version
+        SNAPSHOT_UPDATES.inc(kind="load")
+
+    def current(self) -> "InventorySnapshot":
+        """La copia al día con la versión del hogar (recarga si quedó atrás)"""
+        # Una copia más nueva que la versión local (write-through antes de
+        # publicarla) también sirve: solo recarga si la DB avanzó
+        version = self.version
+        if version is None or get_version(self.version_key) > version:
+            with self._lock:
+                if self.version is None or get_version(self.version_key) > self.version:
+                    self.load()
+        return self
+
+    def apply(self, changes: SnapshotChanges, version: int):
+        """Aplica los cambios confirmados de la versión `version`"""
+        with self._lock:
+            # Misma versión: otro lote de la misma transacción
+            if self.version is None or version not in (self.version, self.version + 1):
+                # Hubo otras escrituras que la copia no vio: recargar al leer
+                self.version = None
+                SNAPSHOT_UPDATES.inc(kind="stale")
+                return
+            for item_id in changes.deleted_items:
+                self._remove_item(item_id)
+            for section_id in changes.deleted_sections:
+                self._sections.pop(section_id, None)
+                self._by_section.pop(section_id, None)
+            for section in changes.sections:
+                self._sections[section.id] = section
+            for item in changes.items:
+                self._remove_item(item.id)
+                self._insert_item(item)
+            self.version = version
+        SNAPSHOT_UPDATES.inc(kind="write_through")
+
+    def _remove_item(self, item_id: int):
+        item = self._items.pop(item_id, None)
+        if item is None:
+            return
+        key = item.sort_key
+        for keys in (self._order, self._by_section.get(item.section_id)):
+            if keys:
+                index = bisect_left(keys, key)
+                if index < len(keys) and keys[index] == key:
+                    del keys[index]
+        self._low_stock.discard(item_id)
+
+    def _insert_item(self, item: ItemRecord):
+        self._items[item.id] = item
+        key = item.sort_key
+        insort(self._order, key)
+        insort(self._by_section.setdefault(item.section_id, []), key)
+        if item.is_below_threshold:
+            self._low_stock.add(item.id)
+
+    # Lecturas (tuplas con la misma forma que las queries de config.database.queries)
+
+    def _item_row(self, item: ItemRecord) -> tuple:
+        """Tupla en el orden de ITEM_ROW_FIELDS"""
+        section = self._sections.get(item.section_id)
+        return (
+            item.id,
+            item.name,
+            item.emoji,
+            item.quantity,
+            item.unit,
+            item.threshold,
+            item.section_id,
+            section.name if section else None,
+            section.emoji if section else None,
+            item.updated_at,
+        )
+
+    def item_rows(
+        self, section_id: int | None = None, offset: int = 0, limit: int | None = None
+    ) -> list[tuple]:
+        """Items más recientes primero (como item_rows_statement), con slice opcional"""
+        with self._lock:
+            keys = self._by_section.get(section_id, []) if section_id else self._order
+            end = None if limit is None else offset + limit
+            return [self._item_row(self._items[-key[1]]) for key in keys[offset:end]]
+
+    def low_stock_rows(self, section_id: int | None = None) -> list[tuple]:
+        """Items bajo el umbral, los más urgentes primero (como low_stock_statement)"""
+        with self._lock:
+            items = [
+                self._items[item_id]
+                for item_id in self._low_stock
+                if not section_id or self._items[item_id].section_id == section_id
+            ]
+            items.sort(
+                key=lambda item: (
+                    item.quantity / item.threshold if item.threshold > 0 else 0,
+                    item.name,
+                )
+            )
+            return [self._item_row(item) for item in items]
+
+    def section_rows(self) -> list[tuple]:
+        """Secciones ordenadas por nombre (como section_rows_statement)"""
+        with self._lock:
+            sections = sorted(self._sections.values(), key=lambda s: s.name)
+            return [section.row() for section in sections]
+
+    def context_rows(self) -> tuple[list[tuple], list[tuple]]:
+        """Mismas tuplas que queries.context_rows()"""
+        with self._lock:
+            # Por id, el orden en que las devuelve la DB
+            sections = [(s.id, s.name, s.emoji) for _, s in sorted(self._sections.items())]
+            items = [(i.id, i.name, i.section_id) for _, i in sorted(self._items.items())]
+            return sections, items
+
+    def item(self, item_id: int) -> ItemRecord | None:
+        return self._items.get(item_id)
+
+    @property
+    def size(self) -> tuple[int, int]:
+        return len(self._sections), len(self._items)
+
+
+class InventorySnapshots:
+    """Copias por hogar (creadas al cargar todo o en la primera lectura del hogar)"""
+
+    def __init__(self, enabled: bool):
+        self.enabled = enabled
+        self._snapshots: dict[int, InventorySnapshot] = {}
+        self._lock = threading.Lock()
+
+    def get(self, household_id: int) -> InventorySnapshot:
+        snapshot = self._snapshots.get(household_id)
+        if snapshot is None:
+            with self._lock:
+                snapshot = self._snapshots.setdefault(household_id, InventorySnapshot(household_id))
+        return snapshot
+
+    def current(self, household_id: int) -> InventorySnapshot | None:
+        """La copia al día del hogar, o None si está deshabilitada"""
+        if not self.enabled:
+            return None
+        return self.get(household_id).current()
+
+    def load_all(self) -> dict:
+        """Carga todos los hogares con dos queries; devuelve conteos y duración para el log"""
+        start = time.perf_counter()
+        with Session(engine) as session:
+            household_ids = session.exec(select(Household.id)).all()
+            meta = read_meta(engine, tuple(inventory_version_key(h) for h in household_ids)) or {}
+            sections: dict[int, list[SectionRecord]] = {h: [] for h in household_ids}
+            for household_id, *row in session.exec(select(Section.household_id, *SECTION_COLUMNS)):
+                sections.setdefault(household_id, []).append(SectionRecord(*row))
+            items: dict[int, list[ItemRecord]] = {h: [] for h in household_ids}
+            for household_id, *row in session.exec(select(Item.household_id, *ITEM_COLUMNS)):
+                items.setdefault(household_id, []).append(ItemRecord(*row))
+
+        for household_id in household_ids:
+            version = int(meta.get(inventory_version_key(household_id), 0))
+            self.get(household_id).fill(sections[household_id], items[household_id], version)
+        return {
+            "households": len(household_ids),
+            "sections": sum(len(rows) for rows in sections.values()),
+            "items": sum(len(rows) for rows in items.values()),
+            "ms": round((time.perf_counter() - start) * 1000, 2),
+        }
+
+    def stats(self) -> dict:
+        sizes = [snapshot.size for snapshot in list(self._snapshots.values())]
+        return {
+            "enabled": self.enabled,
+            "households": len(sizes),
+            "sections": sum(sections for sections, _ in sizes),
+            "items": sum(items for _, items in sizes),
+        }
+
+
+inventory_snapshots = InventorySnapshots(SNAPSHOT_ENABLED)
+
+
+def stage_changes(
+    session: Session,
+    household_id: int,
+    items: Iterable[Item],
+    sections: Iterable[Section] = (),
+    deleted_items: Iterable[int] = (),
+    deleted_sections: Iterable[int] = (),
+):
+    """
+    Queues a write-through update of the snapshot for the session's next commit.
+
+    Records are built now (values as flushed), so expired ORM attributes after
+    the commit are never touched. If the transaction rolls back nothing is applied.
+
+    Args:
+        session: Session whose commit confirms the changes (must bump the household version)
+        household_id: Household whose snapshot is updated
+        items: Created or modified items, already flushed (with ids)
+        sections: Created or modified sections
+        deleted_items: Ids of deleted items
+        deleted_sections: Ids of deleted sections
+    """
+    if not inventory_snapshots.enabled:
+        return
+    changes = SnapshotChanges()
+    changes.items = [ItemRecord.from_item(item) for item in items]
+    changes.sections = [
+        SectionRecord(section.id, section.name, section.emoji, section.created_at)
+        for section in sections
+    ]
+    changes.deleted_items = set(deleted_items)
+    changes.deleted_sections = set(deleted_sections)
+
+    def _apply(session):
+        version = bumped_version(session, inventory_version_key(household_id))
+        if version is not None:
+            inventory_snapshots.get(household_id).apply(changes, version)
+
+    on_commit(session, _apply)
@@ -0,0 +1,80 @@
+"""StaticFiles con variantes precomprimidas (.br / .gz) y cache inmutable para assets con hash"""
+
+import re
+import stat
+from mimetypes import guess_type
+
+import anyio
+from fastapi.staticfiles import StaticFiles
+from starlette.datastructures import Headers
+from starlette.responses import FileResponse, Response
+from starlette.staticfiles import NotModifiedResponse
+from starlette.types import Scope
+
+from middleware.compression import parse_accept_encoding
+
+# Orden de preferencia: brotli comprime mejor que gzip
+PRECOMPRESSED_VARIANTS = (("br", ".br"), ("gzip", ".gz"))
+
+# Assets con fingerprint (nombre.<hash>.ext): su contenido nunca cambia
+HASHED_ASSET_RE = re.compile(r"\.[0-9a-f]{10}\.[^./]+$")
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+REVALIDATE_CACHE_CONTROL = "no-cache"
+
+
+class PrecompressedStaticFiles(StaticFiles):
+    """
+    Sirve `archivo.br` / `archivo.gz` generados en el build cuando el cliente
+    los acepta (negociación por Accept-Encoding), y el original en otro caso.
+
+    Los assets con hash en el nombre se sirven con `Cache-Control: immutable`;
+    el resto debe revalidarse (ETag) en cada uso.
+    """
+
+    async def get_response(self, path: str, scope: Scope) -> Response:
+        if scope["method"] in ("GET", "HEAD"):
+            request_headers = Headers(scope=scope)
+            accepted = parse_accept_encoding(request_headers.get("accept-encoding", ""))
+
+            for encoding, suffix in PRECOMPRESSED_VARIANTS:
+                if encoding not in accepted:
+                    continue
+                full_path, stat_result = await anyio.to_thread.run_sync(
+                    self.lookup_path, path + suffix
+                )
+                if stat_result and stat.S_ISREG(stat_result.st_mode):
+                    return self.variant_response(
+                        path, full_path, stat_result, request_headers, encoding
+                    )
+
+        response = await super().get_response(path, scope)
+        response.headers.add_vary_header("Accept-Encoding")
+        set_cache_control(path, response)
+        return response
+
+    def variant_response(
+        self, path, full_path, stat_result, request_headers: Headers, encoding: str
+    ) -> Response:
+        """Respuesta para una variante precomprimida con el media type del original"""
+        media_type, _ = guess_type(path)
+        response = FileResponse(
+            full_path,
+            stat_result=stat_result,
+            media_type=media_type or "application/octet-stream",
+        )
+        response.headers["Content-Encoding"] = encoding
+        response.headers.add_vary_header("Accept-Encoding")
+        set_cache_control(path, response)
+        if self.is_not_modified(response.headers, request_headers):
+            return NotModifiedResponse(response.headers)
+        return response
+
+
+def set_cache_control(path: str, response: Response):
+    """Cache-Control según si el asset lleva fingerprint o no"""
+    if response.status_code not in (200, 304):
+        return
+    if HASHED_ASSET_RE.search(path):
+        response.headers["Cache-Control"] = IMMUTABLE_CACHE_CONTROL
+    else:
+        response.headers["Cache-Control"] = REVALIDATE_CACHE_CONTROL
@@ -0,0 +1,56 @@
+"""
+Entorno Jinja2 + catálogo JinjaX compartidos por la app y los routers.
+
+Se construyen en el primer uso (no al importar): jinjax y el escaneo de
+componentes no forman parte del arranque en frío.
+"""
+
+from functools import lru_cache
+
+from utils.metrics import timed
+
+
+@lru_cache(maxsize=None)
+def _environment():
+    """(templates, catalog) construidos juntos: index.html usa el global catalog"""
+    import jinjax
+    from fastapi.templating import Jinja2Templates
+
+    from utils.assets import asset_url, asset_version
+
+    templates = Jinja2Templates(directory="templates")
+    templates.env.add_extension(jinjax.JinjaX)
+
+    # Helpers de assets con fingerprint (antes de crear el catalog: copia los globals)
+    templates.env.globals["asset_url"] = asset_url
+    templates.env.globals["asset_version"] = asset_version
+
+    # JinjaX: el catalog se registra a sí mismo como global "catalog" en templates.env
+    catalog = jinjax.Catalog(jinja_env=templates.env)
+    catalog.add_folder("components")
+    return templates, catalog
+
+
+def get_templates():
+    """Templates Jinja2 con la extensión JinjaX y los helpers de assets"""
+    return _environment()[0]
+
+
+def get_catalog():
+    """Catálogo JinjaX de components/"""
+    return _environment()[1]
+
+
+def render_component(name: str, **kwargs) -> str:
+    """
+    Renders a JinjaX component, timing it for the current request's metrics.
+
+    Args:
+        name: Component name (e.g. "features/ItemsList")
+        **kwargs: Component arguments
+
+    Returns:
+        Rendered HTML
+    """
+    with timed("template"):
+        return get_catalog().render(name, **kwargs)
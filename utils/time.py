@@ -21,3 +21,14 @@ def humanize_time(dt: datetime) -> str:
     else:
         years = delta.days // 365
         return f"hace {years} años" if years > 1 else "hace 1 año"
+
+
+def humanize_days_left(days: float | None) -> str | None:
+    """Estimación de agotamiento ('se acaba en ~4 días'), None si no hay datos"""
+    if days is None:
+        return None
+    if days < 1:
+        return "se acaba hoy"
+    if days < 2:
+        return "se acaba mañana"
+    return f"se acaba en ~{round(days)} días"
@@ -0,0 +1,252 @@
+"""
+Exportación e importación masiva (CSV / NDJSON) de secciones, items e historial.
+
+Exportar: cursor del lado del servidor (stream_results + yield_per) y un chunk
+de salida por partición; la memoria no depende del tamaño de la tabla.
+Importar: el cuerpo se lee desde un archivo temporal (spooled) fila a fila y
+se inserta por chunks con INSERT multi-fila. Filas con un id ya existente se
+omiten, así que reimportar el mismo archivo no duplica datos.
+
+Todo es por hogar: se exportan solo sus filas y al importar household_id se
+toma del usuario (no del archivo) y las secciones/items referenciados tienen
+que ser del mismo hogar.
+"""
+
+import csv
+import io
+from datetime import datetime
+from typing import IO, Iterator
+
+import orjson
+from sqlalchemy import DateTime, Float, Integer, select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.exc import IntegrityError
+from sqlmodel import SQLModel
+
+from config.database.models import Item, ItemHistory, ItemHistoryRollup, Section
+
+# Orden de importación para respetar las FKs: sections -> items -> history
+ENTITIES: dict[str, type[SQLModel]] = {
+    "sections": Section,
+    "items": Item,
+    "history": ItemHistory,
+    "history-rollups": ItemHistoryRollup,
+}
+
+# Columna que referencia a otra entidad del hogar (validada al importar)
+REFERENCES: dict[str, tuple[str, type[SQLModel]]] = {
+    "items": ("section_id", Section),
+    "history": ("item_id", Item),
+    "history-rollups": ("item_id", Item),
+}
+
+FORMATS = {
+    "csv": "text/csv; charset=utf-8",
+    "ndjson": "application/x-ndjson",
+}
+
+
+class TransferError(ValueError):
+    """Fila inválida en un archivo de importación (incluye el número de línea)"""
+
+
+def columns(entity: str) -> list[str]:
+    return [column.name for column in ENTITIES[entity].__table__.columns]
+
+
+def _encode_value(value):
+    return value.isoformat() if isinstance(value, datetime) else value
+
+
+def _household_filter(entity: str, household_id: int):
+    table = ENTITIES[entity].__table__
+    if "household_id" in table.c:
+        return table.c.household_id == household_id
+    # Rollups: sin household_id, los de items del hogar
+    return table.c.item_id.in_(select(Item.id).where(Item.household_id == household_id))
+
+
+def iter_export(
+    engine: Engine, entity: str, fmt: str, chunk_size: int, household_id: int
+) -> Iterator[bytes]:
+    """
+    Streams a household's rows of a table as CSV or NDJSON, one output chunk per DB partition.
+
+    Args:
+        engine: Database engine (the generator owns its connection)
+        entity: Key of ENTITIES ("sections", "items", "history", ...)
+        fmt: "csv" or "ndjson"
+        chunk_size: Rows fetched per round trip
+        household_id: Household whose rows are exported
+
+    Yields:
+        Encoded chunks (the CSV header comes first)
+    """
+    table = ENTITIES[entity].__table__
+    names = columns(entity)
+    statement = (
+        select(*table.columns).where(_household_filter(entity, household_id)).order_by(table.c.id)
+    )
+
+    with engine.connect() as conn:
+        options = conn.execution_options(stream_results=True, yield_per=chunk_size)
+        result = options.execute(statement)
+
+        if fmt == "csv":
+            buffer = io.StringIO()
+            writer = csv.writer(buffer)
+            writer.writerow(names)
+            for partition in result.partitions():
+                writer.writerows([_encode_value(v) for v in row] for row in partition)
+                yield buffer.getvalue().encode()
+                buffer.seek(0)
+                buffer.truncate()
+            # Tabla vacía: solo el header
+            if buffer.tell():
+                yield buffer.getvalue().encode()
+        else:
+            for partition in result.partitions():
+                yield b"".join(
+                    orjson.dumps(dict(zip(names, row))) + b"\n" for row in partition
+                )
+
+
+def _parse_datetime(value) -> datetime:
+    return value if isinstance(value, datetime) else datetime.fromisoformat(value)
+
+
+def _converters(entity: str) -> dict:
+    """Conversión de strings (CSV) / JSON a los tipos de cada columna"""
+    converters = {}
+    for column in ENTITIES[entity].__table__.columns:
+        if isinstance(column.type, DateTime):
+            converters[column.name] = _parse_datetime
+        elif isinstance(column.type, Integer):
+            converters[column.name] = int
+        elif isinstance(column.type, Float):
+            converters[column.name] = float
+        else:
+            converters[column.name] = str
+    return converters
+
+
+def _iter_records(stream: IO[bytes], fmt: str) -> Iterator[tuple[int, dict]]:
+    """(número de línea, dict) por fila del archivo"""
+    text = io.TextIOWrapper(stream, encoding="utf-8", newline="")
+    if fmt == "csv":
+        reader = csv.DictReader(text)
+        for record in reader:
+            yield reader.line_num, record
+    else:
+        for line_number, line in enumerate(text, start=1):
+            if line.strip():
+                yield line_number, orjson.loads(line)
+
+
+def _normalize(record: dict, names: list[str], converters: dict, line: int) -> dict:
+    row = {}
+    for name in names:
+        value = record.get(name)
+        if value is None or value == "":
+            continue  # default de la columna (o NULL)
+        try:
+            row[name] = converters[name](value)
+        except (TypeError, ValueError) as e:
+            raise TransferError(f"Línea {line}: valor inválido para '{name}': {value!r}") from e
+    return row
+
+
+def import_stream(
+    conn: Connection, entity: str, fmt: str, stream: IO[bytes], chunk_size: int, household_id: int
+) -> dict:
+    """
+    Inserts rows from a CSV/NDJSON file in chunks, skipping ids that already exist.
+
+    Args:
+        conn: Connection inside the caller's transaction
+        entity: Key of ENTITIES ("sections", "items", "history", ...)
+        fmt: "csv" or "ndjson"
+        stream: Binary file positioned at the start
+        chunk_size: Rows per INSERT
+        household_id: Household that receives the rows (overrides the file's column)
+
+    Returns:
+        {"rows": read rows, "inserted": inserted rows}
+
+    Raises:
+        TransferError: Malformed row or reference to another household (the caller rolls back)
+    """
+    model = ENTITIES[entity]
+    names = [name for name in columns(entity) if name != "household_id"]
+    owned = "household_id" in model.__table__.c
+    converters = _converters(entity)
+    dialect_insert = pg_insert if conn.dialect.name == "postgresql" else sqlite_insert
+    statement = dialect_insert(model).on_conflict_do_nothing(index_elements=["id"])
+
+    rows_read = inserted = 0
+    chunk: list[dict] = []
+    try:
+        for line, record in _iter_records(stream, fmt):
+            if not isinstance(record, dict):
+                raise TransferError(f"Línea {line}: se esperaba un objeto")
+            row = _normalize(record, names, converters, line)
+            if owned:
+                row["household_id"] = household_id
+            chunk.append(row)
+            rows_read += 1
+            if len(chunk) >= chunk_size:
+                _check_references(conn, entity, chunk, household_id)
+                inserted += _insert_chunk(conn, statement, chunk)
+                chunk = []
+    except (orjson.JSONDecodeError, csv.Error, UnicodeDecodeError) as e:
+        raise TransferError(f"Archivo inválido: {e}") from e
+
+    if chunk:
+        _check_references(conn, entity, chunk, household_id)
+        inserted += _insert_chunk(conn, statement, chunk)
+
+    if conn.dialect.name == "postgresql" and inserted:
+        # Ids explícitos: reajustar la secuencia al máximo importado
+        table = model.__tablename__
+        conn.exec_driver_sql(
+            f"SELECT setval(pg_get_serial_sequence('{table}', 'id'), "
+            f"COALESCE((SELECT MAX(id) FROM {table}), 1))"
+        )
+
+    return {"rows": rows_read, "inserted": inserted}
+
+
+def _check_references(conn: Connection, entity: str, chunk: list[dict], household_id: int):
+    """Rechaza filas que apuntan a secciones/items de otro hogar (o inexistentes)"""
+    if entity not in REFERENCES:
+        return
+    column, model = REFERENCES[entity]
+    ids = {row[column] for row in chunk if column in row}
+    if not ids:
+        return
+    found = set(
+        conn.execute(
+            select(model.id).where(model.household_id == household_id, model.id.in_(ids))
+        ).scalars()
+    )
+    missing = sorted(ids - found)
+    if missing:
+        raise TransferError(f"'{column}' inexistente en este hogar: {missing[:10]}")
+
+
+def _insert_chunk(conn: Connection, statement, chunk: list[dict]) -> int:
+    # Filas con distintas columnas presentes: agrupar para el executemany
+    inserted = 0
+    groups: dict[tuple, list[dict]] = {}
+    for row in chunk:
+        groups.setdefault(tuple(row), []).append(row)
+    for rows in groups.values():
+        try:
+            result = conn.execute(statement, rows)
+        except IntegrityError as e:
+            # FK a una sección/item inexistente, columna obligatoria vacía...
+            raise TransferError(f"Filas rechazadas por la base: {e.orig}") from e
+        inserted += max(result.rowcount, 0)
+    return inserted
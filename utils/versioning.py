@@ -0,0 +1,205 @@
+"""
+Versiones compartidas entre procesos, guardadas en app_meta.
+
+- inventory_version:<household_id>: una por hogar, cambia en cada commit con
+  cambios en su inventario; valida los ETags del navegador/SW y las entradas
+  de ese hogar en las caches de fragmentos, contexto y LLM. Escribir en un
+  hogar no invalida nada de los demás.
+- auth_version: cambia al crear o modificar usuarios; valida la cache de auth.
+
+Cada worker guarda una copia local por clave y la relee (una query por clave
+primaria) como máximo cada VERSION_POLL_INTERVAL segundos. El proceso que escribe la
+actualiza al confirmar la transacción, y un cliente que ya vio una versión más
+nueva (X-Inventory-Version / If-None-Match) fuerza la relectura: tras escribir
+en un worker, leer desde otro nunca devuelve datos anteriores a esa escritura.
+
+El ETag del inventario incluye además la versión de los assets (un deploy
+cambia el HTML de los fragmentos) y, en los fragmentos con tiempos relativos
+("hace 2h", "se acaba en ~3 días"), el intervalo de RELATIVE_TIME_BUCKET
+segundos actual: un 304 nunca es más viejo que la cache de fragmentos.
+"""
+
+import re
+import time
+
+from fastapi import Request, Response
+from sqlalchemy import Integer, String, cast, event
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlmodel import Session
+
+from config.database.db import engine
+from config.database.migrations import read_meta
+from config.database.models import AppMeta
+from config.settings import FRAGMENT_CACHE_TTL, VERSION_POLL_INTERVAL
+from utils.assets import asset_version
+
+INVENTORY_VERSION_KEY = "inventory_version"  # prefijo: una clave por hogar
+AUTH_VERSION_KEY = "auth_version"
+
+# Hogar y versión del inventario al inicio de los ETags que manda el cliente
+CLIENT_ETAG_RE = re.compile(r'W/"inv-(\d+)-(\d+)[-"]')
+
+# Segundos que un fragmento con tiempos relativos se considera vigente
+RELATIVE_TIME_BUCKET = max(FRAGMENT_CACHE_TTL, 1.0)
+
+# session.info: callbacks pendientes hasta el commit y versiones incrementadas
+COMMIT_HOOKS_KEY = "commit_hooks"
+BUMPED_VERSIONS_KEY = "bumped_versions"
+
+# Copia local por clave (asignaciones de una clave: atómicas entre threads)
+_versions: dict[str, int] = {}
+_checked_at: dict[str, float] = {}
+
+
+def inventory_version_key(household_id: int) -> str:
+    return f"{INVENTORY_VERSION_KEY}:{household_id}"
+
+
+def household_version_key(cache_key: tuple) -> str:
+    """version_key de las caches cuyas claves empiezan por household_id"""
+    return inventory_version_key(cache_key[0])
+
+
+def get_version(key: str, force: bool = False) -> int:
+    """Versión actual; relee app_meta si venció el intervalo de polling de la clave"""
+    now = time.monotonic()
+    if force or now - _checked_at.get(key, float("-inf")) >= VERSION_POLL_INTERVAL:
+        meta = read_meta(engine, (key,)) or {}
+        _versions[key] = int(meta.get(key, 0))
+        _checked_at[key] = now
+    return _versions[key]
+
+
+def on_commit(session: Session, callback):
+    """Ejecuta callback(session) tras el próximo commit; un rollback lo descarta"""
+    session.info.setdefault(COMMIT_HOOKS_KEY, []).append(callback)
+
+
+@event.listens_for(Session, "after_commit")
+def _run_commit_hooks(session):
+    callbacks = session.info.pop(COMMIT_HOOKS_KEY, ())
+    try:
+        for callback in callbacks:
+            callback(session)
+    finally:
+        session.info.pop(BUMPED_VERSIONS_KEY, None)
+
+
+@event.listens_for(Session, "after_rollback")
+def _drop_commit_hooks(session):
+    session.info.pop(COMMIT_HOOKS_KEY, None)
+    session.info.pop(BUMPED_VERSIONS_KEY, None)
+
+
+def bumped_version(session: Session, key: str) -> int | None:
+    """Versión incrementada en la transacción en curso de la sesión (None si no hubo)"""
+    return session.info.get(BUMPED_VERSIONS_KEY, {}).get(key)
+
+
+def bump_version(session: Session, key: str) -> int:
+    """
+    Increments a shared version inside the session's transaction.
+
+    The local copy is updated only after the commit, so a rollback never
+    labels cached data with a version that does not exist.
+
+    Args:
+        session: Session whose commit publishes the new version
+        key: Version key (INVENTORY_VERSION_KEY, AUTH_VERSION_KEY)
+
+    Returns:
+        New version number
+    """
+    insert = pg_insert if engine.dialect.name == "postgresql" else sqlite_insert
+    statement = (
+        insert(AppMeta)
+        .values(key=key, value="1")
+        .on_conflict_do_update(
+            index_elements=["key"],
+            set_={"value": cast(cast(AppMeta.value, Integer) + 1, String)},
+        )
+        .returning(AppMeta.value)
+    )
+    version = int(session.execute(statement).scalar_one())
+    session.info.setdefault(BUMPED_VERSIONS_KEY, {})[key] = version
+
+    def _publish(session):
+        if version > get_version(key):
+            _versions[key] = version
+
+    on_commit(session, _publish)
+    return version
+
+
+def get_inventory_version(household_id: int) -> str:
+    """Versión actual del inventario del hogar (cambia en cada commit con cambios)"""
+    return str(get_version(inventory_version_key(household_id)))
+
+
+def bump_inventory_version(session: Session, household_id: int) -> int:
+    """Marca el inventario del hogar como modificado al confirmar la sesión"""
+    return bump_version(session, inventory_version_key(household_id))
+
+
+def observe_client_version(request: Request, household_id: int):
+    """Relee la versión si el cliente ya vio una más nueva (escribió en otro worker)"""
+    key = inventory_version_key(household_id)
+    seen = request.headers.get("x-inventory-version", "")
+    match = CLIENT_ETAG_RE.search(request.headers.get("if-none-match", ""))
+    etag_version = match.group(2) if match and int(match.group(1)) == household_id else None
+    candidates = [int(value) for value in (seen, etag_version) if value and value.isdigit()]
+    if candidates and max(candidates) > get_version(key):
+        get_version(key, force=True)
+
+
+def inventory_etag(household_id: int, relative_times: bool = True) -> str:
+    """
+    Weak ETag of a household's inventory fragment.
+
+    Args:
+        household_id: Household of the authenticated user
+        relative_times: The fragment shows times relative to now, so the tag
+            also changes every RELATIVE_TIME_BUCKET seconds
+
+    Returns:
+        Tag like W/"inv-<household>-<version>-<assets>[-t<bucket>]"
+    """
+    tag = f"inv-{household_id}-{get_inventory_version(household_id)}-{asset_version()}"
+    if relative_times:
+        tag += f"-t{int(time.time() // RELATIVE_TIME_BUCKET)}"
+    return f'W/"{tag}"'
+
+
+def not_modified_response(
+    request: Request, household_id: int, relative_times: bool = True
+) -> Response | None:
+    """
+    Returns a 304 response if the client's If-None-Match matches the current version.
+
+    Args:
+        request: Incoming request
+        household_id: Household of the authenticated user
+        relative_times: See inventory_etag
+
+    Returns:
+        304 response with the version headers, or None if the client copy is stale
+    """
+    observe_client_version(request, household_id)
+    etag = inventory_etag(household_id, relative_times)
+    if_none_match = request.headers.get("if-none-match", "")
+    if etag in (tag.strip() for tag in if_none_match.split(",")):
+        response = Response(status_code=304)
+        set_version_headers(response, household_id, relative_times)
+        return response
+    return None
+
+
+def set_version_headers(
+    response: Response, household_id: int, relative_times: bool = True
+) -> Response:
+    """Agrega ETag/X-Inventory-Version y obliga a revalidar antes de reutilizar"""
+    response.headers["ETag"] = inventory_etag(household_id, relative_times)
+    response.headers["X-Inventory-Version"] = get_inventory_version(household_id)
+    response.headers["Cache-Control"] = "no-cache"
+    return response